@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+CONFIG = {
+    'CACHE': 'default',
+    'TIMEOUT': 5 * 60,
+}
+CONFIG.update(getattr(settings, 'AUTH_USER_CACHE', {}))
+
+# Fields kept in the cache. Any other field is deferred and loaded from
+# the database the first time a view reads it.
+CACHED_FIELDS = ['id', 'username', 'is_active', 'is_staff', 'is_superuser']
+
+# `Model.from_db` expects the values in the model field order.
+_FIELD_NAMES = [field.attname for field in User._meta.concrete_fields
+                if field.attname in CACHED_FIELDS]
+
+
+def _user_key(user_id):
+    return f'authentication:user:{user_id}'
+
+
+def get_user_cache():
+    """
+    Return the user cache, or None when its backend is local to the
+    process: a user saved by another process would stay cached there
+    until TIMEOUT, e.g. still active after a deactivation.
+    """
+    cache = caches[CONFIG['CACHE']]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def get_cached_user(user_id):
+    """
+    Return a `User` holding only `CACHED_FIELDS`, or None if there is no
+    such user.
+
+    The values are read from the cache, if shared, and from the primary
+    database on a miss: a lagging replica must not fill the shared cache.
+    """
+    cache = get_user_cache()
+    values = cache.get(_user_key(user_id)) if cache else None
+    if values is None:
+        values = User.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=user_id).values_list(*_FIELD_NAMES).first()
+        if values is None:
+            return None
+        if cache:
+            cache.set(_user_key(user_id), values, CONFIG['TIMEOUT'])
+    return User.from_db(router.db_for_read(User), _FIELD_NAMES, values)
+
+
+async def aget_cached_user(user_id):
+    """
+    Async `get_cached_user`.
+    """
+    cache = get_user_cache()
+    values = await cache.aget(_user_key(user_id)) if cache else None
+    if values is None:
+        values = await User.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=user_id).values_list(*_FIELD_NAMES).afirst()
+        if values is None:
+            return None
+        if cache:
+            await cache.aset(_user_key(user_id), values, CONFIG['TIMEOUT'])
+    return User.from_db(router.db_for_read(User), _FIELD_NAMES, values)
+
+
+def invalidate_cached_user(user_id):
+    cache = get_user_cache()
+    if cache:
+        cache.delete(_user_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication resolving the user through `get_cached_user`, so a
+    warm shared cache serves the request without any query on the user
+    table.
+    """
+
+    async def aauthenticate(self, request):
+        """
+        Async `authenticate`, for the async views.
+        """
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await aget_cached_user(self.get_user_id(validated_token))
+        return self.check_user(user), validated_token
+
+    def get_user(self, validated_token):
+        return self.check_user(
+            get_cached_user(self.get_user_id(validated_token)))
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+
+    def check_user(self, user):
+        if user is None:
+            raise AuthenticationFailed(_('User not found'),
+                                       code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'),
+                                       code='user_inactive')
+        return user
@@ -0,0 +1,166 @@
+"""
+Password hashing off the request workers.
+
+Argon2 is designed to be expensive: run inline, a burst of signups and
+logins takes the CPU from every other request of the process. The
+functions of this module run the hash and the verification in a small
+pool of lower priority processes instead. At most `MAX_PENDING` of them
+are admitted at once, running or queued: past that, `HashingBusy`
+answers 503 with a Retry-After header rather than piling up requests.
+
+`User.set_password` and `User.check_password` go through this module,
+so the signup, the login and the authentication backend all use it.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+def _build_config():
+    config = getattr(settings, 'PASSWORD_HASHING', {})
+    workers = config.get('WORKERS', max(1, (os.cpu_count() or 2) // 2))
+    return {
+        'WORKERS': workers,
+        'MAX_PENDING': config.get('MAX_PENDING', 4 * workers),
+        'RETRY_AFTER': config.get('RETRY_AFTER', 1),
+        'NICE': config.get('NICE', 10),
+        'ARGON2': {
+            'TIME_COST': 2,
+            'MEMORY_COST': 102400,
+            'PARALLELISM': 8,
+            **config.get('ARGON2', {}),
+        },
+    }
+
+
+CONFIG = _build_config()
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """
+    Argon2 with the parameters of `settings.PASSWORD_HASHING['ARGON2']`.
+
+    The hashes keep the `argon2` algorithm name: the hashes made with
+    other parameters still verify, and are updated at the next login.
+    """
+    time_cost = CONFIG['ARGON2']['TIME_COST']
+    memory_cost = CONFIG['ARGON2']['MEMORY_COST']
+    parallelism = CONFIG['ARGON2']['PARALLELISM']
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Too many password checks in progress, '
+                       'try again later.')
+    default_code = 'hashing_busy'
+
+    def __init__(self, wait):
+        super().__init__()
+        # Sent as the Retry-After header by the DRF exception handler.
+        self.wait = wait
+
+
+def _init_worker(nice):
+    import django
+    django.setup()
+    if nice:
+        os.nice(nice)
+
+
+class HashingPool:
+    """
+    Process pool with admission control.
+
+    The processes are spawned rather than forked from a threaded server,
+    on the first submission.
+    """
+
+    def __init__(self, workers, max_pending, retry_after, nice=0):
+        self.workers = workers
+        self.retry_after = retry_after
+        self.nice = nice
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self.nice,))
+            return self._executor
+
+    def run(self, func, *args):
+        """
+        Return `func(*args)` run in the pool, or raise `HashingBusy`
+        when `max_pending` calls are already running or queued.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy(self.retry_after)
+        try:
+            executor = self._get_executor()
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                # A worker died, e.g. killed on memory: start a new pool
+                # for the next calls.
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                executor.shutdown(wait=False)
+                raise
+        finally:
+            self._slots.release()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+pool = HashingPool(CONFIG['WORKERS'], CONFIG['MAX_PENDING'],
+                   CONFIG['RETRY_AFTER'], CONFIG['NICE'])
+
+
+def _run(func, *args):
+    if CONFIG['WORKERS'] > 0:
+        return pool.run(func, *args)
+    return func(*args)
+
+
+def make_password(password):
+    """
+    `django.contrib.auth.hashers.make_password` run in the pool.
+    """
+    if password is None:
+        return hashers.make_password(None)
+    return _run(hashers.make_password, password)
+
+
+def check_password(password, encoded, setter=None):
+    """
+    `django.contrib.auth.hashers.check_password` with the verification
+    run in the pool. `setter` is called with the password when the hash
+    must be updated, e.g. after a change of the Argon2 parameters.
+    """
+    if password is None or not hashers.is_password_usable(encoded):
+        return False
+    is_correct = _run(hashers.check_password, password, encoded)
+    if is_correct and setter is not None:
+        preferred = hashers.get_hasher('default')
+        hasher = hashers.identify_hasher(encoded)
+        if (hasher.algorithm != preferred.algorithm
+                or preferred.must_update(encoded)):
+            setter(password)
+    return is_correct
@@ -0,0 +1,129 @@
+import json
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication import hashing
+from issuestracking import models, throttling
+from issuestracking.management.commands.benchmark_endpoints import percentile
+
+
+def summarize(latencies):
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Measures the issue list latency of a project, first alone, '
+            'then during a storm of logins sent from several threads of '
+            'the same process. Use it with --workers 0 to hash inline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to list the issues of, by '
+                                 'default the one with the most issues.')
+        parser.add_argument('--password', default='S3cret-pass',
+                            help='Password of the project contributors.')
+        parser.add_argument('--logins', type=int, default=16,
+                            help='Threads sending logins.')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='Seconds of each phase.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Hashing pool processes, 0 to hash '
+                                 'inline. Defaults to the settings.')
+        parser.add_argument('--nice', type=int, default=None,
+                            help='Niceness of the hashing processes. '
+                                 'Defaults to the settings.')
+
+    def handle(self, *args, project, password, logins, duration, workers,
+               nice, **options):
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        if project is None:
+            raise CommandError('No project found, see seed_data.')
+        users = [member.user for member in
+                 project.projects.select_related('user')]
+        token = RefreshToken.for_user(users[0]).access_token
+        path = f'/api/v1/projects/{project.id}/issues/'
+
+        if workers is None:
+            workers = hashing.CONFIG['WORKERS']
+        pool = hashing.HashingPool(
+            workers, hashing.CONFIG['MAX_PENDING'],
+            hashing.CONFIG['RETRY_AFTER'],
+            hashing.CONFIG['NICE'] if nice is None else nice)
+        login_statuses, login_latencies = [], []
+
+        def read(stop, latencies):
+            client = Client()
+            while not stop.is_set():
+                started = time.perf_counter()
+                client.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+
+        def login(stop, index):
+            client = Client(raise_request_exception=False)
+            user = users[index % len(users)]
+            while not stop.is_set():
+                started = time.perf_counter()
+                response = client.post('/api/v1/login/', {
+                    'username': user.username, 'password': password})
+                login_latencies.append(time.perf_counter() - started)
+                login_statuses.append(response.status_code)
+                if response.status_code == 503:
+                    # Clients honour Retry-After, scaled down to the run.
+                    stop.wait(int(response['Retry-After']) / 10)
+            connection.close()
+
+        def run_phase(storm):
+            stop, latencies = threading.Event(), []
+            threads = [threading.Thread(target=read, args=(stop, latencies))]
+            if storm:
+                threads += [threading.Thread(target=login, args=(stop, index))
+                            for index in range(logins)]
+            for thread in threads:
+                thread.start()
+            time.sleep(duration)
+            stop.set()
+            for thread in threads:
+                thread.join()
+            return summarize(latencies)
+
+        # The storm comes from a single IP, the login throttle would
+        # turn most of it away before any hashing.
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                patch.object(hashing, 'pool', pool), \
+                patch.dict(hashing.CONFIG, WORKERS=workers), \
+                patch.dict(throttling.CONFIG, ENABLED=False):
+            if workers:
+                # Start the processes before measuring.
+                pool.run(int)
+            idle = run_phase(storm=False)
+            storm = run_phase(storm=True)
+        pool.shutdown()
+
+        self.stdout.write(json.dumps({
+            'workers': workers,
+            'nice': pool.nice,
+            'issue_list_idle': idle,
+            'issue_list_storm': storm,
+            'logins': {
+                'per_second': round(login_statuses.count(200) / duration, 1),
+                'status': {str(code): login_statuses.count(code)
+                           for code in sorted(set(login_statuses))},
+                **summarize(login_latencies or [0]),
+            },
+        }, indent=2))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken, OutstandingToken)
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+class Command(BaseCommand):
+    help = ('Deletes expired outstanding tokens and their blacklist entries '
+            'in bounded batches, each one in its own short transaction.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of tokens deleted per transaction.')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Seconds to wait between two batches.')
+
+    def handle(self, *args, batch_size, sleep, **options):
+        now = aware_utcnow()
+        last_id, purged, started = 0, 0, time.monotonic()
+        while True:
+            # Walk the primary key rather than scanning `expires_at` from
+            # the start on every batch.
+            ids = list(OutstandingToken.objects.filter(
+                id__gt=last_id, expires_at__lte=now
+            ).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            last_id, purged = ids[-1], purged + len(ids)
+            if sleep:
+                time.sleep(sleep)
+        self.stdout.write(
+            f'Purged {purged} expired tokens in '
+            f'{time.monotonic() - started:.2f}s.')
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 
+from . import hashing
+
 
 class User(AbstractUser):
     """
@@ -10,3 +12,23 @@ class User(AbstractUser):
     Other fields are optional.
     """
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
+
+    def set_password(self, raw_password):
+        """
+        Hash the password in the hashing pool, see `hashing`.
+        """
+        self.password = hashing.make_password(raw_password)
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Verify the password in the hashing pool, and update its hash
+        when the hasher or its parameters changed.
+        """
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password
+            # changes.
+            self._password = None
+            self.save(update_fields=['password'])
+        return hashing.check_password(raw_password, self.password, setter)
@@ -25,7 +25,9 @@ class CreateUserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """ Create and return new user"""
 
-        user = super().create(validated_data)
+        # The password is hashed in the hashing pool before the only
+        # INSERT, the raw password never reaches the database.
+        user = User(**validated_data)
         user.set_password(validated_data['password'])
         user.save()
         return user
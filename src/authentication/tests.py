@@ -1,3 +1,181 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+import tempfile
+import threading
+from unittest.mock import patch
 
-# Create your tests here.
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import (
+    BlacklistedToken, OutstandingToken)
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from . import hashing
+from .authentication import CONFIG
+from .models import User
+
+
+def count_user_queries(queries):
+    return len([query for query in queries
+                if 'FROM "authentication_user"' in query['sql']])
+
+
+# A cache shared by the processes of the host.
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp()},
+})
+class CachedJWTAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        patcher = patch.dict(CONFIG, CACHE='shared')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        caches[CONFIG['CACHE']].clear()
+        self.user = User.objects.create_user(username='user',
+                                             email='user@example.com',
+                                             password='S3cret-pass')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def get_projects(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/v1/projects/')
+        return response, count_user_queries(context.captured_queries)
+
+    def test_warm_cache_needs_no_user_query(self):
+        response, queries = self.get_projects()
+        self.assertEqual((response.status_code, queries), (200, 1))
+        response, queries = self.get_projects()
+        self.assertEqual((response.status_code, queries), (200, 0))
+
+    def test_process_local_cache_is_not_used(self):
+        with patch.dict(CONFIG, CACHE='default'):
+            self.get_projects()
+            response, queries = self.get_projects()
+        self.assertEqual((response.status_code, queries), (200, 1))
+
+    def test_deactivation_is_seen_immediately(self):
+        self.get_projects()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.get_projects()
+        self.assertEqual(response.status_code, 401)
+
+    def test_other_fields_load_on_demand(self):
+        self.get_projects()
+        response = self.client.post('/api/v1/projects/', {
+            'title': 'Project', 'description': 'desc', 'type': 'back-end'})
+        self.assertEqual(response.status_code, 201)
+        user = response.wsgi_request.user
+        self.assertEqual(user.email, 'user@example.com')
+
+
+class TokenRevocationTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user',
+                                             password='S3cret-pass')
+        now = aware_utcnow()
+        OutstandingToken.objects.bulk_create([
+            OutstandingToken(user=self.user, jti=f'jti-{index}',
+                             token='token', created_at=now,
+                             expires_at=now + timedelta(days=index - 50))
+            for index in range(100)
+        ])
+        self.client.force_authenticate(self.user)
+
+    def test_logout_from_all_blacklists_in_bulk(self):
+        BlacklistedToken.objects.create(
+            token=OutstandingToken.objects.get(jti='jti-99'))
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/v1/logout-from-all/')
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(BlacklistedToken.objects.count(), 49)
+
+    def test_purge_tokens_removes_expired_tokens_in_batches(self):
+        self.client.post('/api/v1/logout-from-all/')
+        BlacklistedToken.objects.create(
+            token=OutstandingToken.objects.get(jti='jti-0'))
+        out = StringIO()
+        call_command('purge_tokens', batch_size=7, stdout=out)
+        self.assertIn('Purged 51 expired tokens', out.getvalue())
+        self.assertEqual(OutstandingToken.objects.count(), 49)
+        self.assertEqual(BlacklistedToken.objects.count(), 49)
+
+
+class PasswordHashingTests(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user',
+                                             password='S3cret-pass')
+
+    def login(self):
+        return self.client.post('/api/v1/login/', {
+            'username': 'user', 'password': 'S3cret-pass'})
+
+    def test_signup_hashes_with_the_configured_parameters(self):
+        response = self.client.post('/api/v1/signup/', {
+            'username': 'new', 'password': 'S3cret-pass',
+            'email': 'new@example.com', 'first_name': 'New',
+            'last_name': 'User'})
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(username='new')
+        params = hashing.Argon2PasswordHasher().decode(user.password)
+        self.assertEqual(
+            (params['algorithm'], params['time_cost'],
+             params['memory_cost'], params['parallelism']),
+            ('argon2', hashing.CONFIG['ARGON2']['TIME_COST'],
+             hashing.CONFIG['ARGON2']['MEMORY_COST'],
+             hashing.CONFIG['ARGON2']['PARALLELISM']))
+        self.assertTrue(user.check_password('S3cret-pass'))
+        self.assertFalse(user.check_password('wrong-pass'))
+
+    def test_login_updates_hash_of_other_parameters(self):
+        hasher = hashing.Argon2PasswordHasher()
+        hasher.time_cost = hasher.time_cost + 1
+        User.objects.filter(id=self.user.id).update(
+            password=hasher.encode('S3cret-pass', hasher.salt()))
+        self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(
+            hashing.Argon2PasswordHasher().decode(
+                self.user.password)['time_cost'],
+            hashing.CONFIG['ARGON2']['TIME_COST'])
+
+    def test_full_pool_answers_503_with_retry_after(self):
+        pool = hashing.HashingPool(1, 1, retry_after=3)
+        pool._slots.acquire()
+        with patch.object(hashing, 'pool', pool), \
+                patch.dict(hashing.CONFIG, WORKERS=1):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_admission_is_bounded(self):
+        pool = hashing.HashingPool(1, 2, retry_after=1)
+        release = threading.Event()
+        executor = ThreadPoolExecutor(2)
+        self.addCleanup(executor.shutdown)
+        with patch.object(pool, '_get_executor', return_value=executor):
+            threads = [threading.Thread(target=pool.run,
+                                        args=(release.wait,))
+                       for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            while pool._slots._value:
+                release.wait(0.01)
+            with self.assertRaises(hashing.HashingBusy):
+                pool.run(release.wait)
+            release.set()
+            for thread in threads:
+                thread.join()
+            self.assertTrue(pool.run(release.wait))
@@ -1,14 +1,11 @@
 from django.urls import path
 from . import views
 
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-)
+from rest_framework_simplejwt.views import TokenRefreshView
 
 urlpatterns = [
     path('signup/', views.CreateUserViewSet.as_view()),
-    path('login/', TokenObtainPairView.as_view(),
+    path('login/', views.LoginView.as_view(),
          name='token_obtain_pair'),
     path('login/refresh/', TokenRefreshView.as_view(),
          name='token_refresh'),
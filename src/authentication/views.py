@@ -5,6 +5,8 @@ from rest_framework_simplejwt.tokens import (RefreshToken,
                                              OutstandingToken,
                                              BlacklistedToken)
 from rest_framework.response import Response
+from rest_framework_simplejwt.utils import aware_utcnow
+from rest_framework_simplejwt.views import TokenObtainPairView
 
 from . import models
 from authentication.serializers import CreateUserSerializer
@@ -20,6 +22,14 @@ class CreateUserViewSet(generics.CreateAPIView):
     serializer_class = CreateUserSerializer
     queryset = models.User.objects.all()
     permission_classes = [~permissions.IsAuthenticated]
+    throttle_scope = 'signup'
+
+
+class LoginView(TokenObtainPairView):
+    """
+    Obtains a token pair, throttled under the `login` scope.
+    """
+    throttle_scope = 'login'
 
 
 class LogoutView(APIView):
@@ -40,8 +50,15 @@ class LogoutAllView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
-        tokens = OutstandingToken.objects.filter(user_id=request.user.id)
-        for token in tokens:
-            t, _ = BlacklistedToken.objects.get_or_create(token=token)
+        """
+        Blacklist every token of the user that is not expired yet,
+        in one bulk insert.
+        """
+        token_ids = OutstandingToken.objects.filter(
+            user_id=request.user.id, expires_at__gt=aware_utcnow()
+        ).order_by().values_list('id', flat=True)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token_id=token_id) for token_id in token_ids],
+            batch_size=1000, ignore_conflicts=True)
 
         return Response(status=status.HTTP_205_RESET_CONTENT)
@@ -0,0 +1,194 @@
+"""
+Async list and retrieve views of the projects, issues and comments,
+served under /api/v1/async/ with the output of their viewsets.
+
+Authentication, permission checks, serialization and rendering run on
+the event loop: only the queries leave it, through the async interface
+of the ORM, which runs each of them in the thread of the request. The
+querysets and serializers come from the viewsets, so the filters,
+`?fields=`, `?expand=`, both pagination modes and the ETags behave the
+same. The views render JSON only.
+"""
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404, HttpResponse
+from django.utils.http import parse_etags
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from authentication.authentication import CachedJWTAuthentication
+from . import compiled, metrics, replicas, utils, versions, views
+from .membership import aget_membership
+from .pagination import LimitOffsetOrCursorPagination, LimitOffsetPagination
+from .renderers import FastJSONRenderer
+
+JSON = 'application/json'
+
+
+class AsyncReadView(View):
+    """
+    Serves the `action`, list or retrieve, of `viewset`.
+
+    `member_kwarg` names the URL argument of the project the user must
+    be a contributor of.
+    """
+    viewset = None
+    action = None
+    member_kwarg = None
+    authentication_class = CachedJWTAuthentication
+    pagination_class = LimitOffsetPagination
+    http_method_names = ['get', 'head']
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            return await self.read(request)
+        except (exceptions.APIException, Http404) as exc:
+            return self.handle_exception(request, exc)
+
+    async def read(self, request):
+        replicas.allow_replica_reads()
+        view = self.viewset(request=request, args=(), kwargs=self.kwargs,
+                            action=self.action, format_kwarg=None)
+        await self.authenticate(request)
+        if 'issue_pk' in self.kwargs:
+            view._parents = await view.aresolve_parents(request)
+        with metrics.timed(request, 'permissions'):
+            await self.check_permissions(request)
+
+        etag = await self.get_etag(request, view)
+        if etag is not None:
+            if_none_match = request.headers.get('If-None-Match', '')
+            if etag in parse_etags(if_none_match) or if_none_match == '*':
+                response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+
+        cache = versions.get_cache()
+        cache_key = f'issuestracking:response:{etag}'
+        data = None
+        if etag is not None and versions.CONFIG['CACHE_RESPONSES']:
+            data = await cache.aget(cache_key)
+        if data is None:
+            data = await getattr(self, self.action)(request, view)
+            if etag is not None and versions.CONFIG['CACHE_RESPONSES']:
+                await cache.aset(cache_key, data,
+                                 versions.CONFIG['TIMEOUT'])
+        response = self.render(request, data)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+    async def authenticate(self, request):
+        authenticator = self.authentication_class()
+        result = await authenticator.aauthenticate(request)
+        if result is not None:
+            request.user, request.auth = result
+
+    async def check_permissions(self, request):
+        if not request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        if self.member_kwarg is None:
+            return
+        if await aget_membership(
+                request, self.kwargs[self.member_kwarg]) is None:
+            raise exceptions.PermissionDenied()
+
+    async def check_object_permissions(self, request, instance):
+        pass
+
+    async def get_etag(self, request, view):
+        """
+        Return the ETag of the read, as `utils.ConditionalReadMixin`.
+        """
+        if replicas.reading_from_replica():
+            return None
+        project_pk = self.kwargs.get(view.version_project_kwarg)
+        if await aget_membership(request, project_pk) is None:
+            return None
+        version = await versions.aget_project_version(project_pk)
+        return utils.project_etag(version, request, JSON)
+
+    async def list(self, request, view):
+        queryset = view.filter_queryset(view.get_queryset())
+        serializer = None
+        if compiled.CONFIG['ENABLED']:
+            serializer = compiled.compile_serializer(view.get_serializer())
+        if serializer is not None:
+            queryset = serializer.rows(
+                queryset, getattr(view, 'cursor_ordering', ()))
+        paginator = self.pagination_class()
+        page = await paginator.apaginate_queryset(queryset, request, view)
+        if page is None:
+            page = [row async for row in queryset]
+        if serializer is not None:
+            with metrics.timed(request, 'serializer'):
+                data = serializer.represent(page)
+        else:
+            data = view.get_serializer(page, many=True).data
+        return paginator.get_paginated_response(data).data
+
+    async def retrieve(self, request, view):
+        queryset = view.filter_queryset(view.get_queryset())
+        try:
+            instance = await queryset.aget(pk=self.kwargs['pk'])
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        with metrics.timed(request, 'permissions'):
+            await self.check_object_permissions(request, instance)
+        return view.get_serializer(instance).data
+
+    def render(self, request, data, status_code=status.HTTP_200_OK):
+        with metrics.timed(request, 'render'):
+            content = FastJSONRenderer().render(data, JSON, {})
+        return HttpResponse(content, status=status_code, content_type=JSON)
+
+    def handle_exception(self, request, exc):
+        """
+        Return the error response of DRF's exception handler.
+        """
+        if isinstance(exc, (exceptions.NotAuthenticated,
+                            exceptions.AuthenticationFailed)):
+            exc.auth_header = (
+                self.authentication_class().authenticate_header(request))
+        response = exception_handler(exc, {'view': self, 'request': request})
+        http_response = self.render(request, response.data,
+                                    response.status_code)
+        for header in ['WWW-Authenticate', 'Retry-After']:
+            if response.has_header(header):
+                http_response[header] = response[header]
+        return http_response
+
+
+class ProjectListView(AsyncReadView):
+    viewset = views.ProjectViewSet
+    action = 'list'
+
+
+class ProjectDetailView(AsyncReadView):
+    viewset = views.ProjectViewSet
+    action = 'retrieve'
+
+    async def check_object_permissions(self, request, instance):
+        if await aget_membership(request, instance.id) is None:
+            raise exceptions.PermissionDenied()
+
+
+class IssueListView(AsyncReadView):
+    viewset = views.IssueViewSet
+    action = 'list'
+    member_kwarg = 'project_pk'
+    pagination_class = LimitOffsetOrCursorPagination
+
+
+class IssueDetailView(IssueListView):
+    action = 'retrieve'
+
+
+class CommentListView(IssueListView):
+    viewset = views.CommentViewSet
+
+
+class CommentDetailView(CommentListView):
+    action = 'retrieve'
@@ -0,0 +1,212 @@
+"""
+Compiled read-only serialization of the list actions.
+
+`compile_serializer` turns the readable fields of a model serializer
+into the columns of a `values_list()` query and a function, generated
+once per layout of fields, building the same dicts as the serializer
+from the rows: plain values are copied, the conversions are limited to
+the datetimes, and nested serializers become nested dicts. No field
+object nor model instance is involved per row.
+
+Only the fields whose representation is known are compiled: plain model
+fields, slugs and keys of relations, nested model serializers of these.
+Any other field, or a serializer with its own `to_representation`
+besides `FormattedDateTimesMixin`, makes `compile_serializer` return
+None, and the view uses the serializer.
+
+Each `?fields=`/`?expand=` subset is a layout of its own, so only the
+CACHE_SIZE most recently used functions are kept.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import ISO_8601, api_settings
+
+from . import metrics
+from .serializers import FormattedDateTimesMixin
+
+CONFIG = {
+    'ENABLED': True,
+    'CACHE_SIZE': 256,
+}
+CONFIG.update(getattr(settings, 'COMPILED_LISTS', {}))
+
+# Fields rendering their value unchanged, as the database returns it.
+PLAIN_FIELDS = (serializers.CharField, serializers.IntegerField)
+
+REPRESENTATIONS = (serializers.Serializer.to_representation,
+                   FormattedDateTimesMixin.to_representation)
+
+
+@lru_cache(maxsize=CONFIG['CACHE_SIZE'])
+def _compile_function(source):
+    namespace = {}
+    exec(compile(source, '<compiled serializer>', 'exec'), namespace)
+    return namespace['represent']
+
+
+class CompiledSerializer:
+    """
+    The `columns` to load with `values_list()`, and `represent` to turn
+    the rows into the serializer's representations.
+    """
+
+    def __init__(self, columns, source, converters):
+        self.columns = columns
+        self.converters = converters
+        self._function = _compile_function(source)
+
+    def represent(self, rows):
+        return self._function(rows, *self.converters)
+
+    def rows(self, queryset, ordering=()):
+        """
+        Return `queryset` as named rows of the columns, and of the
+        `ordering` fields, for the cursor pagination to read its
+        position.
+        """
+        columns = self.columns + [
+            name.lstrip('-') for name in ordering
+            if name.lstrip('-') not in self.columns]
+        return queryset.values_list(*columns, named=True)
+
+
+def datetime_converter(field):
+    """
+    Return the conversion of `field.to_representation` for the aware
+    datetimes in the ISO 8601 format, the field itself for others.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    field_timezone = getattr(field, 'timezone', field.default_timezone())
+    if (output_format is None or output_format.lower() != ISO_8601
+            or field_timezone is None):
+        return field.to_representation
+
+    def convert(value):
+        if not value or value.tzinfo is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        if value.endswith('+00:00'):
+            return value[:-6] + 'Z'
+        return value
+    return convert
+
+
+def strftime_converter(output_format):
+    def convert(value):
+        return value.strftime(output_format)
+    return convert
+
+
+class _Compiler:
+
+    def __init__(self):
+        self.columns = []
+        self.converters = []
+
+    def column(self, name):
+        if name not in self.columns:
+            self.columns.append(name)
+        return f'row[{self.columns.index(name)}]'
+
+    def converted(self, expression, converter):
+        self.converters.append(converter)
+        return f'c{len(self.converters) - 1}({expression})'
+
+    def compile_dict(self, serializer, model, prefix=''):
+        """
+        Return the expression of the representation of `serializer`,
+        or None.
+        """
+        if type(serializer).to_representation not in REPRESENTATIONS:
+            return None
+        formats = getattr(serializer, 'datetime_formats', {})
+        items = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+            source = prefix + field.source
+            if isinstance(field, serializers.ModelSerializer):
+                if not model_field.is_relation:
+                    return None
+                key = self.column(source)
+                nested = self.compile_dict(field, model_field.related_model,
+                                           f'{source}__')
+                if nested is None:
+                    return None
+                expression = f'(None if {key} is None else {nested})'
+            elif isinstance(field, serializers.SlugRelatedField):
+                if not model_field.is_relation:
+                    return None
+                try:
+                    model_field.related_model._meta.get_field(
+                        field.slug_field)
+                except FieldDoesNotExist:
+                    return None
+                expression = self.column(f'{source}__{field.slug_field}')
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                if not model_field.is_relation or field.pk_field is not None:
+                    return None
+                expression = self.column(source)
+            elif name in formats:
+                expression = self.converted(self.column(source),
+                                            strftime_converter(formats[name]))
+            elif isinstance(field, serializers.DateTimeField):
+                expression = self.converted(self.column(source),
+                                            datetime_converter(field))
+            elif isinstance(field, serializers.ChoiceField):
+                if not all(isinstance(key, str) for key in field.choices):
+                    return None
+                expression = self.column(source)
+            elif isinstance(field, PLAIN_FIELDS):
+                expression = self.column(source)
+            else:
+                return None
+            items.append(f'{name!r}: {expression}')
+        return '{%s}' % ', '.join(items)
+
+
+def compile_serializer(serializer):
+    """
+    Return the `CompiledSerializer` of a model serializer instance, or
+    None if one of its fields can't be compiled.
+    """
+    compiler = _Compiler()
+    expression = compiler.compile_dict(serializer, serializer.Meta.model)
+    if expression is None:
+        return None
+    arguments = ''.join(f', c{index}'
+                        for index in range(len(compiler.converters)))
+    source = (f'def represent(rows{arguments}):\n'
+              f'    return [{expression} for row in rows]\n')
+    return CompiledSerializer(compiler.columns, source, compiler.converters)
+
+
+class CompiledListMixin:
+    """
+    Serves the `list` action with the compiled serializer when there is
+    one, see the module docstring.
+    """
+
+    def list(self, request, *args, **kwargs):
+        compiled = None
+        if CONFIG['ENABLED']:
+            compiled = compile_serializer(self.get_serializer())
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = compiled.rows(self.filter_queryset(self.get_queryset()),
+                                 getattr(self, 'cursor_ordering', ()))
+        page = self.paginate_queryset(queryset)
+        with metrics.timed(request, 'serializer'):
+            data = compiled.represent(queryset if page is None else page)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
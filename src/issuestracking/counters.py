@@ -0,0 +1,77 @@
+"""
+Denormalized counters of `Project` and `Issue`.
+
+Every change is a single `UPDATE ... SET counter = counter + delta`, so
+concurrent writers never lose an increment. The `reconcile_counters`
+command repairs any drift left by writes that bypass these helpers.
+"""
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import models
+
+
+def increment(field, delta):
+    """
+    Return the expression adding `delta` to `field`, never going below 0
+    even if the counter already drifted.
+    """
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def add_to_project(project_id, **deltas):
+    """
+    Add the given deltas to the counters of a project, e.g.
+    `add_to_project(1, issues_count=1, open_issues_count=1)`.
+    """
+    deltas = {field: increment(field, delta)
+              for field, delta in deltas.items() if delta}
+    if project_id is not None and deltas:
+        models.Project.objects.filter(pk=project_id).update(**deltas)
+
+
+def add_to_issue(issue_id, comments_delta):
+    """
+    Add `comments_delta` to the comment count of an issue and record the
+    activity.
+    """
+    if issue_id is not None:
+        now = timezone.now()
+        models.Issue.objects.filter(pk=issue_id).update(
+            comments_count=increment('comments_count', comments_delta),
+            last_activity_time=now, updated_time=now)
+
+
+def issue_saved(issue, created):
+    loaded_status = issue.loaded_value('status')
+    if created:
+        add_to_project(issue.project_id, issues_count=1,
+                       open_issues_count=int(issue.is_open))
+    elif loaded_status is not None and loaded_status != issue.status:
+        was_open = loaded_status != models.Issue.DONE
+        add_to_project(issue.project_id,
+                       open_issues_count=int(issue.is_open) - int(was_open))
+
+
+def issue_deleted(issue):
+    add_to_project(issue.project_id, issues_count=-1,
+                   open_issues_count=-int(issue.is_open))
+
+
+def comment_saved(comment):
+    loaded_issue_id = getattr(comment, '_loaded_issue_id', None)
+    if loaded_issue_id != comment.issue_id:
+        add_to_issue(loaded_issue_id, -1)
+        add_to_issue(comment.issue_id, 1)
+    elif comment.issue_id is not None:
+        now = timezone.now()
+        models.Issue.objects.filter(pk=comment.issue_id).update(
+            last_activity_time=now, updated_time=now)
+    comment._loaded_issue_id = comment.issue_id
+
+
+def comment_deleted(comment):
+    add_to_issue(comment.issue_id, -1)
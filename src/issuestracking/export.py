@@ -0,0 +1,67 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import models
+
+EXPORT_FIELDS = {
+    'issue_id': 'id',
+    'issue_title': 'title',
+    'issue_description': 'description',
+    'issue_tag': 'tag',
+    'issue_priority': 'priority',
+    'issue_status': 'status',
+    'issue_author': 'author_user__username',
+    'issue_assignee': 'assignee_user__username',
+    'issue_created_time': 'created_time',
+    'comment_id': 'comment_issue__id',
+    'comment_description': 'comment_issue__description',
+    'comment_author': 'comment_issue__author_user__username',
+    'comment_created_time': 'comment_issue__created_time',
+}
+
+
+class Echo:
+    """
+    An object that implements just the write method of the file-like
+    interface, so that `csv.writer` hands back each formatted line.
+    """
+
+    def write(self, value):
+        return value
+
+
+def export_rows(project_id, chunk_size=2000):
+    """
+    Yield one tuple per comment of the project issues, following the
+    order of `EXPORT_FIELDS`. Issues without comments yield one row with
+    empty comment columns.
+
+    Rows are read through a server-side iterator, so memory does not
+    depend on the size of the project.
+    """
+    return models.Issue.objects.filter(
+        project_id=project_id
+    ).order_by('id', 'comment_issue__id').values_list(
+        *EXPORT_FIELDS.values()
+    ).iterator(chunk_size=chunk_size)
+
+
+def stream_ndjson(rows):
+    names = list(EXPORT_FIELDS)
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', stream_ndjson),
+    'csv': ('text/csv', stream_csv),
+}
@@ -0,0 +1,45 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from . import models
+
+
+class IssueFilterBackend(BaseFilterBackend):
+    """
+    Filters the issues on `status`, `priority`, `tag` and `assignee_user`
+    (a username) and orders them with `ordering`.
+
+    Every filter combined with the project maps onto one of the
+    (project, <field>, created_time) indexes of `Issue`.
+    """
+    choice_filters = {
+        'status': models.Issue.STATUS_CHOICES,
+        'priority': models.Issue.PRIORITY_CHOICES,
+        'tag': models.Issue.TAG_CHOICES,
+    }
+    ordering_fields = ['created_time', 'id', 'status', 'priority', 'tag']
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        for field, choices in self.choice_filters.items():
+            if field in params:
+                value = params[field]
+                if value not in dict(choices):
+                    raise ValidationError(
+                        {field: f"Choose among {list(dict(choices))}."})
+                queryset = queryset.filter(**{field: value})
+        if 'assignee_user' in params:
+            queryset = queryset.filter(
+                assignee_user__username=params['assignee_user'])
+
+        ordering = params.get(self.ordering_param)
+        if ordering:
+            fields = [field.strip() for field in ordering.split(',')]
+            for field in fields:
+                if field.lstrip('-') not in self.ordering_fields:
+                    raise ValidationError({self.ordering_param: (
+                        f"Choose among {self.ordering_fields}, "
+                        f"prefixed by '-' for a descending order.")})
+            queryset = queryset.order_by(*fields, 'id')
+        return queryset
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models
+from .benchmark_endpoints import percentile
+
+ROUTES = {
+    'projects-list': 'projects/',
+    'projects-detail': 'projects/{project}/',
+    'issues-list': 'projects/{project}/issues/',
+    'issues-detail': 'projects/{project}/issues/{issue}/',
+    'comments-list': 'projects/{project}/issues/{issue}/comments/',
+    'comments-detail':
+        'projects/{project}/issues/{issue}/comments/{comment}/',
+}
+PREFIXES = {
+    'sync': '/api/v1/',
+    'async': '/api/v1/async/',
+}
+
+
+async def send_request(application, url, headers):
+    """
+    Send a GET to the ASGI `application` and return the response status.
+    """
+    url = urlsplit(url)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'root_path': '',
+        'path': url.path, 'raw_path': url.path.encode(),
+        'query_string': url.query.encode(),
+        'headers': [(b'host', b'testserver')] + headers,
+        'client': ('127.0.0.1', 0), 'server': ('testserver', 80),
+    }
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+async def run(application, url, headers, requests, concurrency):
+    """
+    Send `requests` GET to `url` with at most `concurrency` in flight.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            status = await send_request(application, url, headers)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    return {
+        'requests_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 1),
+        'errors': errors,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Compares the requests/sec and latency of the sync and async '
+            'list and retrieve views under concurrent clients, through '
+            'the ASGI application in the process. Seed the project '
+            'first, see seed_data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to read, by default the one with '
+                                 'the most issues.')
+        parser.add_argument('--requests', type=int, default=2000,
+                            help='Requests per route and mode.')
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--only', nargs='*', default=None,
+                            help='Names of the routes to measure.')
+
+    def handle(self, *args, project, requests, concurrency, warmup, only,
+               **options):
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        comment = project and models.Comment.objects.filter(
+            issue__project=project).order_by('id').first()
+        if comment is None:
+            raise CommandError('No project with a comment found, see '
+                               'seed_data.')
+        user = project.projects.first().user
+        token = RefreshToken.for_user(user).access_token
+        headers = [(b'authorization', f'Bearer {token}'.encode())]
+        application = ASGIHandler()
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, route in ROUTES.items():
+                if only is not None and name not in only:
+                    continue
+                route = route.format(project=project.id,
+                                     issue=comment.issue_id,
+                                     comment=comment.id)
+                results[name] = {}
+                for mode, prefix in PREFIXES.items():
+                    url = f'{prefix}{route}'
+                    if warmup:
+                        asyncio.run(run(application, url, headers, warmup,
+                                        concurrency))
+                    results[name][mode] = asyncio.run(run(
+                        application, url, headers, requests, concurrency))
+
+        self.stdout.write(json.dumps({
+            'issues': project.issues_count,
+            'concurrency': concurrency,
+            'requests': requests,
+            'results': results,
+        }, indent=2))
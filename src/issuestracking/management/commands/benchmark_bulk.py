@@ -0,0 +1,95 @@
+import json
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models, throttling
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Compares creating and then updating --items issues with one '
+            'request per issue and with the bulk-create and bulk-update '
+            'actions. The rows are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=200)
+
+    def handle(self, *args, items, **options):
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                patch.dict(throttling.CONFIG, ENABLED=False), \
+                transaction.atomic():
+            user = User.objects.create(username='benchmark-bulk')
+            project = models.Project.objects.create(
+                title='Benchmark bulk', description='desc', type='back-end')
+            models.Contributor.objects.create(
+                user=user, project=project,
+                permission=models.Contributor.CREATOR)
+            token = RefreshToken.for_user(user).access_token
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            url = f'/api/v1/projects/{project.id}/issues/'
+
+            def issue_data(prefix, index):
+                return {'title': f'{prefix} {index}', 'description': 'desc',
+                        'assignee_user': user.username}
+
+            def timed(run):
+                started = time.perf_counter()
+                statuses = run()
+                elapsed = time.perf_counter() - started
+                return {'requests': len(statuses),
+                        'status': sorted(set(statuses)),
+                        'ms': round(elapsed * 1000, 1),
+                        'ms_per_item': round(elapsed * 1000 / items, 2)}
+
+            single_ids = []
+
+            def create_each():
+                statuses = []
+                for index in range(items):
+                    response = client.post(url, issue_data('Single', index))
+                    single_ids.append(response.json()['id'])
+                    statuses.append(response.status_code)
+                return statuses
+
+            def update_each():
+                return [client.put(f'{url}{issue_id}/', {
+                    **issue_data('Single', index),
+                    'status': models.Issue.DONE},
+                    content_type='application/json').status_code
+                    for index, issue_id in enumerate(single_ids)]
+
+            bulk_ids = []
+
+            def create_bulk():
+                response = client.post(
+                    f'{url}bulk-create/',
+                    [issue_data('Bulk', index) for index in range(items)],
+                    content_type='application/json')
+                bulk_ids.extend(result['id']
+                                for result in response.json()['results'])
+                return [response.status_code]
+
+            def update_bulk():
+                return [client.post(
+                    f'{url}bulk-update/',
+                    [{'id': issue_id, 'status': models.Issue.DONE}
+                     for issue_id in bulk_ids],
+                    content_type='application/json').status_code]
+
+            results = {
+                'create_each': timed(create_each),
+                'bulk_create': timed(create_bulk),
+                'update_each': timed(update_each),
+                'bulk_update': timed(update_bulk),
+            }
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps({'items': items, 'results': results},
+                                     indent=2))
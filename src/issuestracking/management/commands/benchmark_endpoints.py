@@ -0,0 +1,266 @@
+import json
+import statistics
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models, throttling
+
+User = get_user_model()
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def build_scenarios(project, issue, comment, contributor, outsider, owner,
+                    refresh, password):
+    """
+    Return the (name, method, path, data, anonymous) of a request to
+    every route of the issuestracking and authentication URLs, sent by
+    `owner` unless anonymous.
+    """
+    api = '/api/v1'
+    projects = f'{api}/projects'
+    issues = f'{projects}/{project.id}/issues'
+    comments = f'{issues}/{issue.id}/comments'
+    async_projects = f'{api}/async/projects'
+    async_issues = f'{async_projects}/{project.id}/issues'
+    async_comments = f'{async_issues}/{issue.id}/comments'
+    username = contributor.user.username
+    project_data = {'title': 'Benchmark project', 'description': 'desc',
+                    'type': 'back-end'}
+    issue_data = {'title': 'Benchmark issue', 'description': 'desc',
+                  'assignee_user': username}
+    return [
+        ('api-root', 'get', f'{api}/', None, False),
+        ('projects-list', 'get', f'{projects}/', None, False),
+        ('projects-create', 'post', f'{projects}/', project_data, False),
+        ('projects-detail', 'get', f'{projects}/{project.id}/', None, False),
+        ('projects-update', 'put', f'{projects}/{project.id}/',
+         {**project_data, 'title': project.title}, False),
+        ('projects-delete', 'delete', f'{projects}/{project.id}/', None,
+         False),
+        ('projects-export', 'get', f'{projects}/{project.id}/export/', None,
+         False),
+        ('projects-stats', 'get', f'{projects}/{project.id}/stats/', None,
+         False),
+        ('contributors-list', 'get', f'{projects}/{project.id}/users/', None,
+         False),
+        ('contributors-create', 'post', f'{projects}/{project.id}/users/',
+         {'user': outsider.username if outsider else '',
+          'permission': models.Contributor.CONTRIBUTOR,
+          'role': models.Contributor.PROJECT_STAFF}, False),
+        ('contributors-detail', 'get',
+         f'{projects}/{project.id}/users/{contributor.id}/', None, False),
+        ('contributors-delete', 'delete',
+         f'{projects}/{project.id}/users/{contributor.id}/', None, False),
+        ('issues-list', 'get', f'{issues}/', None, False),
+        ('issues-create', 'post', f'{issues}/', issue_data, False),
+        ('issues-detail', 'get', f'{issues}/{issue.id}/', None, False),
+        ('issues-update', 'put', f'{issues}/{issue.id}/',
+         {**issue_data, 'title': issue.title}, False),
+        ('issues-delete', 'delete', f'{issues}/{issue.id}/', None, False),
+        ('issues-facets', 'get', f'{issues}/facets/', None, False),
+        ('issues-search', 'get', f'{issues}/search/?q=login', None, False),
+        ('issues-bulk-create', 'post', f'{issues}/bulk-create/',
+         [{**issue_data, 'title': f'Benchmark issue {index}'}
+          for index in range(10)], False),
+        ('issues-bulk-update', 'post', f'{issues}/bulk-update/',
+         [{'id': issue.id, 'status': models.Issue.DOING}], False),
+        ('comments-list', 'get', f'{comments}/', None, False),
+        ('comments-create', 'post', f'{comments}/',
+         {'description': 'Benchmark comment'}, False),
+        ('comments-detail', 'get', f'{comments}/{comment.id}/', None, False),
+        ('comments-update', 'put', f'{comments}/{comment.id}/',
+         {'description': 'Benchmark comment'}, False),
+        ('comments-delete', 'delete', f'{comments}/{comment.id}/', None,
+         False),
+        ('async-projects-list', 'get', f'{async_projects}/', None, False),
+        ('async-projects-detail', 'get', f'{async_projects}/{project.id}/',
+         None, False),
+        ('async-issues-list', 'get', f'{async_issues}/', None, False),
+        ('async-issues-detail', 'get', f'{async_issues}/{issue.id}/', None,
+         False),
+        ('async-comments-list', 'get', f'{async_comments}/', None, False),
+        ('async-comments-detail', 'get',
+         f'{async_comments}/{comment.id}/', None, False),
+        ('signup', 'post', f'{api}/signup/',
+         {'username': 'benchmark-signup', 'password': password,
+          'email': 'benchmark@example.com',
+          'first_name': 'Bench', 'last_name': 'Mark'}, True),
+        ('login', 'post', f'{api}/login/',
+         {'username': owner.username, 'password': password}, True),
+        ('login-refresh', 'post', f'{api}/login/refresh/',
+         {'refresh': str(refresh)}, True),
+        ('logout', 'post', f'{api}/logout/',
+         {'refresh_token': str(refresh)}, False),
+        ('logout-from-all', 'post', f'{api}/logout-from-all/', None, False),
+    ]
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """
+    Return the regressions of `results` against `baseline`: a p95 slower
+    by more than `tolerance` and `min_delta_ms`, more queries or another
+    status.
+    """
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        slower = result['p95_ms'] - base['p95_ms']
+        if (slower > min_delta_ms
+                and result['p95_ms'] > base['p95_ms'] * (1 + tolerance)):
+            regressions.append(
+                f'{name}: p95 {base["p95_ms"]} ms -> {result["p95_ms"]} ms')
+        if result['queries'] > base['queries']:
+            regressions.append(
+                f'{name}: {base["queries"]} -> {result["queries"]} queries')
+        if result['status'] != base['status']:
+            regressions.append(
+                f'{name}: status {base["status"]} -> {result["status"]}')
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ('Measures the latency and query count of every API route '
+            'through the Django test client, and compares them to a '
+            'baseline. Writes are rolled back after each request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to query, by default the one '
+                                 'with the most issues.')
+        parser.add_argument('--password', default='S3cret-pass',
+                            help='Password of the project creator, for the '
+                                 'login route.')
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Measured requests per route.')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', nargs='*', default=None,
+                            help='Names of the routes to measure.')
+        parser.add_argument('--output', default=None,
+                            help='File to write the results to, to use as '
+                                 'a later baseline.')
+        parser.add_argument('--baseline', default=None,
+                            help='Results file to compare against.')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 slowdown ratio.')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Ignore p95 slowdowns below this.')
+
+    def handle(self, *args, project, password, requests, warmup, only,
+               output, baseline, tolerance, min_delta_ms, **options):
+        project = self.get_project(project)
+        owner = project.projects.filter(
+            permission=models.Contributor.CREATOR).first().user
+        refresh = RefreshToken.for_user(owner)
+        # The update and delete routes need an issue and a comment of
+        # the request user, other routes only need them to exist.
+        comments = models.Comment.objects.select_related('issue').filter(
+            issue__project=project).order_by('id')
+        comment = (comments.filter(author_user=owner,
+                                   issue__author_user=owner).first()
+                   or comments.first())
+        contributor = project.projects.exclude(
+            user=owner).order_by('id').first()
+        if comment is None or contributor is None:
+            raise CommandError('The project needs an issue with a comment '
+                               'and two contributors, see seed_data.')
+        issue = comment.issue
+        outsider = User.objects.exclude(
+            users__project=project).order_by('id').first()
+
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {refresh.access_token}'}
+        results = {}
+        # The repeated requests would hit the throttles.
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                patch.dict(throttling.CONFIG, ENABLED=False):
+            for name, method, path, data, anonymous in build_scenarios(
+                    project, issue, comment, contributor, outsider, owner,
+                    refresh, password):
+                if only is not None and name not in only:
+                    continue
+                results[name] = self.measure(
+                    method, path, data, {} if anonymous else headers,
+                    requests, warmup)
+
+        report = {'results': results}
+        if baseline is not None:
+            with open(baseline) as file:
+                report['regressions'] = compare(
+                    results, json.load(file)['results'], tolerance,
+                    min_delta_ms)
+        if output is not None:
+            with open(output, 'w') as file:
+                json.dump({'results': results}, file, indent=2)
+        self.stdout.write(json.dumps(report, indent=2))
+        if report.get('regressions'):
+            raise CommandError(
+                f'{len(report["regressions"])} regressions against '
+                f'{baseline}.')
+
+    def get_project(self, project_id):
+        projects = models.Project.objects.all()
+        if project_id is not None:
+            projects = projects.filter(id=project_id)
+        project = projects.order_by('-issues_count', 'id').first()
+        if project is None:
+            raise CommandError('No project found, see seed_data.')
+        return project
+
+    def measure(self, method, path, data, headers, requests, warmup):
+        """
+        Send the request `warmup + requests` times, each in a transaction
+        rolled back afterwards, and return the latency percentiles and
+        the queries per request of the measured ones.
+        """
+        client = Client()
+        latencies, queries, statuses = [], [], set()
+        for index in range(warmup + requests):
+            counter = QueryCounter()
+            with transaction.atomic(), \
+                    connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                if method == 'get':
+                    response = client.get(path, **headers)
+                else:
+                    response = getattr(client, method)(
+                        path, data=json.dumps(data) if data else '',
+                        content_type='application/json', **headers)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+                transaction.set_rollback(True)
+            if index >= warmup:
+                latencies.append(elapsed)
+                queries.append(counter.count)
+                statuses.add(response.status_code)
+        return {
+            'method': method.upper(),
+            'path': path,
+            'status': sorted(statuses),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries': max(queries),
+        }
@@ -0,0 +1,81 @@
+import json
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models, pagination
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Measures the latency of the first and of the last page of the '
+            'issue list of a project, with limit/offset and with the '
+            'cursor, as the project grows to each of --sizes issues. The '
+            'rows are rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10000, 100000, 1000000])
+        parser.add_argument('--limit', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, sizes, limit, repeat, batch_size, **options):
+        results = []
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                transaction.atomic():
+            user = User.objects.create(username='benchmark-pagination')
+            project = models.Project.objects.create(
+                title='Benchmark pagination', description='desc',
+                type='back-end')
+            models.Contributor.objects.create(user=user, project=project)
+            token = RefreshToken.for_user(user).access_token
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+            url = f'/api/v1/projects/{project.id}/issues/'
+
+            def measure(params):
+                durations = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response = client.get(f'{url}?{urlencode(params)}')
+                    durations.append(time.perf_counter() - started)
+                assert len(response.json()['results']) == limit
+                return round(statistics.median(durations) * 1000, 2)
+
+            issues = 0
+            for size in sorted(sizes):
+                while issues < size:
+                    count = min(batch_size, size - issues)
+                    models.Issue.objects.bulk_create([
+                        models.Issue(title=f'Benchmark {index}',
+                                     description='desc', project=project,
+                                     author_user=user)
+                        for index in range(issues, issues + count)])
+                    issues += count
+                depth = size - limit
+                position = list(models.Issue.objects.filter(
+                    project=project).order_by('created_time', 'id')
+                    .values_list('created_time', 'id')[depth - 1])
+                cursor = pagination.encode_cursor(
+                    pagination.Cursor(False, position))
+                results.append({
+                    'issues': size,
+                    'offset_first_ms': measure({'limit': limit}),
+                    'offset_last_ms': measure({'limit': limit,
+                                               'offset': depth}),
+                    'cursor_first_ms': measure({'limit': limit,
+                                                'cursor': ''}),
+                    'cursor_last_ms': measure({'limit': limit,
+                                               'cursor': cursor}),
+                })
+            transaction.set_rollback(True)
+        self.stdout.write(json.dumps({'limit': limit, 'results': results},
+                                     indent=2))
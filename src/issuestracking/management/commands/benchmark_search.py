@@ -0,0 +1,84 @@
+import json
+import statistics
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models
+
+BACKENDS = {
+    'fts5': 'issuestracking.search.SQLiteFTS5Backend',
+    'icontains': 'issuestracking.search.QuerySetSearchBackend',
+}
+RARE_TERM = 'zeppelin'
+
+
+class Command(BaseCommand):
+    help = ('Measures the search of a project with the FTS5 index and with '
+            'the icontains scan, for a rare term, a term of every seeded '
+            'sentence, and both. Seed the project first, e.g. seed_data '
+            '--projects 1 --issues 10000 --comments 100 for 1M comments. '
+            'The rare term is added to --rare comments, rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to search, by default the one '
+                                 'with the most issues.')
+        parser.add_argument('--rare', type=int, default=10,
+                            help='Comments holding the rare term.')
+        parser.add_argument('--common', default='login',
+                            help='Term of the seeded sentences.')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, project, rare, common, limit, repeat,
+               **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        if project is None or not project.issues_count:
+            raise CommandError('No project with issues found, see '
+                               'seed_data.')
+        user = project.projects.first().user
+        token = RefreshToken.for_user(user).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        url = f'/api/v1/projects/{project.id}/issues/search/'
+        comments = models.Comment.objects.filter(issue__project=project)
+
+        def measure(query):
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.get(
+                    f'{url}?{urlencode({"q": query, "limit": limit})}')
+                durations.append(time.perf_counter() - started)
+            return {'results': len(response.json()['results']),
+                    'ms': round(statistics.median(durations) * 1000, 2)}
+
+        queries = {'rare': RARE_TERM, 'common': common,
+                   'rare_and_common': f'{RARE_TERM} {common}'}
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                transaction.atomic():
+            for comment in comments.order_by('id')[:rare]:
+                comment.description = (
+                    f'{comment.description} {RARE_TERM}')[-256:]
+                comment.save()
+            for name, backend in BACKENDS.items():
+                with override_settings(SEARCH_BACKEND=backend):
+                    results[name] = {case: measure(query)
+                                     for case, query in queries.items()}
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({
+            'issues': project.issues_count,
+            'comments': comments.count(),
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,75 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from issuestracking import compiled, models, renderers, serializers
+
+
+class Command(BaseCommand):
+    help = ('Measures the serialization and rendering of the issues of a '
+            'project with the DRF serializer, the compiled serializer and '
+            'the fast JSON renderer, and checks that they output the same '
+            'bytes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to serialize the issues of, by '
+                                 'default the one with the most issues.')
+        parser.add_argument('--issues', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, project, issues, repeat, **options):
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        if project is None or project.issues_count < issues:
+            raise CommandError(f'No project with {issues} issues found, see '
+                               'seed_data.')
+        user = project.projects.first().user
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user)
+        request = Request(request)
+        serializer = serializers.IssueSerializer(context={
+            'request': request, 'view_action': 'list',
+            'project_pk': project.id})
+        queryset = models.Issue.objects.filter(
+            project=project).order_by('id')[:issues]
+
+        def drf():
+            instances = list(queryset.select_related(
+                'project', 'assignee_user'))
+            return serializers.IssueSerializer(
+                instances, many=True, context=serializer.context).data
+
+        def fast():
+            plan = compiled.compile_serializer(serializer)
+            return plan.represent(queryset.values_list(*plan.columns))
+
+        results, outputs = {}, {}
+        for name, build, renderer in [
+                ('drf', drf, JSONRenderer()),
+                ('compiled', fast, JSONRenderer()),
+                ('compiled_orjson', fast, renderers.FastJSONRenderer())]:
+            serialize_times, render_times = [], []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                data = build()
+                serialized = time.perf_counter()
+                outputs[name] = renderer.render(data)
+                serialize_times.append(serialized - started)
+                render_times.append(time.perf_counter() - serialized)
+            results[name] = {
+                'serialize_ms': round(
+                    statistics.median(serialize_times) * 1000, 1),
+                'render_ms': round(statistics.median(render_times) * 1000, 1),
+                'bytes': len(outputs[name]),
+            }
+        if len(set(outputs.values())) != 1:
+            raise CommandError('The outputs differ.')
+        self.stdout.write(json.dumps({'issues': issues, 'results': results},
+                                     indent=2))
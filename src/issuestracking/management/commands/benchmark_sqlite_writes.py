@@ -0,0 +1,120 @@
+import json
+import random
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models, sqlite, throttling
+from issuestracking.management.commands.benchmark_endpoints import percentile
+
+
+class Command(BaseCommand):
+    help = ('Sends concurrent issue and comment creations, with concurrent '
+            'readers, to the SQLite database from several threads, and '
+            'reports the throughput and error rate. Use it once without '
+            'and once with --profile. The rows it creates are kept.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to write to, by default the one '
+                                 'with the most issues.')
+        parser.add_argument('--writers', type=int, default=16)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Creations per writer.')
+        parser.add_argument('--profile', action='store_true',
+                            help='Apply the production SQLite profile.')
+
+    def handle(self, *args, project, writers, readers, requests, profile,
+               **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('The default database is not SQLite.')
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        issue_ids = list(project.issue_set.values_list('id', flat=True)
+                         if project else [])
+        if not issue_ids:
+            raise CommandError('No project with issues found, see '
+                               'seed_data.')
+        members = list(project.projects.select_related('user'))
+
+        sqlite.CONFIG['ENABLED'] = profile
+        # The journal mode is persistent: set the one of the mode measured.
+        connection.close()
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode = %s'
+                           % ('WAL' if profile else 'DELETE'))
+
+        tokens = {member.user.id: RefreshToken.for_user(member.user)
+                  .access_token for member in members}
+        latencies, statuses = [], []
+        run = f'{time.time():.0f}'
+
+        def write(worker):
+            member = random.choice(members)
+            client = Client(raise_request_exception=False)
+            headers = {'HTTP_AUTHORIZATION':
+                       f'Bearer {tokens[member.user.id]}'}
+            base = f'/api/v1/projects/{project.id}/issues/'
+            for index in range(requests):
+                if index % 2:
+                    path = f'{base}{random.choice(issue_ids)}/comments/'
+                    data = {'description': 'Benchmark comment'}
+                else:
+                    path = base
+                    data = {'title': f'Write {run}-{worker}-{index}',
+                            'description': 'Benchmark issue',
+                            'assignee_user': member.user.username}
+                started = time.perf_counter()
+                try:
+                    status = client.post(path, data, **headers).status_code
+                except Exception:
+                    # e.g. "database is locked" out of the view.
+                    status = 500
+                latencies.append(time.perf_counter() - started)
+                statuses.append(status)
+            connection.close()
+
+        def read(stop):
+            client = Client(raise_request_exception=False)
+            token = tokens[members[0].user.id]
+            while not stop.is_set():
+                client.get(f'/api/v1/projects/{project.id}/issues/',
+                           HTTP_AUTHORIZATION=f'Bearer {token}')
+            connection.close()
+
+        stop = threading.Event()
+        # The write bursts would hit the throttles.
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                patch.dict(throttling.CONFIG, ENABLED=False):
+            reader_threads = [threading.Thread(target=read, args=(stop,))
+                              for _ in range(readers)]
+            writer_threads = [threading.Thread(target=write, args=(index,))
+                              for index in range(writers)]
+            started = time.perf_counter()
+            for thread in reader_threads + writer_threads:
+                thread.start()
+            for thread in writer_threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+            stop.set()
+            for thread in reader_threads:
+                thread.join()
+
+        errors = sum(status >= 400 for status in statuses)
+        self.stdout.write(json.dumps({
+            'profile': profile,
+            'writes': len(statuses),
+            'writes_per_second': round(len(statuses) / elapsed, 1),
+            'error_rate': round(errors / len(statuses), 4),
+            'p50_ms': round(statistics.median(latencies) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        }, indent=2))
@@ -0,0 +1,107 @@
+import json
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from issuestracking import models, stats
+
+
+def aggregate_issues(project_id, since, until):
+    """
+    Build the breakdowns and the daily creations of a project from its
+    issue rows, the way the statistics were computed without summary.
+    """
+    issues = models.Issue.objects.filter(project_id=project_id)
+    result = {'since': since, 'until': until}
+    for field in stats.DISTRIBUTIONS:
+        result[field] = dict(issues.order_by().values(field).annotate(
+            count=Count('id')).values_list(field, 'count'))
+    result['daily'] = list(issues.filter(
+        created_time__date__range=(since, until)
+    ).annotate(day=TruncDate('created_time')).order_by('day').values(
+        'day').annotate(created=Count('id')))
+    return result
+
+
+class Command(BaseCommand):
+    help = ('Compares the statistics of a project read from its daily '
+            'summary with an aggregate of its issue rows, once the issues '
+            'are spread over --days days. Seed the project first, see '
+            'seed_data. The spread is rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to measure, by default the one '
+                                 'with the most issues.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days the issue creations span.')
+        parser.add_argument('--period', type=int, default=30,
+                            help='Days of the statistics read.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, project, days, period, repeat, **options):
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        if project is None or not project.issues_count:
+            raise CommandError('No project with issues found, see '
+                               'seed_data.')
+        until = timezone.localdate()
+        since = until - timedelta(days=period - 1)
+
+        def measure(build):
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                build(project.id, since, until)
+                durations.append(time.perf_counter() - started)
+            return {'ms': round(statistics.median(durations) * 1000, 1)}
+
+        with transaction.atomic():
+            self.spread_issues(project, days)
+            results = {
+                'issue_aggregate': measure(aggregate_issues),
+                'summary': measure(stats.project_summary),
+            }
+            summary_rows = project.daily_stats.count()
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({
+            'issues': project.issues_count,
+            'days': days,
+            'period': period,
+            'summary_rows': summary_rows,
+            'results': results,
+        }, indent=2))
+
+    def spread_issues(self, project, days):
+        """
+        Move the creation of the issues of the project over the last
+        `days` days, and rebuild its summary rows accordingly.
+        """
+        now = timezone.now()
+        fields = models.Issue.tracked_fields
+        issues = list(project.issue_set.order_by('id').values('id', *fields))
+        project.daily_stats.all().delete()
+        for offset in range(days):
+            spread = issues[offset::days]
+            if not spread:
+                break
+            created_time = now - timedelta(days=offset)
+            models.Issue.objects.filter(
+                id__in=[issue['id'] for issue in spread]).update(
+                created_time=created_time)
+            deltas = Counter()
+            for issue in spread:
+                deltas.update(stats.issue_deltas(
+                    None, {field: issue[field] for field in fields},
+                    created_time, created_time))
+            stats.record(project.id, timezone.localdate(created_time),
+                         deltas)
@@ -0,0 +1,123 @@
+import json
+import statistics
+import time
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from issuestracking import models, throttling
+
+
+class Command(BaseCommand):
+    help = ('Compares the bytes and server time of a delta sync of a '
+            'project after a few changes with a full sync and with a full '
+            're-fetch of its issue and comment lists. The changes are '
+            'rolled back.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, default=None,
+                            help='Project to sync, by default the one with '
+                                 'the most issues.')
+        parser.add_argument('--updates', type=int, default=10,
+                            help='Issues updated.')
+        parser.add_argument('--comments', type=int, default=5,
+                            help='Comments added.')
+        parser.add_argument('--deletes', type=int, default=2,
+                            help='Issues deleted.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, project, updates, comments, deletes, repeat,
+               **options):
+        project = models.Project.objects.filter(
+            **({'id': project} if project else {})
+        ).order_by('-issues_count', 'id').first()
+        if project is None or project.issues_count < updates + deletes:
+            raise CommandError('No project with enough issues found, see '
+                               'seed_data.')
+        user = project.projects.first().user
+        token = RefreshToken.for_user(user).access_token
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {token}')
+        changes_url = f'/api/v1/projects/{project.id}/changes/'
+        issues_url = f'/api/v1/projects/{project.id}/issues/'
+
+        def fetch_all(url):
+            """
+            Return the rows of every page of a list, the requests and
+            the bytes read.
+            """
+            rows, requests, size = [], 0, 0
+            while url:
+                response = client.get(url)
+                requests, size = requests + 1, size + len(response.content)
+                page = response.json()
+                rows += page['results']
+                url = page['next']
+            return rows, requests, size
+
+        def refetch():
+            issues, requests, size = fetch_all(f'{issues_url}?limit=100')
+            for issue in issues:
+                _, issue_requests, issue_size = fetch_all(
+                    f'{issues_url}{issue["id"]}/comments/?limit=100')
+                requests, size = requests + issue_requests, size + issue_size
+            return requests, size
+
+        def sync(since=None):
+            """
+            Return the requests and bytes of a sync, every page of a full
+            one, and the token of the next sync.
+            """
+            requests, size, partial = 0, 0, True
+            while partial:
+                response = client.get(
+                    changes_url if since is None else
+                    f'{changes_url}?since={since}')
+                requests, size = requests + 1, size + len(response.content)
+                page = response.json()
+                since, partial = page['token'], page['partial']
+            return requests, size, since
+
+        def measure(run):
+            durations = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                requests, size, *_ = run()
+                durations.append(time.perf_counter() - started)
+            return {'requests': requests, 'bytes': size,
+                    'ms': round(statistics.median(durations) * 1000, 1)}
+
+        with override_settings(ALLOWED_HOSTS=['testserver']), \
+                patch.dict(throttling.CONFIG, ENABLED=False), \
+                transaction.atomic():
+            _, _, since = sync()
+            issues = list(models.Issue.objects.filter(
+                project=project).order_by('id')[:updates + deletes])
+            for issue in issues[:updates]:
+                issue.priority = models.Issue.HIGH
+                issue.save()
+            commented = issues[:updates] or issues
+            for index in range(comments):
+                models.Comment.objects.create(
+                    description=f'Benchmark comment {index}',
+                    issue=commented[index % len(commented)],
+                    author_user=user)
+            for issue in issues[updates:]:
+                issue.delete()
+
+            results = {
+                'full_refetch': measure(refetch),
+                'full_sync': measure(sync),
+                'delta_sync': measure(lambda: sync(since)),
+            }
+            transaction.set_rollback(True)
+
+        self.stdout.write(json.dumps({
+            'issues': project.issues_count,
+            'changes': {'updates': updates, 'comments': comments,
+                        'deletes': deletes},
+            'results': results,
+        }, indent=2))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from issuestracking import sync
+
+
+class Command(BaseCommand):
+    help = ('Deletes the tombstones of the delta sync older than '
+            'SYNC["TOMBSTONE_DAYS"]. Run it daily.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {sync.purge_tombstones()} tombstones.')
@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from issuestracking import models
+
+
+def count_subquery(model, field, **filters):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}, **filters)
+        .order_by().values(field).annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+PROJECT_COUNTERS = {
+    'issues_count': lambda: count_subquery(models.Issue, 'project'),
+    'open_issues_count': lambda: count_subquery(
+        models.Issue, 'project', status__in=[models.Issue.TODO,
+                                             models.Issue.DOING]),
+    'contributors_count': lambda: count_subquery(models.Contributor,
+                                                 'project'),
+}
+
+ISSUE_COUNTERS = {
+    'comments_count': lambda: count_subquery(models.Comment, 'issue'),
+    'last_activity_time': lambda: Greatest(F('last_activity_time'), Coalesce(
+        Subquery(models.Comment.objects.filter(issue=OuterRef('pk'))
+                 .order_by().values('issue')
+                 .annotate(last=Max('created_time')).values('last')),
+        F('last_activity_time'))),
+}
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the denormalized counters of projects and issues, '
+            'in batches, and fixes the rows that drifted.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        for model, counters in [(models.Project, PROJECT_COUNTERS),
+                                (models.Issue, ISSUE_COUNTERS)]:
+            fixed = self.reconcile(model, counters, batch_size)
+            self.stdout.write(
+                f'{model.__name__}: fixed {fixed} drifted rows.')
+
+    def reconcile(self, model, counters, batch_size):
+        """
+        Walk the table by primary key and, batch by batch, recompute the
+        counters of the drifted rows in a single UPDATE.
+        """
+        last_id, fixed = 0, 0
+        while True:
+            ids = list(model.objects.filter(id__gt=last_id).order_by(
+                'id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return fixed
+            annotations = {f'real_{field}': expression()
+                           for field, expression in counters.items()}
+            drift = Q()
+            for field in counters:
+                drift |= ~Q(**{field: F(f'real_{field}')})
+            with transaction.atomic():
+                drifted = list(model.objects.filter(id__in=ids).annotate(
+                    **annotations).filter(drift).values_list(
+                        'id', flat=True))
+                if drifted:
+                    fields = {field: expression()
+                              for field, expression in counters.items()}
+                    if model is models.Issue:
+                        # Sent again by the delta sync.
+                        fields['updated_time'] = timezone.now()
+                    model.objects.filter(id__in=drifted).update(**fields)
+            fixed += len(drifted)
+            last_id = ids[-1]
@@ -0,0 +1,126 @@
+from collections import Counter
+import random
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from issuestracking import models, stats
+from issuestracking.search import get_search_backend
+
+User = get_user_model()
+
+PROJECT_TYPES = ['back-end', 'front-end', 'iOS', 'Android']
+WORDS = ['login', 'page', 'crash', 'slow', 'button', 'export', 'search',
+         'token', 'upload', 'report', 'layout', 'timeout', 'cache', 'api']
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic users, projects, contributors, issues and '
+            'comments with bulk inserts, for benchmarks.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--projects', type=int, default=10)
+        parser.add_argument('--contributors', type=int, default=10,
+                            help='Contributors per project.')
+        parser.add_argument('--issues', type=int, default=100,
+                            help='Issues per project.')
+        parser.add_argument('--comments', type=int, default=5,
+                            help='Comments per issue.')
+        parser.add_argument('--password', default='S3cret-pass',
+                            help='Password of every seeded user.')
+        parser.add_argument('--seed', type=int, default=None,
+                            help='Random seed, for reproducible data.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, users, projects, contributors, issues, comments,
+               password, seed, batch_size, **options):
+        if users < 1 or contributors < 1:
+            raise CommandError('At least one user and one contributor per '
+                               'project are required.')
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        # Unique names, so the command can run again on the same database.
+        self.run = secrets.token_hex(3)
+
+        password = make_password(password)
+        seeded_users = User.objects.bulk_create(
+            [User(username=f'seed-{self.run}-{index}', password=password,
+                  email=f'seed-{self.run}-{index}@example.com',
+                  first_name='Seed', last_name=str(index))
+             for index in range(users)],
+            batch_size=batch_size)
+        for index in range(projects):
+            with transaction.atomic():
+                self.seed_project(index, seeded_users,
+                                  min(contributors, users), issues, comments)
+        self.stdout.write(
+            f'Seeded {users} users and {projects} projects with '
+            f'{contributors} contributors, {issues} issues and '
+            f'{issues * comments} comments each (run {self.run}).')
+
+    def sentence(self, length):
+        return ' '.join(self.random.choices(WORDS, k=length))
+
+    def seed_project(self, index, users, contributors, issues, comments):
+        """
+        Insert a project and its rows with their counters already set,
+        then add the search index entries and statistics that the save
+        signals would have made.
+        """
+        members = self.random.sample(users, contributors)
+        statuses = [self.random.choice(models.Issue.STATUS_CHOICES)[0]
+                    for _ in range(issues)]
+        project = models.Project.objects.create(
+            title=f'seed-{self.run} project {index}',
+            description=self.sentence(8),
+            type=self.random.choice(PROJECT_TYPES),
+            issues_count=issues,
+            open_issues_count=sum(status != models.Issue.DONE
+                                  for status in statuses),
+            contributors_count=contributors)
+        models.Contributor.objects.bulk_create(
+            [models.Contributor(
+                user=user, project=project,
+                permission=(models.Contributor.CREATOR if rank == 0
+                            else models.Contributor.CONTRIBUTOR),
+                role=(models.Contributor.PROJECT_MANAGER if rank == 0
+                      else models.Contributor.PROJECT_STAFF))
+             for rank, user in enumerate(members)],
+            batch_size=self.batch_size)
+
+        seeded_issues = models.Issue.objects.bulk_create(
+            [models.Issue(
+                title=f'seed-{self.run} {project.id}-{rank} '
+                      f'{self.sentence(3)}'[:128],
+                description=self.sentence(12),
+                tag=self.random.choice(models.Issue.TAG_CHOICES)[0],
+                priority=self.random.choice(models.Issue.PRIORITY_CHOICES)[0],
+                status=status, project=project,
+                author_user=self.random.choice(members),
+                assignee_user=self.random.choice(members),
+                comments_count=comments)
+             for rank, status in enumerate(statuses)],
+            batch_size=self.batch_size)
+        seeded_comments = models.Comment.objects.bulk_create(
+            [models.Comment(description=self.sentence(10), issue=issue,
+                            author_user=self.random.choice(members))
+             for issue in seeded_issues for _ in range(comments)],
+            batch_size=self.batch_size)
+        now = timezone.now()
+        models.Issue.objects.filter(project=project).update(
+            last_activity_time=now, updated_time=now)
+
+        backend = get_search_backend()
+        backend.index_issues(seeded_issues)
+        for comment in seeded_comments:
+            backend.index_comment(comment)
+        deltas = Counter()
+        for issue in seeded_issues:
+            deltas.update(stats.issue_deltas(
+                None, stats.tracked_values(issue), now, now))
+        stats.record(project.id, timezone.localdate(now), deltas)
@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from issuestracking.replicas import PRIMARY, get_replicas
+
+
+class Command(BaseCommand):
+    help = ('Copies the SQLite primary database to the SQLite files standing '
+            'in for read replicas, see SOFTDESK_SQLITE_REPLICAS.')
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('No replica is configured.')
+        for alias in [PRIMARY] + replicas:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f'{alias} is not a SQLite database.')
+            # Release the file before it is overwritten.
+            connections[alias].close()
+
+        source = sqlite3.connect(settings.DATABASES[PRIMARY]['NAME'])
+        try:
+            for alias in replicas:
+                target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'Copied {PRIMARY} to {alias}.')
+        finally:
+            source.close()
@@ -0,0 +1,190 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
+import time
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+
+from . import models, replicas
+
+Membership = namedtuple('Membership', ['permission', 'role'])
+
+_REQUEST_ATTR = '_project_memberships'
+
+
+class MembershipCache:
+    """
+    Process-local LRU cache of (user_id, project_id) -> Membership.
+
+    Entries expire after `ttl` seconds so that writes made by other
+    processes are eventually seen. Writes made by this process are
+    invalidated immediately through the `Contributor` signals.
+    A `None` value is cached too: it means "not a member".
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """
+        Return a tuple (found, value) for the given key.
+        """
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                return False, None
+            if expires < time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _build_cache():
+    config = getattr(settings, 'MEMBERSHIP_CACHE', {})
+    return MembershipCache(maxsize=config.get('MAXSIZE', 1024),
+                           ttl=config.get('TTL', 60))
+
+
+membership_cache = _build_cache()
+
+
+def _normalize(project_pk):
+    try:
+        return int(project_pk)
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_memberships(request):
+    memberships = getattr(request, _REQUEST_ATTR, None)
+    if memberships is None:
+        memberships = {}
+        setattr(request, _REQUEST_ATTR, memberships)
+    return memberships
+
+
+def _membership_key(request, project_pk):
+    user_id = getattr(request.user, 'id', None)
+    project_id = _normalize(project_pk)
+    if user_id is None or project_id is None:
+        return None
+    return (user_id, project_id)
+
+
+def _cached_membership(request, key):
+    """
+    Return a tuple (found, value) from the memberships of the request,
+    then from the shared cache.
+    """
+    memberships = _request_memberships(request)
+    if key in memberships:
+        return True, memberships[key]
+    found, membership = membership_cache.get(key)
+    if found:
+        memberships[key] = membership
+    return found, membership
+
+
+def _membership_row(key):
+    # The primary, as the row goes to the shared cache.
+    user_id, project_id = key
+    return models.Contributor.objects.using(replicas.PRIMARY).filter(
+        project_id=project_id, user_id=user_id
+    ).values_list('permission', 'role')
+
+
+def _store_membership(request, key, row):
+    membership = Membership(*row) if row is not None else None
+    membership_cache.set(key, membership)
+    _request_memberships(request)[key] = membership
+    return membership
+
+
+def get_membership(request, project_pk):
+    """
+    Return the `Membership` of the request user on the given project,
+    or None if the user is not a contributor.
+
+    The row is loaded at most once per request and is shared between
+    requests through `membership_cache`.
+    """
+    key = _membership_key(request, project_pk)
+    if key is None:
+        return None
+    found, membership = _cached_membership(request, key)
+    if found:
+        return membership
+    return _store_membership(request, key, _membership_row(key).first())
+
+
+async def aget_membership(request, project_pk):
+    """
+    Async `get_membership`.
+    """
+    key = _membership_key(request, project_pk)
+    if key is None:
+        return None
+    found, membership = _cached_membership(request, key)
+    if found:
+        return membership
+    return _store_membership(request, key,
+                             await _membership_row(key).afirst())
+
+
+def invalidate_membership(user_id, project_id):
+    """
+    Drop the cached membership of a user on a project.
+    """
+    membership_cache.delete((user_id, project_id))
+
+
+def membership_annotations(user_id, project_field):
+    """
+    Return the annotations loading the permission and role of a user on
+    the project referenced by `project_field`, to load a membership along
+    with another query. See `remember_membership`.
+    """
+    contributors = models.Contributor.objects.filter(
+        project_id=OuterRef(project_field), user_id=user_id)
+    return {
+        'member_permission': Subquery(contributors.values('permission')[:1]),
+        'member_role': Subquery(contributors.values('role')[:1]),
+    }
+
+
+def remember_membership(request, project_id, obj):
+    """
+    Store the membership loaded on `obj` through `membership_annotations`
+    for the request, and in the shared cache unless `obj` comes from a
+    replica.
+    """
+    membership = None
+    if obj.member_permission is not None:
+        membership = Membership(obj.member_permission, obj.member_role)
+    key = (request.user.id, project_id)
+    _request_memberships(request)[key] = membership
+    if not replicas.reading_from_replica():
+        membership_cache.set(key, membership)
+    return membership
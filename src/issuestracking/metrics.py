@@ -0,0 +1,329 @@
+"""
+Per-request instrumentation.
+
+`MetricsMiddleware` measures each request: its total time, the number
+and time of its SQL queries, and the time spent in permissions,
+serializers and rendering. The measures are sent back in a
+`Server-Timing` header and added to per-route histograms, which
+`metrics_view` serves in the Prometheus text format.
+
+The middleware removes itself when `METRICS['ENABLED']` is false, so
+nothing is measured. The histograms are process-local: scrape every
+process.
+"""
+from contextlib import ExitStack, contextmanager
+from threading import Lock
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.utils.deprecation import MiddlewareMixin
+
+_REQUEST_ATTR = '_timings'
+
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+PHASES = ['sql', 'permissions', 'serializer', 'render']
+
+
+def _build_config():
+    config = getattr(settings, 'METRICS', {})
+    return {
+        'ENABLED': config.get('ENABLED', False),
+        'SERVER_TIMING': config.get('SERVER_TIMING', True),
+        'BUCKETS': sorted(config.get('BUCKETS', DEFAULT_BUCKETS)),
+        'TOKEN': config.get('TOKEN'),
+    }
+
+
+CONFIG = _build_config()
+
+
+class RequestTimings:
+    """
+    Measures of a single request, in seconds.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.queries = 0
+        self.render_start = None
+
+    def add(self, phase, duration):
+        self.phases[phase] += duration
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.phases['sql'] += time.perf_counter() - start
+            self.queries += 1
+
+    def server_timing(self, total):
+        entries = [f'total;dur={total * 1000:.1f}',
+                   f'sql;dur={self.phases["sql"] * 1000:.1f};'
+                   f'desc="{self.queries} queries"']
+        entries += [f'{phase};dur={self.phases[phase] * 1000:.1f}'
+                    for phase in PHASES[1:]]
+        return ', '.join(entries)
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        """
+        Yield the Prometheus lines of the histogram.
+        """
+        cumulative = 0
+        bounds = [repr(float(bound)) for bound in self.buckets] + ['+Inf']
+        for bound, count in zip(bounds, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class MetricsRegistry:
+    """
+    Process-local histograms of the request measures, by route and
+    method.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = Lock()
+        self.clear()
+
+    def clear(self):
+        self._durations = {}
+        self._phases = {}
+        self._queries = {}
+        self._responses = {}
+
+    def _histogram(self, histograms, key):
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, route, method, status, total, timings):
+        key = (route, method)
+        with self._lock:
+            self._histogram(self._durations, key).observe(total)
+            for phase, duration in timings.phases.items():
+                self._histogram(self._phases, key + (phase,)).observe(
+                    duration)
+            self._queries[key] = self._queries.get(key, 0) + timings.queries
+            status_key = key + (status,)
+            self._responses[status_key] = (
+                self._responses.get(status_key, 0) + 1)
+
+    def render(self):
+        """
+        Return the histograms in the Prometheus text format.
+        """
+        lines = []
+        with self._lock:
+            lines += ['# HELP http_requests_total Requests by route, '
+                      'method and status.',
+                      '# TYPE http_requests_total counter']
+            for (route, method, status), count in sorted(
+                    self._responses.items()):
+                lines.append(
+                    f'http_requests_total{{{_labels(route, method)},'
+                    f'status="{status}"}} {count}')
+            lines += ['# HELP http_request_duration_seconds Request '
+                      'duration.',
+                      '# TYPE http_request_duration_seconds histogram']
+            for (route, method), histogram in sorted(
+                    self._durations.items()):
+                lines += histogram.samples('http_request_duration_seconds',
+                                           _labels(route, method))
+            lines += ['# HELP http_request_phase_seconds Time spent in SQL, '
+                      'permissions, serializers and rendering.',
+                      '# TYPE http_request_phase_seconds histogram']
+            for (route, method, phase), histogram in sorted(
+                    self._phases.items()):
+                lines += histogram.samples(
+                    'http_request_phase_seconds',
+                    f'{_labels(route, method)},phase="{phase}"')
+            lines += ['# HELP http_request_sql_queries_total SQL queries.',
+                      '# TYPE http_request_sql_queries_total counter']
+            for (route, method), count in sorted(self._queries.items()):
+                lines.append(f'http_request_sql_queries_total'
+                             f'{{{_labels(route, method)}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(route, method):
+    return f'route="{route}",method="{method}"'
+
+
+registry = MetricsRegistry(CONFIG['BUCKETS'])
+
+
+def get_timings(request):
+    """
+    Return the `RequestTimings` of a Django or DRF request, or None when
+    it is not measured.
+    """
+    request = getattr(request, '_request', request)
+    return request.__dict__.get(_REQUEST_ATTR)
+
+
+@contextmanager
+def timed(request, phase):
+    """
+    Add the time spent in the block to a phase of the request measures.
+    """
+    timings = get_timings(request)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - start)
+
+
+def _timed_method(timings, phase, method):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timings.add(phase, time.perf_counter() - start)
+    return wrapper
+
+
+class TimedViewMixin:
+    """
+    Measures the permission checks and the serializers of a DRF view.
+
+    Serializer time covers the validation of the input and the
+    representation of the output, including the queries they run.
+    """
+
+    def check_permissions(self, request):
+        with timed(request, 'permissions'):
+            super().check_permissions(request)
+
+    def check_object_permissions(self, request, obj):
+        with timed(request, 'permissions'):
+            super().check_object_permissions(request, obj)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        timings = get_timings(self.request)
+        if timings is not None:
+            for name in ['run_validation', 'to_representation']:
+                setattr(serializer, name, _timed_method(
+                    timings, 'serializer', getattr(serializer, name)))
+        return serializer
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """
+    Measures every request, see the module docstring.
+
+    It runs in the mode of the rest of the chain. For an async request,
+    the query wrappers are installed on the connections of the thread
+    running the queries of the request, which costs two hops to it.
+    """
+
+    def __init__(self, get_response):
+        if not CONFIG['ENABLED']:
+            raise MiddlewareNotUsed()
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        timings = self.start(request)
+        with self.wrap_queries(timings):
+            response = self.get_response(request)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = self.start(request)
+        wrappers = await sync_to_async(self.wrap_queries)(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        return self.finish(request, response, timings)
+
+    def start(self, request):
+        timings = RequestTimings()
+        request.__dict__[_REQUEST_ATTR] = timings
+        return timings
+
+    def wrap_queries(self, timings):
+        """
+        Return the `ExitStack` of the query wrappers of the connections
+        of the current thread.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(timings.execute_wrapper))
+        return stack
+
+    def finish(self, request, response, timings):
+        total = time.perf_counter() - timings.start
+        match = request.resolver_match
+        route = match.view_name if match is not None else 'unmatched'
+        registry.observe(route, request.method, response.status_code, total,
+                         timings)
+        if CONFIG['SERVER_TIMING']:
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+    def process_template_response(self, request, response):
+        """
+        Measure the rendering of the DRF responses, which happens right
+        after this hook.
+        """
+        timings = request.__dict__.get(_REQUEST_ATTR)
+        if timings is not None:
+            start = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: timings.add(
+                    'render', time.perf_counter() - start))
+        return response
+
+
+def metrics_view(request):
+    """
+    Serve the request histograms in the Prometheus text format.
+
+    Requires `Authorization: Bearer <METRICS['TOKEN']>` when a token is
+    configured.
+    """
+    if not CONFIG['ENABLED']:
+        raise Http404()
+    token = CONFIG['TOKEN']
+    if token is not None:
+        authorization = request.headers.get('Authorization', '')
+        if not constant_time_compare(authorization, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
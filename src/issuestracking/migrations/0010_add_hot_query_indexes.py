@@ -0,0 +1,29 @@
+# Generated by Django 4.0.2 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuestracking', '0009_rename_author_comment_author_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contributor',
+            index=models.Index(fields=['project', 'user'], name='contributor_project_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contributor',
+            index=models.Index(fields=['project', 'permission'], name='contributor_project_perm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_time'], name='issue_project_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'created_time'], name='comment_issue_created_idx'),
+        ),
+    ]
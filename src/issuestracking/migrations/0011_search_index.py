@@ -0,0 +1,49 @@
+# Generated by Django 4.0.2 on 2026-10-18 14:00
+
+from django.db import migrations
+
+SEARCH_TABLE = 'issuestracking_search'
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Create the FTS5 table on SQLite and index the existing rows.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            title, body,
+            project_id UNINDEXED, issue_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, project_id, issue_id)
+        SELECT 2 * id, title, description, project_id, id
+        FROM issuestracking_issue
+    """)
+    schema_editor.execute(f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, body, project_id, issue_id)
+        SELECT 2 * comment.id + 1, '', comment.description,
+               issue.project_id, issue.id
+        FROM issuestracking_comment AS comment
+        INNER JOIN issuestracking_issue AS issue
+            ON issue.id = comment.issue_id
+    """)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuestracking', '0010_add_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.0.2 on 2026-10-18 16:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def count_subquery(model, field, **filters):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}, **filters)
+        .order_by().values(field).annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Project = apps.get_model('issuestracking', 'Project')
+    Issue = apps.get_model('issuestracking', 'Issue')
+    Contributor = apps.get_model('issuestracking', 'Contributor')
+    Comment = apps.get_model('issuestracking', 'Comment')
+    Project.objects.update(
+        issues_count=count_subquery(Issue, 'project'),
+        open_issues_count=count_subquery(Issue, 'project',
+                                         status__in=['TOD', 'DOI']),
+        contributors_count=count_subquery(Contributor, 'project'),
+    )
+    Issue.objects.update(
+        comments_count=count_subquery(Comment, 'issue'),
+        last_activity_time=Coalesce(Subquery(
+            Comment.objects.filter(issue=OuterRef('pk')).order_by()
+            .values('issue').annotate(last=Max('created_time'))
+            .values('last')
+        ), F('created_time')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuestracking', '0012_issue_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='issue',
+            name='last_activity_time',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='contributors_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='issues_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='open_issues_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
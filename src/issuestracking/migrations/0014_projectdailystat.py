@@ -0,0 +1,73 @@
+# Generated by Django 4.0.2 on 2026-10-18 18:00
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+CLOSE_TIME_BUCKETS = [1, 4, 12, 24, 72, 168, 336, 720, 2160]
+
+
+def close_time_bucket(created_time, closed_time):
+    hours = (closed_time - created_time).total_seconds() / 3600
+    for bound in CLOSE_TIME_BUCKETS:
+        if hours <= bound:
+            return str(bound)
+    return 'more'
+
+
+def fill_daily_stats(apps, schema_editor):
+    """
+    Rebuild the summary from the current issues: their history is not
+    known, so each issue counts with its current values from its creation
+    day, and a closed issue counts as closed on its last activity day.
+    """
+    Issue = apps.get_model('issuestracking', 'Issue')
+    ProjectDailyStat = apps.get_model('issuestracking', 'ProjectDailyStat')
+    rows = Counter()
+    for issue in Issue.objects.order_by().values(
+            'project_id', 'status', 'priority', 'tag', 'created_time',
+            'last_activity_time').iterator(chunk_size=2000):
+        created = (issue['project_id'],
+                   timezone.localdate(issue['created_time']))
+        rows[created + ('created', '')] += 1
+        for field in ['status', 'priority', 'tag']:
+            rows[created + (field, issue[field])] += 1
+        if issue['status'] == 'DON':
+            closed = (issue['project_id'],
+                      timezone.localdate(issue['last_activity_time']))
+            rows[closed + ('closed', '')] += 1
+            rows[closed + ('close_time', close_time_bucket(
+                issue['created_time'], issue['last_activity_time']))] += 1
+    ProjectDailyStat.objects.bulk_create(
+        [ProjectDailyStat(project_id=project_id, day=day, metric=metric,
+                          key=key, count=count)
+         for (project_id, day, metric, key), count in rows.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuestracking', '0013_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(max_length=16)),
+                ('key', models.CharField(blank=True, max_length=16)),
+                ('count', models.IntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='issuestracking.project')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='projectdailystat',
+            constraint=models.UniqueConstraint(fields=('project', 'day', 'metric', 'key'), name='no_double_daily_stat'),
+        ),
+        migrations.RunPython(fill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.0.2 on 2026-10-18 20:00
+
+from django.db import migrations, models
+from django.db.models import F
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def fill_updated_times(apps, schema_editor):
+    Issue = apps.get_model('issuestracking', 'Issue')
+    Comment = apps.get_model('issuestracking', 'Comment')
+    Issue.objects.update(updated_time=F('last_activity_time'))
+    Comment.objects.update(updated_time=F('created_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issuestracking', '0014_projectdailystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='updated_time',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated_times, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'updated_time'], name='issue_project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'updated_time'], name='comment_issue_updated_idx'),
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('issue', 'Issue'), ('comment', 'Comment')], max_length=16)),
+                ('object_id', models.PositiveIntegerField()),
+                ('deleted_time', models.DateTimeField(auto_now_add=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='issuestracking.project')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['project', 'deleted_time'], name='tombstone_project_deleted_idx'),
+        ),
+    ]
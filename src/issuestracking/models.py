@@ -1,11 +1,34 @@
+from contextvars import ContextVar
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
 
+# Ids of the projects being deleted: the signal receivers skip the
+# per-row work of their cascade, see `signals`.
+deleting_projects = ContextVar('deleting_projects', default=frozenset())
+
+
+class CounterFieldsMixin:
+    """
+    Leaves the `counter_fields` out of the saves of existing rows, so
+    that saving a stale instance never overwrites concurrent increments.
+    """
+    counter_fields = []
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
 
-class Project(models.Model):
+
+class Project(CounterFieldsMixin, models.Model):
     """
     Project model that allow to save project under development.
 
@@ -15,9 +38,31 @@ class Project(models.Model):
     description = models.CharField(_('description'), max_length=256)
     type = models.CharField(_('type'), max_length=128)
 
+    # Denormalized counters, kept up to date by `counters`.
+    issues_count = models.PositiveIntegerField(default=0)
+    open_issues_count = models.PositiveIntegerField(default=0)
+    contributors_count = models.PositiveIntegerField(default=0)
+
+    # Version stamp behind the ETags of the project reads, see `versions`.
+    version = models.PositiveBigIntegerField(default=0)
+
+    counter_fields = ['issues_count', 'open_issues_count',
+                      'contributors_count', 'version']
+
     def __str__(self):
         return f"{self.title}"
 
+    def delete(self, *args, **kwargs):
+        """
+        Mark the project as being deleted before its cascade: Django
+        sends the pre_delete signal of its issues before its own.
+        """
+        token = deleting_projects.set(deleting_projects.get() | {self.id})
+        try:
+            return super().delete(*args, **kwargs)
+        finally:
+            deleting_projects.reset(token)
+
 
 class Contributor(models.Model):
     """
@@ -51,9 +96,15 @@ class Contributor(models.Model):
             models.UniqueConstraint(fields=['user', 'project'],
                                     name=('no_double_contributor')),
         ]
+        indexes = [
+            models.Index(fields=['project', 'user'],
+                         name='contributor_project_user_idx'),
+            models.Index(fields=['project', 'permission'],
+                         name='contributor_project_perm_idx'),
+        ]
 
 
-class Issue(models.Model):
+class Issue(CounterFieldsMixin, models.Model):
     """
     Issue object, to track problems on a given project.
     """
@@ -91,6 +142,55 @@ class Issue(models.Model):
                                       null=True, related_name='assignee_user')
     created_time = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized counters, kept up to date by `counters`.
+    comments_count = models.PositiveIntegerField(default=0)
+    last_activity_time = models.DateTimeField(auto_now=True)
+
+    # Last change of the representation, for the delta sync, see `sync`.
+    updated_time = models.DateTimeField(auto_now=True)
+
+    counter_fields = ['comments_count']
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'updated_time'],
+                         name='issue_project_updated_idx'),
+            models.Index(fields=['project', 'created_time'],
+                         name='issue_project_created_idx'),
+            models.Index(fields=['project', 'status', 'created_time'],
+                         name='issue_project_status_idx'),
+            models.Index(fields=['project', 'priority', 'created_time'],
+                         name='issue_project_priority_idx'),
+            models.Index(fields=['project', 'tag', 'created_time'],
+                         name='issue_project_tag_idx'),
+            models.Index(fields=['project', 'assignee_user', 'created_time'],
+                         name='issue_project_assignee_idx'),
+        ]
+
+    # Fields whose loaded value is kept to detect changes on save.
+    tracked_fields = ['status', 'priority', 'tag']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        self._loaded_values = {field: self.__dict__.get(field)
+                               for field in self.tracked_fields}
+
+    def loaded_value(self, field):
+        """
+        Return the value `field` had when loaded or last saved, or None
+        if unknown.
+        """
+        return getattr(self, '_loaded_values', {}).get(field)
+
+    @property
+    def is_open(self):
+        return self.status != self.DONE
+
 
 class Comment(models.Model):
     description = models.CharField(_('description'), max_length=256)
@@ -101,3 +201,68 @@ class Comment(models.Model):
                               blank=True, null=True,
                               related_name='comment_issue')
     created_time = models.DateTimeField(auto_now_add=True)
+    updated_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'created_time'],
+                         name='comment_issue_created_idx'),
+            models.Index(fields=['issue', 'updated_time'],
+                         name='comment_issue_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Remember the loaded issue to detect issue changes on save.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_issue_id = instance.__dict__.get('issue_id')
+        return instance
+
+
+class ProjectDailyStat(models.Model):
+    """
+    One counter of the daily summary of a project, e.g. the number of
+    issues created on a day (`metric` 'created') or the net change of the
+    issues having a status (`metric` 'status', `key` the status).
+
+    Rows are maintained incrementally by `stats`, so the statistics of a
+    time range only read the summary rows.
+    """
+    project = models.ForeignKey(to=Project, on_delete=models.CASCADE,
+                                related_name='daily_stats')
+    day = models.DateField()
+    metric = models.CharField(max_length=16)
+    key = models.CharField(max_length=16, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'day', 'metric', 'key'],
+                                    name='no_double_daily_stat'),
+        ]
+
+
+class Tombstone(models.Model):
+    """
+    A deleted issue or comment of a project, kept for the delta sync
+    until `purge_tombstones` removes it, see `sync`.
+    """
+    ISSUE, COMMENT = 'issue', 'comment'
+    MODEL_CHOICES = [
+        (ISSUE, 'Issue'),
+        (COMMENT, 'Comment'),
+    ]
+
+    project = models.ForeignKey(to=Project, on_delete=models.CASCADE,
+                                related_name='tombstones')
+    model = models.CharField(max_length=16, choices=MODEL_CHOICES)
+    object_id = models.PositiveIntegerField()
+    deleted_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'deleted_time'],
+                         name='tombstone_project_deleted_idx'),
+        ]
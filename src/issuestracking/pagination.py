@@ -0,0 +1,224 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def encode_cursor(cursor):
+    """
+    Return the opaque string of a `Cursor`.
+    """
+    position = [value.isoformat() if isinstance(value, datetime) else value
+                for value in cursor.position]
+    data = json.dumps({'r': int(cursor.reverse), 'p': position})
+    return urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(value, length):
+    """
+    Return the `Cursor` of an opaque string, raise ValueError if it is
+    not one with a position of `length` values.
+    """
+    try:
+        data = json.loads(urlsafe_b64decode(value.encode()))
+        reverse, position = bool(data['r']), data['p']
+    except (TypeError, KeyError, UnicodeError, ValueError):
+        raise ValueError(f'Invalid cursor: {value!r}.')
+    if not isinstance(position, list) or len(position) != length:
+        raise ValueError(f'Invalid cursor: {value!r}.')
+    return Cursor(reverse, position)
+
+
+def keyset_filter(ordering, position):
+    """
+    Return the condition of the rows after `position` in `ordering`,
+    e.g. `created_time >= t AND (created_time > t OR id > i)` for
+    ('created_time', 'id'): the first term is a range of the index.
+    """
+    after = Q()
+    for index, name in enumerate(ordering):
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        term = Q(**{f'{name.lstrip("-")}__{lookup}': position[index]})
+        for previous, value in zip(ordering[:index], position):
+            term &= Q(**{previous.lstrip('-'): value})
+        after |= term
+    first = ordering[0]
+    lookup = 'lte' if first.startswith('-') else 'gte'
+    return Q(**{f'{first.lstrip("-")}__{lookup}': position[0]}) & after
+
+
+class KeysetCursorPagination(pagination.CursorPagination):
+    """
+    Keyset pagination on every field of the view's `cursor_ordering`.
+
+    The opaque cursor holds the values of all the ordering fields of the
+    last (or first) row of a page, and the next page is fetched with a
+    `WHERE` on that composite position instead of an `OFFSET`. No
+    `COUNT(*)` is run.
+    """
+    ordering = ('created_time', 'id')
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'cursor_ordering', self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async `paginate_queryset`.
+        """
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view):
+        """
+        Return the rows of the page and the first of the next one, or
+        None when the request asks for no page.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.cursor is not None and self.cursor.reverse:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}'
+                             for name in ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                keyset_filter(ordering, self.cursor.position))
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        reverse = self.cursor is not None and self.cursor.reverse
+        self.page = rows
+        has_more = len(self.page) > self.page_size
+        del self.page[self.page_size:]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        if ((self.has_next or self.has_previous)
+                and self.template is not None):
+            self.display_page_controls = True
+        return self.page
+
+    def decode_cursor(self, request):
+        value = request.query_params.get(self.cursor_query_param)
+        if not value:
+            return None
+        try:
+            return decode_cursor(value, len(self.ordering))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_position(self, row):
+        return [getattr(row, name.lstrip('-')) for name in self.ordering]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = (self.get_position(self.page[-1]) if self.page
+                    else self.cursor.position)
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encode_cursor(Cursor(False, position)))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = (self.get_position(self.page[0]) if self.page
+                    else self.cursor.position)
+        return replace_query_param(self.base_url, self.cursor_query_param,
+                                   encode_cursor(Cursor(True, position)))
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """
+    DRF's limit/offset pagination, which the async views can await.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        Async `paginate_queryset`.
+        """
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in
+                queryset[self.offset:self.offset + self.limit]]
+
+
+class LimitOffsetOrCursorPagination(pagination.BasePagination):
+    """
+    Limit/offset pagination by default, cursor pagination on demand.
+
+    Clients opt in to the cursor mode by sending the `cursor` query
+    parameter (empty for the first page), then follow the opaque `next`
+    and `previous` links.
+    """
+    cursor_query_param = KeysetCursorPagination.cursor_query_param
+
+    def __init__(self):
+        self.paginator = LimitOffsetPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.paginator = KeysetCursorPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            self.paginator = KeysetCursorPagination()
+        return await self.paginator.apaginate_queryset(queryset, request,
+                                                       view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_fields(self, view):
+        return self.paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return self.paginator.get_schema_operation_parameters(view)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, 'display_page_controls', False)
@@ -1,7 +1,8 @@
 from rest_framework import permissions
 from . import models, views
+from .membership import get_membership
 
-SAFE_ACTIONS = ['list', 'retrieve']
+SAFE_ACTIONS = ['list', 'retrieve', 'export', 'stats', 'changes']
 RESTRICTED_SAFE_ACTIONS = ['list']
 
 
@@ -27,17 +28,14 @@ class CheckIsProjectMemberOrContrCreaMixin:
         project_pk = view.kwargs.get('project_pk')
         if not project_pk.isnumeric():
             return False
-        user_contributor = models.Contributor.objects.filter(
-            project_id=project_pk, user_id=request.user.id
-        )
-        user_contributor_exist = user_contributor.exists()
+        membership = get_membership(request, project_pk)
         if (
-            user_contributor_exist
+            membership is not None
             and view.action == 'create'
             and self.get_model_view(view) == models.Contributor
         ):
-            return user_contributor[0].permission == "CREA"
-        return user_contributor_exist
+            return membership.permission == "CREA"
+        return membership is not None
 
 
 class IsOwnerOrContributorForReadOnly(permissions.BasePermission):
@@ -47,11 +45,12 @@ class IsOwnerOrContributorForReadOnly(permissions.BasePermission):
     """
 
     def has_object_permission(self, request, view, obj):
-        contributor_project = models.Contributor.objects.filter(
-            project_id=obj.id, user_id=request.user.id)
-        if view.action in SAFE_ACTIONS and contributor_project.exists():
+        membership = get_membership(request, obj.id)
+        if membership is None:
+            return False
+        if view.action in SAFE_ACTIONS:
             return True
-        return contributor_project[0].permission == 'CREA'
+        return membership.permission == 'CREA'
 
 
 class IsProjectManagerOrReadOnlyContributorObject(
@@ -70,12 +69,12 @@ class IsProjectManagerOrReadOnlyContributorObject(
         )
         if project_managers.count() == 1 and obj.permission == "CREA":
             return False
-        user_contrib = models.Contributor.objects.filter(
-            project_id=obj.project_id, user_id=request.user.id
-        )
-        if view.action in RESTRICTED_SAFE_ACTIONS and user_contrib.exists():
+        membership = get_membership(request, obj.project_id)
+        if membership is None:
+            return False
+        if view.action in RESTRICTED_SAFE_ACTIONS:
             return True
-        return user_contrib[0].permission == "CREA"
+        return membership.permission == "CREA"
 
 
 class IsAuthorOrReadOnly(
@@ -90,12 +89,9 @@ class IsAuthorOrReadOnly(
         Only author is allowed to update and delete a comment
         """
         project_pk = view.kwargs.get('project_pk')
-        user_contrib = models.Contributor.objects.filter(
-            project_id=project_pk, user_id=request.user.id
-        )
-        if (
-            view.action in SAFE_ACTIONS
-            and user_contrib.exists()
-        ):
+        membership = get_membership(request, project_pk)
+        if membership is None:
+            return False
+        if view.action in SAFE_ACTIONS:
             return True
-        return user_contrib[0].user_id == obj.author_user_id
+        return request.user.id == obj.author_user_id
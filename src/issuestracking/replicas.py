@@ -0,0 +1,128 @@
+"""
+Routing of the reads of the safe viewset actions to read replicas.
+
+`ReplicaRoutingMiddleware` opens a routing state for each request, in
+which `ReplicaReadMixin` allows replica reads for the `list` and
+`retrieve` actions. `PrimaryReplicaRouter` then sends the reads to one
+replica picked for the request, until the request writes: the rest of
+the request reads from the primary, so it sees its own writes.
+
+Everything else, including the code running outside of a request such
+as management commands, uses the primary. So do the cache misses of the
+shared caches, and replica reads get no ETag, see `reading_from_replica`.
+"""
+from contextvars import ContextVar
+import random
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+PRIMARY = 'default'
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def allow_replica_reads(allow=True):
+    """
+    Let the reads of the current request use a replica, unless it
+    already wrote.
+    """
+    state = _state.get()
+    if state is None:
+        return
+    replicas = get_replicas()
+    if allow and replicas and not state.wrote:
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+    else:
+        state.replica = None
+
+
+def reading_from_replica():
+    """
+    Return whether the reads of the current request go to a replica.
+
+    What they load may lag behind the primary, so it must not fill the
+    caches shared between requests nor be tagged with the version stamp
+    of the primary.
+    """
+    state = _state.get()
+    return (state is not None and not state.wrote
+            and state.replica is not None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Database router between the primary (`default`) and the aliases of
+    `settings.DATABASE_REPLICAS`.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote or state.replica is None:
+            return PRIMARY
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.replica = None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *get_replicas()}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema and data from the primary.
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Opens a routing state for each request, see the module docstring.
+
+    It runs in the mode of the rest of the chain, so it does not move
+    the async views to a thread.
+    """
+
+    def __call__(self, request):
+        if self._is_coroutine:
+            return self.__acall__(request)
+        token = _state.set(RoutingState())
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+
+    async def __acall__(self, request):
+        token = _state.set(RoutingState())
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+
+
+class ReplicaReadMixin:
+    """
+    Sends the reads of the `replica_actions` of a viewset to a replica.
+    """
+    replica_actions = ['list', 'retrieve']
+
+    def initial(self, request, *args, **kwargs):
+        allow_replica_reads(self.action in self.replica_actions)
+        super().initial(request, *args, **kwargs)
@@ -0,0 +1,181 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from . import models
+
+# Created by the 0011_search_index migration on SQLite.
+SEARCH_TABLE = 'issuestracking_search'
+
+
+class BaseSearchBackend:
+    """
+    Full-text index over issue titles and descriptions and comment
+    descriptions.
+
+    `search` returns the ids of the matching issues of a project, best
+    match first, and only if `user_id` is a contributor of the project.
+    """
+
+    def index_issue(self, issue):
+        pass
+
+    def index_issues(self, issues):
+        """
+        Index issues just created, which have no entry yet.
+        """
+        for issue in issues:
+            self.index_issue(issue)
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_issue(self, issue):
+        pass
+
+    def remove_comment(self, comment):
+        pass
+
+    def remove_project(self, project_id):
+        pass
+
+    def search(self, project_id, user_id, query, limit, offset=0):
+        raise NotImplementedError('search() must be implemented.')
+
+
+class QuerySetSearchBackend(BaseSearchBackend):
+    """
+    Index-less fallback for the databases without a dedicated backend.
+
+    It scans the issue and comment tables, so it is only suitable for
+    small projects.
+    """
+
+    def search(self, project_id, user_id, query, limit, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        queryset = models.Issue.objects.filter(
+            project_id=project_id, project__projects__user_id=user_id)
+        for term in terms:
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Q(comment_issue__description__icontains=term))
+        return list(queryset.order_by('-created_time').values_list(
+            'id', flat=True).distinct()[offset:offset + limit])
+
+
+class SQLiteFTS5Backend(BaseSearchBackend):
+    """
+    SQLite FTS5 index, ranked with bm25 and a higher weight on titles.
+
+    Issue rows use `2 * id` as rowid and comment rows `2 * id + 1`, so
+    that every write is a rowid lookup.
+    """
+    title_weight = 10.0
+    body_weight = 1.0
+
+    def _replace(self, rowid, title, body, project_id, issue_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s",
+                           [rowid])
+            cursor.execute(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, "
+                f"project_id, issue_id) VALUES (%s, %s, %s, %s, %s)",
+                [rowid, title, body, project_id, issue_id])
+
+    def _delete(self, rowids):
+        if not rowids:
+            return
+        placeholders = ', '.join(['%s'] * len(rowids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} "
+                f"WHERE rowid IN ({placeholders})", rowids)
+
+    def index_issue(self, issue):
+        self._replace(2 * issue.id, issue.title, issue.description,
+                      issue.project_id, issue.id)
+
+    def index_issues(self, issues):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SEARCH_TABLE} (rowid, title, body, "
+                f"project_id, issue_id) VALUES (%s, %s, %s, %s, %s)",
+                [(2 * issue.id, issue.title, issue.description,
+                  issue.project_id, issue.id) for issue in issues])
+
+    def index_comment(self, comment):
+        if comment.issue_id is None:
+            self.remove_comment(comment)
+            return
+        if models.Comment.issue.is_cached(comment):
+            project_id = comment.issue.project_id
+        else:
+            project_id = models.Issue.objects.filter(
+                id=comment.issue_id
+            ).values_list('project_id', flat=True).first()
+        self._replace(2 * comment.id + 1, '', comment.description,
+                      project_id, comment.issue_id)
+
+    def remove_issue(self, issue):
+        """
+        Remove the issue and its comments, which lose their issue.
+        """
+        comment_ids = models.Comment.objects.filter(
+            issue_id=issue.id).values_list('id', flat=True)
+        self._delete([2 * issue.id]
+                     + [2 * comment_id + 1 for comment_id in comment_ids])
+
+    def remove_comment(self, comment):
+        self._delete([2 * comment.id + 1])
+
+    def remove_project(self, project_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {SEARCH_TABLE} WHERE project_id = %s",
+                [project_id])
+
+    def search(self, project_id, user_id, query, limit, offset=0):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        match = ' '.join('"%s"' % term.replace('"', '""') for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH hit AS MATERIALIZED (
+                    SELECT issue_id, project_id,
+                           bm25({SEARCH_TABLE}, %s, %s) AS rank
+                    FROM {SEARCH_TABLE}
+                    WHERE {SEARCH_TABLE} MATCH %s AND project_id = %s
+                )
+                SELECT hit.issue_id
+                FROM hit
+                INNER JOIN issuestracking_contributor AS contributor
+                    ON contributor.project_id = hit.project_id
+                    AND contributor.user_id = %s
+                GROUP BY hit.issue_id
+                ORDER BY MIN(hit.rank)
+                LIMIT %s OFFSET %s
+                """,
+                [self.title_weight, self.body_weight, match, int(project_id),
+                 user_id, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+
+def tokenize(query):
+    return re.findall(r'\w+', query or '')
+
+
+def get_search_backend():
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path is None:
+        if connection.vendor == 'sqlite':
+            return SQLiteFTS5Backend()
+        return QuerySetSearchBackend()
+    return import_string(path)()
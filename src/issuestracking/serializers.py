@@ -2,19 +2,80 @@ from rest_framework.generics import get_object_or_404
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
 
-import authentication
+import authentication.serializers
 from . import models
 
 User = get_user_model()
 
 
+class SparseFieldsMixin:
+    """
+    Renders only the fields listed in the `fields` of the context, and
+    renders the related fields listed in its `expand` with the nested
+    serializers of `expandable_fields` instead.
+
+    Both lists come from the view, see `utils.SparseFieldsMixin`.
+    `select_fields` must run at the end of `__init__`.
+    """
+    expandable_fields = {}
+
+    def select_fields(self):
+        expand = self.context.get('expand') or []
+        unknown = set(expand) - set(self.expandable_fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {'expand': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+
+        fields = self.context.get('fields')
+        if not fields:
+            return
+        unknown = set(fields) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {'fields': f"Unknown fields: {', '.join(sorted(unknown))}."})
+        for name in set(self.fields) - set(fields):
+            del self.fields[name]
+
+
+class FormattedDateTimesMixin:
+    """
+    Renders the datetimes of `datetime_formats` with their format.
+    """
+    datetime_formats = {}
+
+    def to_representation(self, instance):
+        """
+        Object instance -> Dict of primitive datatypes.
+        modifies the format of the `datetime_formats` fields
+        """
+        ret = super().to_representation(instance)
+        for name, output_format in self.datetime_formats.items():
+            if name in ret:
+                ret[name] = getattr(instance, name).strftime(output_format)
+        return ret
+
+
+class IssueSummarySerializer(serializers.ModelSerializer):
+    """
+    A serializer for issue objects nested in other objects.
+    """
+    class Meta:
+        model = models.Issue
+        fields = ['id', 'title', 'tag', 'priority', 'status']
+
+
 class ProjectListSerializer(serializers.ModelSerializer):
     """
     A serializer for project objects, list display.
     """
     class Meta:
         model = models.Project
-        fields = ['id', 'title', 'description', 'type']
+        fields = ['id', 'title', 'description', 'type', 'issues_count',
+                  'open_issues_count', 'contributors_count']
+        read_only_fields = ['issues_count', 'open_issues_count',
+                            'contributors_count']
 
     def create(self, validated_data):
         """
@@ -29,6 +90,8 @@ class ProjectListSerializer(serializers.ModelSerializer):
                                                         role='PM',
                                                         permission='CREA')
         contributor.save()
+        # Counted in the database by a signal, not on this instance.
+        project.contributors_count = 1
         return project
 
 
@@ -44,15 +107,22 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'type', 'authors', 'members']
 
     def get_authors(self, instance):
-        queryset = models.Contributor.objects.filter(project=instance,
-                                                     permission='CREA')
-        serializer = ContributorSerializer(queryset, many=True)
-        return serializer.data
+        return self.get_contributors(instance, 'CREA')
 
     def get_members(self, instance):
-        queryset = models.Contributor.objects.filter(project=instance,
-                                                     permission='CONT')
-        serializer = ContributorSerializer(queryset, many=True)
+        return self.get_contributors(instance, 'CONT')
+
+    def get_contributors(self, instance, permission):
+        """
+        Serialize the contributors of the project having `permission`.
+
+        Contributors are read from the `projects` relation, so a prefetch
+        done by the view is split here without any extra query.
+        """
+        contributors = [contributor
+                        for contributor in instance.projects.all()
+                        if contributor.permission == permission]
+        serializer = ContributorSerializer(contributors, many=True)
         return serializer.data
 
 
@@ -91,6 +161,8 @@ class ContributorCreateSerializer(serializers.ModelSerializer):
         fields = ['id', 'user', 'role', 'permission']
 
     def get_project_queryset(self):
+        if "project" in self.context:
+            return self.context["project"]
         project_pk = self.context.get("project_pk")
         return get_object_or_404(models.Project, pk=project_pk)
 
@@ -99,11 +171,17 @@ class ContributorCreateSerializer(serializers.ModelSerializer):
         return User.objects.exclude(users__project_id=project_pk)
 
 
-class IssueSerializer(serializers.ModelSerializer):
+class IssueSerializer(SparseFieldsMixin, FormattedDateTimesMixin,
+                      serializers.ModelSerializer):
     """
     A serializer for issue objects.
     """
     project = serializers.SlugRelatedField(read_only=True, slug_field='title')
+    datetime_formats = {'created_time': "%H:%M:%S %d-%m-%Y"}
+    expandable_fields = {
+        'author_user': authentication.serializers.UserSerializer,
+        'assignee_user': authentication.serializers.UserSerializer,
+    }
 
     def __init__(self, *args, **kwargs):
         """
@@ -123,12 +201,16 @@ class IssueSerializer(serializers.ModelSerializer):
                 default=self.get_project_queryset())
             self.fields['author_user'] = serializers.HiddenField(
                 default=self.context.get('request').user)
+        self.select_fields()
 
     class Meta:
         model = models.Issue
         fields = '__all__'
+        read_only_fields = ['comments_count']
 
     def get_project_queryset(self):
+        if "project" in self.context:
+            return self.context["project"]
         project_pk = self.context.get("project_pk")
         return get_object_or_404(models.Project, pk=project_pk)
 
@@ -136,22 +218,64 @@ class IssueSerializer(serializers.ModelSerializer):
         project_pk = self.context.get("project_pk")
         return User.objects.filter(users__project_id=project_pk)
 
-    def to_representation(self, instance):
-        """
-        Object instance -> Dict of primitive datatypes.
-        modifies the format of created_time
-        """
-        ret = super().to_representation(instance)
-        ret['created_time'] = instance.created_time.strftime(
-            "%H:%M:%S %d-%m-%Y")
-        return ret
+
+class IssueBulkCreateSerializer(serializers.ModelSerializer):
+    """
+    A serializer for one item of a bulk issue creation.
+
+    It runs no query: the project members are looked up in the
+    `members` mapping of the context and the title uniqueness is
+    checked by the view for the whole batch.
+    """
+    title = serializers.CharField(max_length=128)
+    assignee_user = serializers.CharField()
+
+    class Meta:
+        model = models.Issue
+        fields = ['title', 'description', 'tag', 'priority', 'status',
+                  'assignee_user']
+
+    def validate_assignee_user(self, username):
+        try:
+            return self.context['members'][username]
+        except KeyError:
+            raise serializers.ValidationError(
+                f"Object with username={username} does not exist.")
+
+
+class IssueBulkUpdateSerializer(IssueBulkCreateSerializer):
+    """
+    A serializer for one item of a bulk issue partial update.
+    """
+    id = serializers.IntegerField()
+    assignee_user = serializers.CharField(required=False)
+
+    class Meta:
+        model = models.Issue
+        fields = ['id', 'tag', 'priority', 'status', 'assignee_user']
+
+    def validate(self, attrs):
+        if len(attrs) < 2:
+            raise serializers.ValidationError(
+                "At least one field to update is required.")
+        return attrs
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, FormattedDateTimesMixin,
+                        serializers.ModelSerializer):
     """
     A serializer for comment objects.
     """
     issue = serializers.SlugRelatedField(read_only=True, slug_field='title')
+    datetime_formats = {'created_time': "%H:%M:%S %d-%m-%Y"}
+    expandable_fields = {
+        'author_user': authentication.serializers.UserSerializer,
+        'issue': IssueSummarySerializer,
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.select_fields()
 
     class Meta:
         model = models.Comment
@@ -160,23 +284,19 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         """ Create and return new comment"""
-
-        comment = super().create(validated_data)
-        comment.issue = self.get_issue_queryset()
-        comment.author_user = self.context.get('request').user
-        comment.save()
-        return comment
+        validated_data['issue'] = self.get_issue_queryset()
+        validated_data['author_user'] = self.context.get('request').user
+        return super().create(validated_data)
 
     def get_issue_queryset(self):
+        if "issue" in self.context:
+            return self.context["issue"]
         issue_pk = self.context.get("issue_pk")
         return get_object_or_404(models.Issue, pk=issue_pk)
 
-    def to_representation(self, instance):
-        """
-        Object instance -> Dict of primitive datatypes.
-        modifies the format of created_time
-        """
-        ret = super().to_representation(instance)
-        ret['created_time'] = instance.created_time.strftime(
-            "%H:%M:%S %d-%m-%Y")
-        return ret
+
+class SyncCommentSerializer(CommentSerializer):
+    """
+    A comment of the delta sync, which refers to its issue by id.
+    """
+    issue = serializers.PrimaryKeyRelatedField(read_only=True)
@@ -0,0 +1,141 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import counters, models, sqlite, stats, sync
+from .membership import invalidate_membership
+from .search import get_search_backend
+from .versions import bump_project_version
+
+
+def is_deleting(project_id):
+    return project_id in models.deleting_projects.get()
+
+
+@receiver(post_save, sender=models.Contributor)
+@receiver(post_delete, sender=models.Contributor)
+def clear_contributor_membership(sender, instance, **kwargs):
+    """
+    Keep the membership cache in sync with the contributor table.
+    """
+    invalidate_membership(instance.user_id, instance.project_id)
+
+
+@receiver(post_save, sender=models.Project)
+def bump_project(sender, instance, created, **kwargs):
+    if not created:
+        bump_project_version(instance.id)
+
+
+@receiver(post_save, sender=models.Contributor)
+@receiver(post_delete, sender=models.Contributor)
+@receiver(post_save, sender=models.Issue)
+@receiver(post_delete, sender=models.Issue)
+def bump_parent_project(sender, instance, **kwargs):
+    if not is_deleting(instance.project_id):
+        bump_project_version(instance.project_id)
+
+
+@receiver(post_save, sender=models.Comment)
+@receiver(post_delete, sender=models.Comment)
+def bump_comment_project(sender, instance, **kwargs):
+    if instance.issue_id is not None:
+        bump_project_version(instance.issue.project_id)
+
+
+@receiver(post_save, sender=models.Issue)
+def index_issue(sender, instance, **kwargs):
+    get_search_backend().index_issue(instance)
+
+
+@receiver(pre_delete, sender=models.Issue)
+def unindex_issue(sender, instance, **kwargs):
+    if not is_deleting(instance.project_id):
+        get_search_backend().remove_issue(instance)
+
+
+@receiver(post_save, sender=models.Comment)
+def index_comment(sender, instance, **kwargs):
+    get_search_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=models.Comment)
+def unindex_comment(sender, instance, **kwargs):
+    get_search_backend().remove_comment(instance)
+
+
+@receiver(post_save, sender=models.Issue)
+def track_saved_issue(sender, instance, created, **kwargs):
+    """
+    Update the counters and statistics, which compare the saved issue
+    to its loaded values, then remember the saved values.
+    """
+    counters.issue_saved(instance, created)
+    stats.issue_saved(instance, created)
+    instance.remember_loaded_values()
+
+
+@receiver(post_delete, sender=models.Issue)
+def count_deleted_issue(sender, instance, **kwargs):
+    if not is_deleting(instance.project_id):
+        counters.issue_deleted(instance)
+        stats.issue_deleted(instance)
+
+
+@receiver(post_save, sender=models.Comment)
+def count_saved_comment(sender, instance, **kwargs):
+    counters.comment_saved(instance)
+
+
+@receiver(post_delete, sender=models.Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.comment_deleted(instance)
+
+
+@receiver(post_delete, sender=models.Issue)
+def bury_issue(sender, instance, **kwargs):
+    if not is_deleting(instance.project_id):
+        sync.record_deletion(models.Tombstone.ISSUE, instance.project_id,
+                             instance.id)
+
+
+@receiver(post_delete, sender=models.Comment)
+def bury_comment(sender, instance, **kwargs):
+    if instance.issue_id is not None:
+        sync.record_deletion(models.Tombstone.COMMENT,
+                             instance.issue.project_id, instance.id)
+
+
+@receiver(pre_delete, sender=models.Project)
+def start_project_deletion(sender, instance, **kwargs):
+    """
+    Mark the project as being deleted, so that the receivers of its
+    issues and contributors skip their counters, statistics, tombstones
+    and search index rows, and unindex the whole project at once.
+    """
+    models.deleting_projects.set(
+        models.deleting_projects.get() | {instance.id})
+    get_search_backend().remove_project(instance.id)
+
+
+@receiver(post_delete, sender=models.Project)
+def end_project_deletion(sender, instance, **kwargs):
+    models.deleting_projects.set(
+        models.deleting_projects.get() - {instance.id})
+
+
+@receiver(post_save, sender=models.Contributor)
+def count_added_contributor(sender, instance, created, **kwargs):
+    if created:
+        counters.add_to_project(instance.project_id, contributors_count=1)
+
+
+@receiver(post_delete, sender=models.Contributor)
+def count_removed_contributor(sender, instance, **kwargs):
+    if not is_deleting(instance.project_id):
+        counters.add_to_project(instance.project_id, contributors_count=-1)
+
+
+@receiver(connection_created)
+def apply_sqlite_profile(sender, connection, **kwargs):
+    sqlite.apply_profile(connection)
@@ -0,0 +1,40 @@
+"""
+Production profile for SQLite deployments.
+
+`apply_profile` sets the pragmas of `PRODUCTION_PRAGMAS` on every new
+SQLite connection: WAL lets readers run alongside the writer, the busy
+timeout makes writers wait for the lock instead of failing with
+"database is locked", and mmap and the page cache cut reads.
+"""
+from django.conf import settings
+
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def _build_config():
+    config = getattr(settings, 'SQLITE_PROFILE', {})
+    return {
+        'ENABLED': config.get('ENABLED', False),
+        'PRAGMAS': {**PRODUCTION_PRAGMAS, **config.get('PRAGMAS', {})},
+    }
+
+
+CONFIG = _build_config()
+
+
+def apply_profile(db_connection):
+    """
+    Set the profile pragmas on a new SQLite connection.
+    """
+    if not CONFIG['ENABLED'] or db_connection.vendor != 'sqlite':
+        return
+    with db_connection.cursor() as cursor:
+        for name, value in CONFIG['PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,180 @@
+"""
+Daily summary of the issues of each project.
+
+Every issue write turns into deltas on `ProjectDailyStat` rows:
+    - 'created', 'closed' and 'reopened' count events of the day,
+    - 'status', 'priority' and 'tag' hold the net change of the issues
+      having each value, so their sum up to a day is the breakdown of
+      the project on that day,
+    - 'close_time' is a histogram of the time taken to close the issues
+      closed that day, keyed by the upper bound in hours of its bucket.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from . import models
+
+DISTRIBUTIONS = ['status', 'priority', 'tag']
+EVENTS = ['created', 'closed', 'reopened']
+# Upper bounds, in hours, of the close time histogram buckets.
+CLOSE_TIME_BUCKETS = [1, 4, 12, 24, 72, 168, 336, 720, 2160]
+OVER_LAST_BUCKET = 'more'
+# Databases supporting `INSERT ... ON CONFLICT DO UPDATE`.
+UPSERT_VENDORS = ['sqlite', 'postgresql']
+
+
+def close_time_bucket(created_time, closed_time):
+    hours = (closed_time - created_time).total_seconds() / 3600
+    for bound in CLOSE_TIME_BUCKETS:
+        if hours <= bound:
+            return str(bound)
+    return OVER_LAST_BUCKET
+
+
+def issue_deltas(old, new, created_time, now):
+    """
+    Return the Counter of (metric, key) deltas for an issue going from
+    the `old` to the `new` values of its tracked fields. `old` is None
+    for a creation and `new` is None for a deletion.
+    """
+    deltas = Counter()
+    for field in DISTRIBUTIONS:
+        if old is not None:
+            deltas[(field, old[field])] -= 1
+        if new is not None:
+            deltas[(field, new[field])] += 1
+    if old is None:
+        deltas[('created', '')] += 1
+    done = models.Issue.DONE
+    was_done = old is not None and old['status'] == done
+    is_done = new is not None and new['status'] == done
+    if is_done and not was_done:
+        deltas[('closed', '')] += 1
+        deltas[('close_time', close_time_bucket(created_time, now))] += 1
+    elif was_done and new is not None and not is_done:
+        deltas[('reopened', '')] += 1
+    return deltas
+
+
+def record(project_id, day, deltas):
+    """
+    Add the (metric, key) deltas to the summary rows of a project day,
+    creating the missing rows.
+    """
+    deltas = [(metric, key, delta)
+              for (metric, key), delta in deltas.items() if delta]
+    if not deltas:
+        return
+    if connection.vendor in UPSERT_VENDORS:
+        _upsert(project_id, day, deltas)
+        return
+    for metric, key, delta in deltas:
+        rows = models.ProjectDailyStat.objects.filter(
+            project_id=project_id, day=day, metric=metric, key=key)
+        if rows.update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                models.ProjectDailyStat.objects.create(
+                    project_id=project_id, day=day, metric=metric, key=key,
+                    count=delta)
+        except IntegrityError:
+            # Created concurrently since the update.
+            rows.update(count=F('count') + delta)
+
+
+def _upsert(project_id, day, deltas):
+    """
+    Write every delta with a single `INSERT ... ON CONFLICT DO UPDATE`.
+    """
+    table = models.ProjectDailyStat._meta.db_table
+    values = ', '.join(['(%s, %s, %s, %s, %s)'] * len(deltas))
+    params = []
+    for metric, key, delta in deltas:
+        params += [project_id, day, metric, key, delta]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (project_id, day, metric, key, count) "
+            f"VALUES {values} "
+            f"ON CONFLICT (project_id, day, metric, key) "
+            f"DO UPDATE SET count = {table}.count + excluded.count",
+            params)
+
+
+def tracked_values(issue):
+    return {field: getattr(issue, field)
+            for field in models.Issue.tracked_fields}
+
+
+def issue_saved(issue, created):
+    if created:
+        old = None
+    else:
+        old = {field: issue.loaded_value(field)
+               for field in models.Issue.tracked_fields}
+        if None in old.values():
+            return
+    now = timezone.now()
+    record(issue.project_id, timezone.localdate(now),
+           issue_deltas(old, tracked_values(issue), issue.created_time, now))
+
+
+def issue_deleted(issue):
+    now = timezone.now()
+    record(issue.project_id, timezone.localdate(now),
+           issue_deltas(tracked_values(issue), None, issue.created_time, now))
+
+
+def median_close_time(histogram):
+    """
+    Return the upper bound of the histogram bucket holding the median
+    close time, or None without closed issues.
+    """
+    total = sum(histogram.values())
+    if total <= 0:
+        return None
+    seen = 0
+    bounds = [str(bound) for bound in CLOSE_TIME_BUCKETS]
+    for bucket in bounds + [OVER_LAST_BUCKET]:
+        seen += histogram.get(bucket, 0)
+        if seen * 2 >= total:
+            return bucket
+
+
+def project_summary(project_id, since, until):
+    """
+    Build the statistics of a project between two days, included, from
+    its summary rows only.
+    """
+    rows = models.ProjectDailyStat.objects.filter(project_id=project_id,
+                                                  day__lte=until)
+    breakdowns = {metric: {} for metric in DISTRIBUTIONS}
+    for metric, key, count in rows.filter(
+            metric__in=DISTRIBUTIONS).values('metric', 'key').annotate(
+            total=Sum('count')).values_list('metric', 'key', 'total'):
+        if count:
+            breakdowns[metric][key] = count
+
+    daily, totals, histogram = {}, Counter(), Counter()
+    for day, metric, key, count in rows.filter(
+            day__gte=since, metric__in=EVENTS + ['close_time']
+    ).order_by('day').values_list('day', 'metric', 'key', 'count'):
+        if metric == 'close_time':
+            histogram[key] += count
+            continue
+        daily.setdefault(day, {'day': day, **dict.fromkeys(EVENTS, 0)})
+        daily[day][metric] += count
+        totals[metric] += count
+
+    return {
+        'since': since,
+        'until': until,
+        **breakdowns,
+        **{metric: totals[metric] for metric in EVENTS},
+        'daily': list(daily.values()),
+        'close_time_hours': dict(histogram),
+        'median_close_time_hours': median_close_time(histogram),
+    }
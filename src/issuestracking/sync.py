@@ -0,0 +1,166 @@
+"""
+Delta sync of the issues and comments of a project.
+
+Every change of the representation of an issue or a comment refreshes
+its `updated_time`, and every deletion adds a `Tombstone` row.
+`project_changes` returns the rows changed since a token, found with the
+(project, updated_time) index of the issues: a comment change always
+refreshes its issue too, so changed comments are only looked for among
+the changed issues.
+
+A token is the start time of the sync that returned it, minus OVERLAP
+seconds, so that rows written by a transaction still running at that
+time are also sent by the next sync. Clients upsert the rows and remove
+the `deleted` ids, so a row sent twice is harmless. Without a token, or
+with one older than the tombstones kept (TOMBSTONE_DAYS), the sync
+returns the whole project with `reset` set, PAGE_SIZE issues and their
+comments at a time: while `partial` is set, the token continues the full
+sync with the issues of greater ids. The last page returns the token of
+the start of the full sync, so the changes made meanwhile are sent by
+the next sync.
+
+The comments of a deleted issue are orphaned, not deleted: clients drop
+them with their issue. Renaming a project or a user refreshes no
+`updated_time`.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import compiled, models, serializers
+from .utils import representation_queryset
+
+CONFIG = {
+    'OVERLAP': 5,
+    'TOMBSTONE_DAYS': 30,
+    'PAGE_SIZE': 500,
+}
+CONFIG.update(getattr(settings, 'SYNC', {}))
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+DELETED_KEYS = {
+    models.Tombstone.ISSUE: 'issues',
+    models.Tombstone.COMMENT: 'comments',
+}
+
+
+def encode_token(moment, after=None):
+    token = str((moment - EPOCH) // timedelta(microseconds=1))
+    return token if after is None else f'{token}:{after}'
+
+
+def decode_token(token):
+    """
+    Return the time of a token and the last issue id sent by the full
+    sync it continues, or None, raise ValueError if it is not a token.
+    """
+    moment, separator, after = token.partition(':')
+    try:
+        return (EPOCH + timedelta(microseconds=int(moment)),
+                int(after) if separator else None)
+    except OverflowError:
+        raise ValueError(f'Invalid token: {token!r}.')
+
+
+def record_deletion(model, project_id, object_id):
+    models.Tombstone.objects.create(project_id=project_id, model=model,
+                                    object_id=object_id)
+
+
+def purge_tombstones(now=None):
+    """
+    Delete the tombstones older than TOMBSTONE_DAYS, return their count.
+    """
+    before = ((now or timezone.now())
+              - timedelta(days=CONFIG['TOMBSTONE_DAYS']))
+    count, _ = models.Tombstone.objects.filter(
+        deleted_time__lt=before).delete()
+    return count
+
+
+def represent(serializer, queryset):
+    """
+    Return the representations of the rows of `queryset`, compiled when
+    possible, see `compiled`.
+    """
+    plan = None
+    if compiled.CONFIG['ENABLED']:
+        plan = compiled.compile_serializer(serializer)
+    if plan is None:
+        return type(serializer)(
+            representation_queryset(queryset, serializer), many=True,
+            context=serializer.context).data
+    return plan.represent(queryset.values_list(*plan.columns))
+
+
+def changed_rows(project_id, since):
+    """
+    Return the querysets of the issues, comments and tombstones of a
+    project changed after the time `since`, or of all its issues and
+    comments and no tombstones if `since` is None.
+    """
+    issues = models.Issue.objects.filter(project_id=project_id)
+    if since is None:
+        return (issues, models.Comment.objects.filter(
+            issue__project_id=project_id), models.Tombstone.objects.none())
+    issues = issues.filter(updated_time__gt=since)
+    return (
+        issues,
+        models.Comment.objects.filter(issue__in=issues.values('id'),
+                                      updated_time__gt=since),
+        models.Tombstone.objects.filter(project_id=project_id,
+                                        deleted_time__gt=since),
+    )
+
+
+def project_changes(project_id, since, context):
+    """
+    Return the issues and comments of a project changed since the token
+    `since`, the ids of those deleted since, and the token of the next
+    sync. `context` is the context of the serializers.
+
+    Raise ValueError if `since` is not a token.
+    """
+    now = timezone.now()
+    start, after = now - timedelta(seconds=CONFIG['OVERLAP']), None
+    if since is not None:
+        since, after = decode_token(since)
+        if since < now - timedelta(days=CONFIG['TOMBSTONE_DAYS']):
+            since = after = None
+        elif after is not None:
+            # The next page of a full sync started at `since`.
+            start, since = since, None
+    reset = since is None and after is None
+
+    issues, comments, tombstones = changed_rows(project_id, since)
+    last = None
+    if since is None:
+        size = CONFIG['PAGE_SIZE']
+        issues = issues.filter(id__gt=after or 0)
+        comments = comments.filter(issue_id__gt=after or 0)
+        # The ids ending this page and starting the next one, if any.
+        bounds = list(issues.order_by('id').values_list(
+            'id', flat=True)[size - 1:size + 1])
+        if len(bounds) > 1:
+            last = bounds[0]
+            issues = issues.filter(id__lte=last)
+            comments = comments.filter(issue_id__lte=last)
+
+    deleted = {key: [] for key in DELETED_KEYS.values()}
+    for model, object_id in tombstones.order_by('id').values_list(
+            'model', 'object_id'):
+        deleted[DELETED_KEYS[model]].append(object_id)
+
+    return {
+        'token': encode_token(start, last),
+        'reset': reset,
+        'partial': last is not None,
+        'issues': represent(serializers.IssueSerializer(context=context),
+                            issues.order_by('id')),
+        'comments': represent(
+            serializers.SyncCommentSerializer(context=context),
+            comments.order_by('id')),
+        'deleted': deleted,
+    }
@@ -1,3 +1,1706 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import decimal
+import json
+import tempfile
+import tracemalloc
+from collections import Counter
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, tag
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.authentication import get_cached_user
+
+from . import (compiled, metrics, models, pagination, renderers, replicas,
+               sqlite, sync, throttling, views)
+from .management.commands import benchmark_asgi, benchmark_endpoints
+from . import stats, versions
+from .membership import get_membership, membership_cache
+from .search import SEARCH_TABLE
+
+User = get_user_model()
+
+
+class IssuesTrackingTestCase(APITestCase):
+    """
+    Base test case: a project managed by `owner` with one contributor.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username='owner',
+                                             password='S3cret-pass')
+        cls.member = User.objects.create_user(username='member',
+                                              password='S3cret-pass')
+        cls.outsider = User.objects.create_user(username='outsider',
+                                                password='S3cret-pass')
+        cls.project = models.Project.objects.create(title='Project',
+                                                    description='desc',
+                                                    type='back-end')
+        models.Contributor.objects.create(user=cls.owner, project=cls.project,
+                                          permission='CREA', role='PM')
+        models.Contributor.objects.create(user=cls.member,
+                                          project=cls.project)
+        cls.issue = models.Issue.objects.create(title='Issue',
+                                                description='desc',
+                                                project=cls.project,
+                                                author_user=cls.owner,
+                                                assignee_user=cls.member)
+        cls.comment = models.Comment.objects.create(description='comment',
+                                                    issue=cls.issue,
+                                                    author_user=cls.member)
+
+    def setUp(self):
+        membership_cache.clear()
+        versions.get_cache().clear()
+
+    def issues_url(self, project=None):
+        project = project or self.project
+        return f'/api/v1/projects/{project.id}/issues/'
+
+    def comments_url(self, issue=None):
+        issue = issue or self.issue
+        return (f'/api/v1/projects/{issue.project_id}/issues/'
+                f'{issue.id}/comments/')
+
+
+def count_membership_queries(queries):
+    return len([query for query in queries
+                if 'FROM "issuestracking_contributor"' in query['sql']
+                and '"user_id" =' in query['sql']])
+
+
+class MembershipCacheTests(IssuesTrackingTestCase):
+
+    def test_single_membership_query_per_request(self):
+        self.client.force_authenticate(self.member)
+        url = f'{self.comments_url()}{self.comment.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.put(url, {'description': 'updated'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count_membership_queries(context.captured_queries),
+                         1)
+
+    def test_warm_cache_skips_membership_query(self):
+        self.client.force_authenticate(self.member)
+        self.client.get(self.issues_url())
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.issues_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(count_membership_queries(context.captured_queries),
+                         0)
+
+    def test_contributor_deletion_invalidates_cache(self):
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.client.get(self.issues_url()).status_code, 200)
+        models.Contributor.objects.get(user=self.member).delete()
+        self.assertEqual(self.client.get(self.issues_url()).status_code, 403)
+
+    def test_contributor_creation_invalidates_cache(self):
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.issues_url()).status_code, 403)
+        models.Contributor.objects.create(user=self.outsider,
+                                          project=self.project)
+        self.assertEqual(self.client.get(self.issues_url()).status_code, 200)
+
+    def test_only_author_can_update_comment(self):
+        self.client.force_authenticate(self.owner)
+        url = f'{self.comments_url()}{self.comment.id}/'
+        response = self.client.put(url, {'description': 'updated'})
+        self.assertEqual(response.status_code, 403)
+
+
+class CursorPaginationTests(IssuesTrackingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        models.Issue.objects.bulk_create([
+            models.Issue(title=f'Issue {index}', description='desc',
+                         project=cls.project, author_user=cls.owner,
+                         assignee_user=cls.owner)
+            for index in range(11)
+        ])
+
+    def test_limit_offset_is_kept_by_default(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.issues_url(), {'offset': 10})
+        self.assertEqual(response.data['count'], 12)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_cursor_mode_walks_every_issue_without_count(self):
+        self.client.force_authenticate(self.member)
+        url, seen = f'{self.issues_url()}?cursor=', []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            self.assertFalse(any('COUNT(' in query['sql']
+                                 for query in context.captured_queries))
+            seen += [issue['id'] for issue in response.data['results']]
+            url = response.data['next']
+        expected = list(models.Issue.objects.order_by(
+            'created_time', 'id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_cursor_keys_on_every_ordering_field(self):
+        models.Issue.objects.update(created_time=timezone.now())
+        self.client.force_authenticate(self.member)
+        url, pages = f'{self.issues_url()}?cursor=&limit=5', []
+        while url:
+            response = self.client.get(url)
+            pages.append([issue['id'] for issue in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(sum(pages, []), sorted(sum(pages, [])))
+        self.assertEqual(len(sum(pages, [])), 12)
+
+        url, backwards = response.data['previous'], [pages[-1]]
+        while url:
+            response = self.client.get(url)
+            backwards.insert(
+                0, [issue['id'] for issue in response.data['results']])
+            url = response.data['previous']
+        self.assertEqual(backwards, pages)
+
+    def test_cursor_page_is_a_keyset_range(self):
+        issue = models.Issue.objects.order_by('created_time', 'id')[5]
+        cursor = pagination.encode_cursor(pagination.Cursor(
+            False, [issue.created_time, issue.id]))
+        request = Request(APIRequestFactory().get('/', {'cursor': cursor}))
+        paginator = pagination.KeysetCursorPagination()
+        queryset = models.Issue.objects.filter(project=self.project)
+        with CaptureQueriesContext(connection) as context:
+            page = paginator.paginate_queryset(queryset, request)
+        self.assertEqual(len(page), 5)
+        self.assertGreater((page[0].created_time, page[0].id),
+                           (issue.created_time, issue.id))
+        self.assertNotIn('OFFSET', context.captured_queries[0]['sql'])
+        self.assertEqual(full_table_scans(queryset.order_by(
+            'created_time', 'id').filter(pagination.keyset_filter(
+                ('created_time', 'id'), [issue.created_time, issue.id]))),
+            [])
+
+    def test_invalid_cursor(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.issues_url(), {'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_mode_on_contributors(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(
+            f'/api/v1/projects/{self.project.id}/users/?cursor=')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['next'])
+
+
+def full_table_scans(queryset):
+    """
+    Return the lines of the query plan of `queryset` that read a whole
+    table instead of going through an index.
+    """
+    plan = queryset.explain()
+    return [line for line in plan.splitlines()
+            if ('SCAN ' in line and 'USING' not in line)
+            or 'Seq Scan' in line]
+
+
+class QueryPlanTests(IssuesTrackingTestCase):
+    """
+    Every viewset queryset must be served by an index.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        projects = models.Project.objects.bulk_create([
+            models.Project(title=f'Seeded {index}', description='desc',
+                           type='back-end')
+            for index in range(50)
+        ])
+        models.Contributor.objects.bulk_create([
+            models.Contributor(user=cls.outsider, project=project)
+            for project in projects
+        ])
+        issues = models.Issue.objects.bulk_create([
+            models.Issue(title=f'Seeded issue {index}', description='desc',
+                         project=projects[index % 50], author_user=cls.owner)
+            for index in range(500)
+        ])
+        models.Comment.objects.bulk_create([
+            models.Comment(description='desc', issue=issues[index % 500],
+                           author_user=cls.owner)
+            for index in range(2000)
+        ])
+
+    def get_view(self, viewset, **kwargs):
+        request = APIRequestFactory().get('/')
+        request.user = self.member
+        view = viewset(request=request, kwargs=kwargs, action='list',
+                       format_kwarg=None)
+        return view
+
+    def assertIndexed(self, queryset):
+        self.assertEqual(full_table_scans(queryset), [])
+        ordering = getattr(self.view, 'cursor_ordering', None)
+        if ordering:
+            self.assertEqual(
+                full_table_scans(queryset.order_by(*ordering)), [])
+
+    def test_project_queryset(self):
+        self.view = self.get_view(views.ProjectViewSet)
+        self.assertIndexed(self.view.get_queryset())
+
+    def test_contributor_queryset(self):
+        self.view = self.get_view(views.ContributorViewSet,
+                                  project_pk=str(self.project.id))
+        self.assertIndexed(self.view.get_queryset())
+        self.assertIndexed(
+            self.view.get_queryset().filter(permission='CREA'))
+
+    def test_issue_queryset(self):
+        self.view = self.get_view(views.IssueViewSet,
+                                  project_pk=str(self.project.id))
+        self.assertIndexed(self.view.get_queryset())
+
+    def test_comment_queryset(self):
+        self.view = self.get_view(views.CommentViewSet,
+                                  project_pk=str(self.project.id),
+                                  issue_pk=str(self.issue.id))
+        self.assertIndexed(self.view.get_queryset())
+
+    def test_changes_querysets(self):
+        since = timezone.now() - datetime.timedelta(days=1)
+        for queryset in sync.changed_rows(self.project.id, since):
+            self.assertEqual(full_table_scans(queryset), [])
+
+    def test_helper_detects_full_scan(self):
+        self.assertNotEqual(
+            full_table_scans(models.Issue.objects.filter(title__contains='1')),
+            [])
+
+
+class ProjectDetailQueriesTests(IssuesTrackingTestCase):
+
+    def retrieve(self):
+        membership_cache.clear()
+        url = f'/api/v1/projects/{self.project.id}/'
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_query_count_does_not_depend_on_members(self):
+        self.client.force_authenticate(self.owner)
+        # membership, version, project, contributors with their users
+        response, queries = self.retrieve()
+        self.assertEqual(queries, 4)
+        self.assertEqual(len(response.data['members']), 1)
+
+        users = User.objects.bulk_create([
+            User(username=f'user {index}') for index in range(30)
+        ])
+        models.Contributor.objects.bulk_create([
+            models.Contributor(user=user, project=self.project)
+            for user in users
+        ])
+        with self.assertNumQueries(queries):
+            response, _ = self.retrieve()
+        self.assertEqual(len(response.data['members']), 31)
+        self.assertEqual(response.data['authors'][0]['user']['username'],
+                         'owner')
+        self.assertEqual(response.data['members'][0]['project'], 'Project')
+
+
+class ListQueriesTests(IssuesTrackingTestCase):
+
+    def count_list_queries(self, url):
+        membership_cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_issue_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.member)
+        queries = self.count_list_queries(self.issues_url())
+        models.Issue.objects.bulk_create([
+            models.Issue(title=f'Issue {index}', description='desc',
+                         project=self.project, author_user=self.owner,
+                         assignee_user=self.member)
+            for index in range(99)
+        ])
+        with self.assertNumQueries(queries):
+            self.count_list_queries(self.issues_url())
+
+    def test_comment_list_query_count_is_constant(self):
+        self.client.force_authenticate(self.member)
+        queries = self.count_list_queries(self.comments_url())
+        models.Comment.objects.bulk_create([
+            models.Comment(description='desc', issue=self.issue,
+                           author_user=self.owner)
+            for index in range(99)
+        ])
+        with self.assertNumQueries(queries):
+            self.count_list_queries(self.comments_url())
+
+
+class BulkIssueTests(IssuesTrackingTestCase):
+
+    def test_bulk_create_reports_each_item(self):
+        self.client.force_authenticate(self.member)
+        items = [
+            {'title': 'Bulk 1', 'description': 'desc',
+             'assignee_user': 'owner', 'priority': 'SUP'},
+            {'title': 'Issue', 'description': 'desc',
+             'assignee_user': 'owner'},
+            {'title': 'Bulk 2', 'description': 'desc',
+             'assignee_user': 'outsider'},
+            {'title': 'Bulk 1', 'description': 'desc',
+             'assignee_user': 'member'},
+        ]
+        response = self.client.post(f'{self.issues_url()}bulk-create/',
+                                    items, format='json')
+        self.assertEqual(response.status_code, 200)
+        statuses = [item['status'] for item in response.data['results']]
+        self.assertEqual(statuses, [201, 400, 400, 400])
+        issue = models.Issue.objects.get(
+            id=response.data['results'][0]['id'])
+        self.assertEqual((issue.priority, issue.author_user_id),
+                         ('SUP', self.member.id))
+
+    def test_bulk_create_query_count_is_constant(self):
+        self.client.force_authenticate(self.member)
+        url = f'{self.issues_url()}bulk-create/'
+
+        def create(prefix, count):
+            membership_cache.clear()
+            items = [{'title': f'{prefix} {index}', 'description': 'desc',
+                      'assignee_user': 'owner'} for index in range(count)]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, items, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(create('Small', 2), create('Large', 50))
+        response = self.client.get(f'{self.issues_url()}search/',
+                                   {'q': 'Large 49'})
+        self.assertEqual(
+            [issue['title'] for issue in response.data['results']],
+            ['Large 49'])
+
+    def test_bulk_update_query_count_is_constant(self):
+        self.client.force_authenticate(self.owner)
+        issues = models.Issue.objects.bulk_create([
+            models.Issue(title=f'Issue {index}', description='desc',
+                         project=self.project, author_user=self.owner)
+            for index in range(50)
+        ])
+        url = f'{self.issues_url()}bulk-update/'
+
+        def update(issues):
+            membership_cache.clear()
+            items = [{'id': issue.id, 'status': 'DON',
+                      'assignee_user': 'member'} for issue in issues]
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(url, items, format='json')
+            self.assertEqual(response.status_code, 200)
+            return len(context.captured_queries)
+
+        self.assertEqual(update(issues[:2]), update(issues))
+        self.assertEqual(
+            models.Issue.objects.filter(status='DON',
+                                        assignee_user=self.member).count(),
+            50)
+
+    def test_bulk_update_checks_each_issue(self):
+        self.client.force_authenticate(self.member)
+        own = models.Issue.objects.create(title='Own', description='desc',
+                                          project=self.project,
+                                          author_user=self.member)
+        items = [{'id': own.id, 'priority': 'MED'},
+                 {'id': self.issue.id, 'priority': 'MED'},
+                 {'id': 0, 'priority': 'MED'},
+                 {'id': own.id}]
+        response = self.client.post(f'{self.issues_url()}bulk-update/',
+                                    items, format='json')
+        statuses = [item['status'] for item in response.data['results']]
+        self.assertEqual(statuses, [200, 403, 404, 400])
+        own.refresh_from_db()
+        self.assertEqual(own.priority, 'MED')
+
+    def test_bulk_update_rejects_repeated_issues(self):
+        self.client.force_authenticate(self.owner)
+        items = [{'id': self.issue.id, 'status': 'DON'},
+                 {'id': self.issue.id, 'status': 'DON'},
+                 {'id': self.issue.id, 'status': 'DOI'}]
+        response = self.client.post(f'{self.issues_url()}bulk-update/',
+                                    items, format='json')
+        statuses = [item['status'] for item in response.data['results']]
+        self.assertEqual(statuses, [200, 400, 400])
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.status, 'DON')
+        response = self.client.get(
+            f'/api/v1/projects/{self.project.id}/stats/')
+        self.assertEqual(response.data['status'], {'DON': 1})
+
+    def test_bulk_actions_require_membership(self):
+        self.client.force_authenticate(self.outsider)
+        response = self.client.post(f'{self.issues_url()}bulk-update/',
+                                    [{'id': self.issue.id, 'status': 'DON'}],
+                                    format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportTests(IssuesTrackingTestCase):
+
+    def export(self, user, output='ndjson'):
+        self.client.force_authenticate(user)
+        return self.client.get(
+            f'/api/v1/projects/{self.project.id}/export/',
+            {'output': output})
+
+    def test_export_ndjson(self):
+        models.Issue.objects.create(title='Empty', description='desc',
+                                    project=self.project)
+        response = self.export(self.member)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line)
+                for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['comment_description'], 'comment')
+        self.assertEqual(rows[0]['issue_assignee'], 'member')
+        self.assertIsNone(rows[1]['comment_id'])
+
+    def test_export_csv(self):
+        response = self.export(self.member, 'csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('issue_id,issue_title'))
+        self.assertEqual(len(lines), 2)
+
+    def test_export_requires_membership(self):
+        self.assertEqual(self.export(self.outsider).status_code, 404)
+
+    @tag('slow')
+    def test_export_memory_does_not_grow_with_project(self):
+        issues = models.Issue.objects.bulk_create([
+            models.Issue(title=f'Export {index}', description='desc',
+                         project=self.project)
+            for index in range(1000)
+        ])
+        for chunk in range(0, 1000, 50):
+            models.Comment.objects.bulk_create([
+                models.Comment(description='x' * 64, issue=issue)
+                for issue in issues[chunk:chunk + 50] for _ in range(100)
+            ])
+        response = self.export(self.member)
+        tracemalloc.start()
+        rows = sum(1 for _ in response.streaming_content)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.assertEqual(rows, 100001)
+        self.assertLess(peak, 5 * 1024 * 1024)
+
+
+class ConditionalGetTests(IssuesTrackingTestCase):
+
+    def test_not_modified_reads_only_the_version(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.issues_url())
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.issues_url(),
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        self.client.force_authenticate(self.member)
+        project_url = f'/api/v1/projects/{self.project.id}/'
+        etags = [self.client.get(project_url)['ETag'],
+                 self.client.get(self.issues_url())['ETag'],
+                 self.client.get(self.comments_url())['ETag']]
+        models.Comment.objects.create(description='new', issue=self.issue)
+        for url, etag in zip(
+                [project_url, self.issues_url(), self.comments_url()], etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_the_page(self):
+        self.client.force_authenticate(self.member)
+        etag = self.client.get(self.issues_url())['ETag']
+        response = self.client.get(self.issues_url(), {'offset': 5},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_outsider_gets_no_etag(self):
+        self.client.force_authenticate(self.member)
+        etag = self.client.get(self.issues_url())['ETag']
+        self.client.force_authenticate(self.outsider)
+        response = self.client.get(self.issues_url(),
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 403)
+
+    def test_version_outlives_the_process_cache(self):
+        # A fresh worker has empty caches but tags the same rows alike.
+        self.client.force_authenticate(self.member)
+        etag = self.client.get(self.issues_url())['ETag']
+        caches['default'].clear()
+        response = self.client.get(self.issues_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        models.Issue.objects.filter(id=self.issue.id).update(title='Other')
+        versions.bump_project_version(self.project.id)
+        caches['default'].clear()
+        response = self.client.get(self.issues_url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_cached_responses(self):
+        self.client.force_authenticate(self.member)
+        with patch.dict(versions.CONFIG, {'CACHE_RESPONSES': True}):
+            expected = self.client.get(self.issues_url()).data
+            with self.assertNumQueries(1):
+                response = self.client.get(self.issues_url())
+        self.assertEqual(response.data, expected)
+
+
+class SearchTests(IssuesTrackingTestCase):
+
+    def search(self, query, user=None):
+        self.client.force_authenticate(user or self.member)
+        return self.client.get(f'{self.issues_url()}search/', {'q': query})
+
+    def titles(self, response):
+        return [issue['title'] for issue in response.data['results']]
+
+    def test_search_ranks_titles_and_comments(self):
+        login = models.Issue.objects.create(
+            title='Login broken', description='crash on submit',
+            project=self.project, assignee_user=self.member)
+        other = models.Issue.objects.create(
+            title='Slow page', description='the profile page is slow',
+            project=self.project, assignee_user=self.member)
+        models.Comment.objects.create(description='probably the login form',
+                                      issue=other)
+        response = self.search('login')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.titles(response), [login.title, other.title])
+        self.assertEqual(self.titles(self.search('submit crash')),
+                         [login.title])
+
+    def test_index_follows_writes(self):
+        issue = models.Issue.objects.create(
+            title='Typo', description='desc', project=self.project,
+            assignee_user=self.member)
+        issue.title = 'Misspelling'
+        issue.save()
+        self.assertEqual(self.titles(self.search('typo')), [])
+        self.assertEqual(self.titles(self.search('misspelling')),
+                         ['Misspelling'])
+        self.comment.delete()
+        self.assertEqual(self.titles(self.search('comment')), [])
+        issue.delete()
+        self.assertEqual(self.titles(self.search('misspelling')), [])
+
+    def test_search_is_scoped_to_the_project(self):
+        other_project = models.Project.objects.create(
+            title='Other', description='desc', type='back-end')
+        models.Contributor.objects.create(user=self.member,
+                                          project=other_project)
+        models.Issue.objects.create(title='Hidden', description='desc',
+                                    project=other_project)
+        self.assertEqual(self.titles(self.search('hidden')), [])
+        self.assertEqual(self.search('issue', self.outsider).status_code,
+                         403)
+
+    def test_limit_is_bounded(self):
+        for index in range(3):
+            models.Issue.objects.create(
+                title=f'Bounded {index}', description='desc',
+                project=self.project, assignee_user=self.member)
+        self.client.force_authenticate(self.member)
+        url = f'{self.issues_url()}search/'
+        for backend in ['issuestracking.search.SQLiteFTS5Backend',
+                        'issuestracking.search.QuerySetSearchBackend']:
+            with self.subTest(backend=backend), \
+                    override_settings(SEARCH_BACKEND=backend), \
+                    patch.object(views.IssueViewSet, 'search_max_results',
+                                 2):
+                for limit in ['0', '-1']:
+                    response = self.client.get(
+                        url, {'q': 'bounded', 'limit': limit})
+                    self.assertEqual(response.status_code, 400)
+                response = self.client.get(
+                    url, {'q': 'bounded', 'limit': '50'})
+                self.assertEqual(len(response.data['results']), 2)
+
+    def test_bulk_created_issues_are_indexed(self):
+        self.client.force_authenticate(self.member)
+        self.client.post(f'{self.issues_url()}bulk-create/', [
+            {'title': 'Bulk', 'description': 'imported',
+             'assignee_user': 'member'}], format='json')
+        self.assertEqual(self.titles(self.search('imported')), ['Bulk'])
+
+
+class IssueFilterTests(IssuesTrackingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        models.Issue.objects.bulk_create([
+            models.Issue(title=f'Filtered {index}', description='desc',
+                         project=cls.project, author_user=cls.owner,
+                         status='DON' if index % 2 else 'TOD',
+                         priority='SUP' if index % 3 == 0 else 'LOW',
+                         assignee_user=cls.owner if index < 4 else None)
+            for index in range(6)
+        ])
+
+    def get_issues(self, **params):
+        self.client.force_authenticate(self.member)
+        return self.client.get(self.issues_url(), {'limit': 100, **params})
+
+    def test_filters(self):
+        response = self.get_issues(status='DON', priority='SUP')
+        self.assertEqual([issue['title']
+                          for issue in response.data['results']],
+                         ['Filtered 3'])
+        response = self.get_issues(assignee_user='member')
+        self.assertEqual([issue['title']
+                          for issue in response.data['results']],
+                         ['Issue'])
+
+    def test_ordering(self):
+        response = self.get_issues(ordering='-priority,-created_time')
+        priorities = [issue['priority'] for issue in response.data['results']]
+        self.assertEqual(priorities, sorted(priorities, reverse=True))
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.get_issues(status='NOPE').status_code, 400)
+        self.assertEqual(self.get_issues(ordering='title').status_code, 400)
+
+    def test_facets_in_one_query(self):
+        self.client.force_authenticate(self.member)
+        self.client.get(self.issues_url())
+        with self.assertNumQueries(1):
+            response = self.client.get(f'{self.issues_url()}facets/',
+                                       {'priority': 'LOW'})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(response.data['status'], {'TOD': 3, 'DON': 2})
+        self.assertEqual(response.data['assignee_user'],
+                         {'owner': 2, 'member': 1, None: 2})
+
+    def test_filtered_querysets_use_an_index(self):
+        request = Request(APIRequestFactory().get(
+            '/', {'status': 'DON', 'assignee_user': 'owner'}))
+        view = views.IssueViewSet(request=request, action='list',
+                                  kwargs={'project_pk': str(self.project.id)},
+                                  format_kwarg=None)
+        queryset = view.filter_queryset(view.get_queryset())
+        self.assertEqual(full_table_scans(queryset), [])
+
+
+class CounterTests(IssuesTrackingTestCase):
+
+    def assertProjectCounters(self, issues, open_issues, contributors):
+        self.project.refresh_from_db()
+        self.assertEqual((self.project.issues_count,
+                          self.project.open_issues_count,
+                          self.project.contributors_count),
+                         (issues, open_issues, contributors))
+
+    def test_project_counters(self):
+        self.assertProjectCounters(1, 1, 2)
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(self.issues_url(), {
+            'title': 'New', 'description': 'desc',
+            'assignee_user': 'member'})
+        issue = models.Issue.objects.get(id=response.data['id'])
+        self.assertProjectCounters(2, 2, 2)
+        self.client.put(f'{self.issues_url()}{issue.id}/', {
+            'title': 'New', 'description': 'desc', 'status': 'DON',
+            'assignee_user': 'member'})
+        self.assertProjectCounters(2, 1, 2)
+        self.client.post(f'{self.issues_url()}bulk-update/',
+                         [{'id': issue.id, 'status': 'DOI'}], format='json')
+        self.assertProjectCounters(2, 2, 2)
+        self.client.delete(f'{self.issues_url()}{issue.id}/')
+        models.Contributor.objects.get(user=self.member).delete()
+        self.assertProjectCounters(1, 1, 1)
+
+        response = self.client.get('/api/v1/projects/')
+        self.assertEqual(response.data['results'][0]['open_issues_count'], 1)
+
+    def test_created_project_counts_its_creator(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.post('/api/v1/projects/', {
+            'title': 'Created', 'description': 'desc', 'type': 'iOS'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['contributors_count'], 1)
+        self.assertEqual(models.Project.objects.get(
+            id=response.data['id']).contributors_count, 1)
+
+    def test_issue_counters(self):
+        self.client.force_authenticate(self.member)
+        before = models.Issue.objects.get(id=self.issue.id)
+        self.client.post(self.comments_url(), {'description': 'new'})
+        issue = models.Issue.objects.get(id=self.issue.id)
+        self.assertEqual(issue.comments_count, 2)
+        self.assertGreater(issue.last_activity_time,
+                           before.last_activity_time)
+        self.comment.delete()
+        response = self.client.get(f'{self.issues_url()}{self.issue.id}/')
+        self.assertEqual(response.data['comments_count'], 1)
+
+    def test_stale_save_keeps_counters(self):
+        stale = models.Issue.objects.get(id=self.issue.id)
+        models.Comment.objects.create(description='new', issue=self.issue)
+        stale.priority = 'SUP'
+        stale.save()
+        self.assertEqual(
+            models.Issue.objects.get(id=self.issue.id).comments_count, 2)
+
+    def test_reconcile_counters(self):
+        models.Project.objects.update(issues_count=42)
+        models.Issue.objects.update(comments_count=7)
+        out = StringIO()
+        call_command('reconcile_counters', batch_size=1, stdout=out)
+        self.assertIn('Project: fixed 1 drifted rows.', out.getvalue())
+        self.assertIn('Issue: fixed 1 drifted rows.', out.getvalue())
+        self.assertProjectCounters(1, 1, 2)
+        self.assertEqual(
+            models.Issue.objects.get(id=self.issue.id).comments_count, 1)
+
+
+class ProjectStatsTests(IssuesTrackingTestCase):
+
+    def stats_url(self, **params):
+        query = '&'.join(f'{key}={value}' for key, value in params.items())
+        return f'/api/v1/projects/{self.project.id}/stats/?{query}'
+
+    def test_stats_follow_issue_writes(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.post(
+            f'{self.issues_url()}bulk-create/',
+            [{'title': 'Bulk', 'description': 'desc', 'tag': 'TSK',
+              'assignee_user': 'member'}],
+            format='json')
+        issue_id = response.data['results'][0]['id']
+        self.client.post(f'{self.issues_url()}bulk-update/',
+                         [{'id': issue_id, 'status': 'DON'}], format='json')
+        self.client.put(f'{self.issues_url()}{self.issue.id}/', {
+            'title': 'Issue', 'description': 'desc', 'status': 'DON',
+            'priority': 'SUP', 'assignee_user': 'member'})
+        self.client.put(f'{self.issues_url()}{self.issue.id}/', {
+            'title': 'Issue', 'description': 'desc', 'status': 'DOI',
+            'priority': 'SUP', 'assignee_user': 'member'})
+        models.Issue.objects.get(id=issue_id).delete()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.stats_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], {'DOI': 1})
+        self.assertEqual(response.data['priority'], {'SUP': 1})
+        self.assertEqual(response.data['tag'], {'BUG': 1})
+        self.assertEqual((response.data['created'], response.data['closed'],
+                          response.data['reopened']), (2, 2, 1))
+        self.assertEqual(response.data['close_time_hours'], {'1': 2})
+        self.assertEqual(response.data['median_close_time_hours'], '1')
+        self.assertEqual(len(response.data['daily']), 1)
+
+    def test_stats_range(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(
+            self.stats_url(since='2000-01-01', until='2000-01-31'))
+        self.assertEqual(response.data['created'], 0)
+        self.assertEqual(response.data['status'], {})
+        self.assertEqual(response.data['median_close_time_hours'], None)
+        response = self.client.get(self.stats_url(since='2000-02-30'))
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            self.stats_url(since='2000-02-02', until='2000-02-01'))
+        self.assertEqual(response.status_code, 400)
+
+    def test_stats_hidden_from_outsiders(self):
+        self.client.force_authenticate(self.outsider)
+        response = self.client.get(self.stats_url())
+        self.assertEqual(response.status_code, 404)
+
+    def test_project_with_issues_can_be_deleted(self):
+        self.client.force_authenticate(self.owner)
+        response = self.client.delete(f'/api/v1/projects/{self.project.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(models.ProjectDailyStat.objects.exists())
+
+    def test_project_deletion_runs_constant_queries(self):
+        self.client.force_authenticate(self.owner)
+        for issues in [1, 20]:
+            project = models.Project.objects.create(
+                title=f'Deleted {issues}', description='desc',
+                type='back-end')
+            models.Contributor.objects.create(
+                user=self.owner, project=project, permission='CREA',
+                role='PM')
+            models.Contributor.objects.create(user=self.member,
+                                              project=project)
+            for index in range(issues):
+                issue = models.Issue.objects.create(
+                    title=f'Deleted {issues}-{index}', description='desc',
+                    project=project, author_user=self.owner)
+                models.Comment.objects.create(description='comment',
+                                              issue=issue)
+            with self.assertNumQueries(12):
+                response = self.client.delete(
+                    f'/api/v1/projects/{project.id}/')
+            self.assertEqual(response.status_code, 204)
+            self.assertFalse(models.Tombstone.objects.exists())
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE} '
+                               f'WHERE project_id = %s', [project.id])
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_record_without_upsert(self):
+        day = self.issue.created_time.date()
+        with patch('issuestracking.stats.UPSERT_VENDORS', []):
+            stats.record(self.project.id, day, Counter({('created', ''): 2,
+                                                        ('closed', ''): 1}))
+        row = models.ProjectDailyStat.objects.get(
+            project=self.project, day=day, metric='created')
+        self.assertEqual(row.count, 3)
+
+
+class MetricsTests(IssuesTrackingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+
+    def test_disabled_by_default(self):
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.issues_url())
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+    @patch.dict(metrics.CONFIG, ENABLED=True)
+    def test_server_timing_and_metrics(self):
+        self.client.force_authenticate(self.member)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.issues_url())
+        timing = response['Server-Timing']
+        self.assertIn('desc="4 queries"', timing)
+        for phase in ['total', 'sql', 'permissions', 'serializer', 'render']:
+            self.assertIn(f'{phase};dur=', timing)
+
+        text = self.client.get('/metrics').content.decode()
+        labels = 'route="project-issues-list",method="GET"'
+        self.assertIn(f'http_requests_total{{{labels},status="200"}} 1',
+                      text)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},'
+                      f'le="+Inf"}} 1', text)
+        self.assertIn(f'http_request_phase_seconds_count{{{labels},'
+                      f'phase="serializer"}} 1', text)
+        self.assertIn(f'http_request_sql_queries_total{{{labels}}} 4',
+                      text)
+
+    @patch.dict(metrics.CONFIG, ENABLED=True, TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics',
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+
+    def test_histogram_buckets(self):
+        histogram = metrics.Histogram([0.1, 1])
+        for value in [0.05, 0.1, 0.5, 3]:
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [2, 1, 1])
+
+
+class SeedAndBenchmarkTests(TransactionTestCase):
+
+    def test_seed_data(self):
+        call_command('seed_data', users=4, projects=2, contributors=3,
+                     issues=3, comments=2, seed=1, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 4)
+        self.assertEqual(models.Contributor.objects.count(), 6)
+        self.assertEqual(models.Comment.objects.count(), 12)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Project: fixed 0 drifted rows.', out.getvalue())
+        self.assertIn('Issue: fixed 0 drifted rows.', out.getvalue())
+        project = models.Project.objects.first()
+        today = timezone.localdate()
+        summary = stats.project_summary(project.id, today, today)
+        self.assertEqual(summary['created'], 3)
+
+    def test_benchmark_endpoints(self):
+        call_command('seed_data', users=4, projects=1, contributors=3,
+                     issues=3, comments=2, seed=1, stdout=StringIO())
+        routes = ['projects-list', 'issues-delete', 'comments-list']
+        with tempfile.NamedTemporaryFile('r') as output:
+            call_command('benchmark_endpoints', requests=2, warmup=0,
+                         only=routes, output=output.name, stdout=StringIO())
+            results = json.load(output)['results']
+        self.assertEqual(list(results), routes)
+        self.assertEqual(results['issues-delete']['status'], [204])
+        self.assertEqual(models.Issue.objects.count(), 3)
+
+        baseline = {name: {**result, 'queries': result['queries'] - 1}
+                    for name, result in results.items()}
+        regressions = benchmark_endpoints.compare(results, baseline, 0.2, 1)
+        self.assertEqual(len(regressions), len(routes))
+        self.assertEqual(
+            benchmark_endpoints.compare(results, results, 0.2, 1), [])
+
+    def test_benchmark_bulk(self):
+        out = StringIO()
+        call_command('benchmark_bulk', items=3, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(results['create_each']['status'], [201])
+        self.assertEqual(results['update_each']['requests'], 3)
+        self.assertEqual(results['bulk_update']['status'], [200])
+        self.assertFalse(models.Issue.objects.exists())
+
+    def test_benchmark_pagination(self):
+        out = StringIO()
+        call_command('benchmark_pagination', sizes=[10, 20], limit=5,
+                     repeat=1, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual([result['issues'] for result in results], [10, 20])
+        self.assertFalse(models.Issue.objects.exists())
+
+    def test_benchmark_search(self):
+        call_command('seed_data', users=4, projects=1, contributors=3,
+                     issues=3, comments=2, seed=1, stdout=StringIO())
+        out = StringIO()
+        # Two comments of the first issue, one of the second.
+        call_command('benchmark_search', rare=3, repeat=1, stdout=out)
+        output = json.loads(out.getvalue())
+        self.assertEqual(output['comments'], 6)
+        counts = {backend: {case: result['results']
+                            for case, result in results.items()}
+                  for backend, results in output['results'].items()}
+        self.assertEqual(counts['fts5']['rare'], 2)
+        self.assertEqual(counts['icontains']['rare'], 2)
+        self.assertEqual(counts['fts5']['common'],
+                         counts['icontains']['common'])
+        self.assertFalse(models.Comment.objects.filter(
+            description__contains='zeppelin').exists())
+
+    def test_benchmark_stats(self):
+        call_command('seed_data', users=4, projects=1, contributors=3,
+                     issues=6, comments=0, seed=1, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_stats', days=3, period=2, repeat=1,
+                     stdout=out)
+        output = json.loads(out.getvalue())
+        self.assertEqual(set(output['results']),
+                         {'issue_aggregate', 'summary'})
+        project = models.Project.objects.get()
+        today = timezone.localdate()
+        self.assertEqual(
+            stats.project_summary(project.id, today, today)['created'], 6)
+
+    def test_benchmark_asgi(self):
+        call_command('seed_data', users=4, projects=1, contributors=3,
+                     issues=3, comments=2, seed=1, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_asgi', requests=4, concurrency=2, warmup=0,
+                     stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(list(results), list(benchmark_asgi.ROUTES))
+        for result in results.values():
+            self.assertEqual(list(result), ['sync', 'async'])
+            for mode in result.values():
+                self.assertEqual(mode['errors'], 0)
+
+    @patch.dict(sync.CONFIG, OVERLAP=0)
+    def test_benchmark_sync(self):
+        call_command('seed_data', users=4, projects=1, contributors=3,
+                     issues=5, comments=2, seed=1, stdout=StringIO())
+        out = StringIO()
+        call_command('benchmark_sync', updates=1, comments=1, deletes=1,
+                     repeat=1, stdout=out)
+        results = json.loads(out.getvalue())['results']
+        self.assertEqual(results['full_refetch']['requests'], 5)
+        self.assertLess(results['delta_sync']['bytes'],
+                        results['full_sync']['bytes'] / 2)
+        self.assertEqual(models.Issue.objects.count(), 5)
+        self.assertFalse(models.Tombstone.objects.exists())
+
+
+class NestedParentsTests(IssuesTrackingTestCase):
+
+    def test_issue_without_comments(self):
+        issue = models.Issue.objects.create(
+            title='Quiet', description='desc', project=self.project,
+            author_user=self.owner)
+        self.client.force_authenticate(self.member)
+        response = self.client.get(self.comments_url(issue))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 0)
+
+    def test_issue_of_another_project(self):
+        other = models.Project.objects.create(title='Other',
+                                              description='desc',
+                                              type='back-end')
+        models.Contributor.objects.create(user=self.member, project=other)
+        self.client.force_authenticate(self.member)
+        url = (f'/api/v1/projects/{other.id}/issues/{self.issue.id}/'
+               f'comments/')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(
+            self.client.post(url, {'description': 'new'}).status_code, 404)
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(
+            self.client.get(self.comments_url()).status_code, 403)
+
+    def test_chain_and_membership_in_one_query(self):
+        self.client.force_authenticate(self.member)
+        # Version, chain with membership, count, page.
+        with self.assertNumQueries(4):
+            response = self.client.get(self.comments_url())
+        self.assertEqual(response.data['count'], 1)
+        membership_cache.clear()
+        versions.get_cache().clear()
+        # Chain with membership, insert, then the counters, search index,
+        # and version bump of the post_save signals.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.comments_url(),
+                                        {'description': 'new'})
+        self.assertEqual(response.status_code, 201)
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertEqual(len(selects), 1, selects)
+
+    def test_create_issue_reuses_project(self):
+        self.client.force_authenticate(self.member)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.issues_url(), {
+                'title': 'New', 'description': 'desc',
+                'assignee_user': 'owner'})
+        self.assertEqual(response.status_code, 201)
+        project_selects = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(
+                'SELECT "issuestracking_project"."id"')]
+        self.assertEqual(len(project_selects), 1)
+
+
+class ReplicaRoutingTests(IssuesTrackingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.router = replicas.PrimaryReplicaRouter()
+        self.token = replicas._state.set(replicas.RoutingState())
+
+    def tearDown(self):
+        replicas._state.reset(self.token)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_reads_stick_to_primary_after_a_write(self):
+        self.assertEqual(self.router.db_for_read(models.Issue), 'default')
+        replicas.allow_replica_reads()
+        self.assertEqual(self.router.db_for_read(models.Issue), 'replica1')
+        self.assertEqual(self.router.db_for_write(models.Issue), 'default')
+        self.assertEqual(self.router.db_for_read(models.Issue), 'default')
+        replicas.allow_replica_reads()
+        self.assertEqual(self.router.db_for_read(models.Issue), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_one_replica_per_request(self):
+        replicas.allow_replica_reads()
+        replica = self.router.db_for_read(models.Issue)
+        for _ in range(10):
+            self.assertEqual(self.router.db_for_read(models.Project),
+                             replica)
+        self.assertFalse(self.router.allow_migrate(replica, 'issuestracking'))
+        self.assertTrue(self.router.allow_migrate('default',
+                                                  'issuestracking'))
+
+    def test_outside_requests_and_without_replicas(self):
+        replicas.allow_replica_reads()
+        self.assertEqual(self.router.db_for_read(models.Issue), 'default')
+        replicas._state.set(None)
+        self.assertEqual(self.router.db_for_read(models.Issue), 'default')
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_safe_actions_only(self):
+        routed = []
+
+        def record_route(view, request, *args, **kwargs):
+            routed.append((view.action,
+                           self.router.db_for_read(models.Issue)))
+            raise NotFound()
+
+        self.client.force_authenticate(self.member)
+        with patch('rest_framework.views.APIView.initial', record_route):
+            self.client.get(self.issues_url())
+            self.client.post(self.issues_url(), {})
+            self.client.get(f'{self.issues_url()}facets/')
+        self.assertEqual(routed, [('list', 'replica1'),
+                                  ('create', 'default'),
+                                  ('facets', 'default')])
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_cache_misses_read_the_primary(self):
+        # 'replica1' is not configured: reading it would raise.
+        replicas.allow_replica_reads()
+        self.assertEqual(self.router.db_for_read(models.Issue), 'replica1')
+        request = APIRequestFactory().get('/')
+        request.user = self.member
+        self.assertEqual(get_membership(request, self.project.id).role,
+                         'PS')
+        self.assertEqual(get_cached_user(self.member.id).username, 'member')
+
+
+# The primary stands in for a lagging replica.
+@override_settings(DATABASE_REPLICAS=['default'])
+class ReplicaReadCachingTests(IssuesTrackingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def test_replica_reads_get_no_etag(self):
+        response = self.client.get(self.issues_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertIn('ETag', self.client.get(self.issues_url()))
+
+    def test_replica_parents_do_not_fill_membership_cache(self):
+        response = self.client.get(self.comments_url())
+        self.assertEqual(response.status_code, 200)
+        found, _ = membership_cache.get((self.member.id, self.project.id))
+        self.assertFalse(found)
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.client.get(self.comments_url())
+        found, _ = membership_cache.get((self.member.id, self.project.id))
+        self.assertTrue(found)
+
+
+class SQLiteProfileTests(TransactionTestCase):
+
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profile_pragmas(self):
+        sqlite.apply_profile(connection)
+        self.assertNotEqual(self.pragma('cache_size'), -64 * 1024)
+        with patch.dict(sqlite.CONFIG, ENABLED=True):
+            sqlite.apply_profile(connection)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64 * 1024)
+
+
+THROTTLE_RATES = {
+    'write_user': '3/min',
+    'write_project': '4/min',
+    'login_ip': '2/min',
+}
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': THROTTLE_RATES})
+class LocMemThrottlingTests(IssuesTrackingTestCase):
+    """
+    Throttles against the local-memory cache, see `FileThrottlingTests`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # 10 seconds into a window.
+        self.now = 600010.0
+        timer = patch.object(throttling.SlidingWindowThrottle, 'timer',
+                             staticmethod(lambda: self.now))
+        timer.start()
+        self.addCleanup(timer.stop)
+
+    def post_comment(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(self.comments_url(), {'description': 'new'})
+
+    def test_writes_are_throttled_for_each_user(self):
+        for _ in range(3):
+            self.assertEqual(self.post_comment(self.member).status_code, 201)
+        self.assertEqual(self.post_comment(self.owner).status_code, 201)
+        response = self.post_comment(self.member)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '50')
+        self.assertEqual(self.client.get(self.comments_url()).status_code,
+                         200)
+
+    def test_previous_window_is_weighted(self):
+        for _ in range(3):
+            self.post_comment(self.member)
+        # Halfway into the next window, the 3 writes weigh 1.5.
+        self.now += 80
+        for _ in range(2):
+            self.assertEqual(self.post_comment(self.member).status_code, 201)
+        self.assertEqual(self.post_comment(self.member).status_code, 429)
+        # They weigh 0.75 three quarters into it.
+        self.now += 15
+        self.assertEqual(self.post_comment(self.member).status_code, 201)
+
+    def test_writes_are_throttled_for_each_project(self):
+        for user in [self.member, self.member, self.owner, self.owner]:
+            self.assertEqual(self.post_comment(user).status_code, 201)
+        self.assertEqual(self.post_comment(self.owner).status_code, 429)
+
+    def test_logins_are_throttled_for_each_ip(self):
+        data = {'username': 'member', 'password': 'wrong-pass'}
+        for _ in range(2):
+            self.assertEqual(
+                self.client.post('/api/v1/login/', data).status_code, 401)
+        self.assertEqual(
+            self.client.post('/api/v1/login/', data).status_code, 429)
+        self.assertEqual(
+            self.client.post('/api/v1/login/', data,
+                             REMOTE_ADDR='10.0.0.2').status_code, 401)
+
+    def test_counters_are_two_integers(self):
+        for _ in range(3):
+            self.post_comment(self.member)
+        self.now += 60
+        self.post_comment(self.member)
+        cache = throttling.caches[throttling.CONFIG['CACHE']]
+        key = f'throttle:write_user:{self.member.id}'
+        self.assertEqual(
+            cache.get_many([f'{key}:9999', f'{key}:10000', f'{key}:10001']),
+            {f'{key}:10000': 3, f'{key}:10001': 1})
+
+
+class FileThrottlingTests(LocMemThrottlingTests):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        caches = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': directory.name,
+        }})
+        caches.enable()
+        self.addCleanup(caches.disable)
+        super().setUp()
+
+
+class SparseFieldsTests(IssuesTrackingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def get(self, url, table):
+        """
+        Return the response and the SQL of the queries reading `table`.
+        """
+        statements = []
+
+        def capture(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            response = self.client.get(url)
+        return response, [sql for sql in statements
+                          if f'FROM "{table}"' in sql]
+
+    def test_fields_trim_payload_and_columns(self):
+        response, statements = self.get(
+            f'{self.issues_url()}?fields=id,title,status',
+            'issuestracking_issue')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [
+            {'id': self.issue.id, 'title': 'Issue', 'status': 'TOD'}])
+        sql = statements[-1]
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"description"', sql)
+
+    def test_default_list_joins_only_rendered_relations(self):
+        response, statements = self.get(self.issues_url(),
+                                        'issuestracking_issue')
+        self.assertEqual(response.data['results'][0]['assignee_user'],
+                         'member')
+        self.assertEqual(response.data['results'][0]['author_user'],
+                         self.owner.id)
+        self.assertEqual(statements[-1].count('JOIN'), 2)
+
+    def test_expand_embeds_users(self):
+        response, statements = self.get(
+            f'{self.issues_url()}{self.issue.id}/'
+            '?fields=id,author_user,assignee_user'
+            '&expand=author_user,assignee_user',
+            'issuestracking_issue')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['author_user']['username'], 'owner')
+        self.assertEqual(response.data['assignee_user'], {
+            'id': self.member.id, 'username': 'member', 'first_name': '',
+            'last_name': ''})
+        self.assertEqual(statements[-1].count('JOIN'), 2)
+        self.assertNotIn('"password"', statements[-1])
+
+    def test_expand_comment_issue(self):
+        response, statements = self.get(
+            f'{self.comments_url()}?fields=id,issue&expand=issue',
+            'issuestracking_comment')
+        self.assertEqual(response.data['results'], [{
+            'id': self.comment.id,
+            'issue': {'id': self.issue.id, 'title': 'Issue', 'tag': 'BUG',
+                      'priority': 'LOW', 'status': 'TOD'}}])
+        self.assertEqual(statements[-1].count('JOIN'), 1)
+        self.assertNotIn('"issuestracking_comment"."description"',
+                         statements[-1])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(f'{self.issues_url()}?fields=secret')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'{self.comments_url()}?expand=project')
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_pages_need_no_extra_query(self):
+        models.Issue.objects.bulk_create([
+            models.Issue(title=f'Issue {index}', description='desc',
+                         project=self.project, author_user=self.owner)
+            for index in range(10)])
+        url = f'{self.issues_url()}?fields=id&cursor='
+        self.client.get(url)
+        # The version, then the page.
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertIsNotNone(response.data['next'])
+
+
+class CompiledListTests(IssuesTrackingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        issue = models.Issue.objects.create(
+            title='Ünicode \u2028 issue', description='«desc»\u2029',
+            project=cls.project, author_user=cls.member, status='DON')
+        models.Comment.objects.create(description='comment',
+                                      issue=issue, author_user=None)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.member)
+
+    def assertSameBytes(self, url, model=models.Issue):
+        """
+        Compare the response to the one of the DRF serializer and
+        renderer, and return it. No `model` instance must be built.
+        """
+        with patch.object(model, 'from_db', wraps=model.from_db) as from_db:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(from_db.call_count, 0)
+        versions.get_cache().clear()
+        with patch.dict(compiled.CONFIG, ENABLED=False), \
+                patch.dict(renderers.CONFIG, BACKEND='json'):
+            expected = self.client.get(url)
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_issue_lists_are_identical(self):
+        for query in ['', '?limit=100', '?fields=id,title,status',
+                      '?expand=author_user,assignee_user', '?cursor=',
+                      '?status=DON&fields=title,created_time']:
+            with self.subTest(query=query):
+                self.assertSameBytes(f'{self.issues_url()}{query}')
+
+    def test_comment_lists_are_identical(self):
+        issue = models.Issue.objects.get(status='DON')
+        for query in ['', '?expand=author_user,issue', '?fields=issue']:
+            with self.subTest(query=query):
+                response = self.assertSameBytes(
+                    f'{self.comments_url(issue)}{query}', models.Comment)
+        self.assertIn(b'\\u2028', response.content)
+
+    def test_serializer_with_unknown_field_is_not_compiled(self):
+        request = Request(APIRequestFactory().get('/'))
+        serializer = views.serializers.ContributorSerializer(
+            context={'request': request})
+        self.assertIsNone(compiled.compile_serializer(serializer))
+
+    def test_compiled_functions_are_bounded(self):
+        compiled._compile_function.cache_clear()
+        fields = ['id', 'title', 'status', 'priority', 'tag',
+                  'created_time', 'comments_count', 'description', 'project']
+        for size in range(1, len(fields) + 1):
+            for start in range(0, len(fields) - size + 1):
+                selected = ','.join(fields[start:start + size])
+                self.client.get(f'{self.issues_url()}?fields={selected}')
+        info = compiled._compile_function.cache_info()
+        self.assertEqual(info.maxsize, compiled.CONFIG['CACHE_SIZE'])
+        self.assertEqual(info.currsize, 45)
+
+
+class FastJSONRendererTests(APITestCase):
+
+    def test_same_bytes_as_drf(self):
+        data = {
+            'text': 'é \u2028 \u2029 "quoted"', 'none': None, 1: [1.5, True],
+            None: 'null key', 'when': datetime.datetime(
+                2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 1, 2), 'amount': decimal.Decimal('2.5'),
+            'lazy': views.status.HTTP_200_OK, 'tuple': (1, 2),
+        }
+        renderer = renderers.FastJSONRenderer()
+        expected = renderers.JSONRenderer().render(data)
+        self.assertEqual(renderer.render(data), expected)
+        with patch.dict(renderers.CONFIG, BACKEND='json'):
+            self.assertEqual(renderer.render(data), expected)
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderer.render(data), expected)
+
+    def test_unencodable_data_falls_back(self):
+        data = {'big': 2 ** 70}
+        self.assertEqual(renderers.FastJSONRenderer().render(data),
+                         b'{"big":1180591620717411303424}')
+
+    def test_indent_uses_stdlib(self):
+        renderer = renderers.FastJSONRenderer()
+        self.assertEqual(
+            renderer.render({'a': 1}, 'application/json; indent=2'),
+            b'{\n  "a": 1\n}')
+
+
+@patch.dict(sync.CONFIG, OVERLAP=0)
+class DeltaSyncTests(IssuesTrackingTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.untouched = models.Issue.objects.create(
+            title='Untouched', description='desc', project=cls.project,
+            author_user=cls.owner)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.owner)
+
+    def sync(self, since=None, status_code=200):
+        url = f'/api/v1/projects/{self.project.id}/changes/'
+        if since is not None:
+            url += f'?since={since}'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code)
+        return response.data
+
+    def ids(self, rows):
+        return [row['id'] for row in rows]
+
+    def test_full_sync(self):
+        data = self.sync()
+        self.assertTrue(data['reset'])
+        self.assertEqual(self.ids(data['issues']),
+                         [self.issue.id, self.untouched.id])
+        self.assertEqual(self.ids(data['comments']), [self.comment.id])
+        self.assertEqual(data['comments'][0]['issue'], self.issue.id)
+        self.assertEqual(data['deleted'], {'issues': [], 'comments': []})
+        self.assertFalse(data['partial'])
+
+    @patch.dict('issuestracking.sync.CONFIG', PAGE_SIZE=1)
+    def test_full_sync_pages(self):
+        first = self.sync()
+        self.assertEqual((first['reset'], first['partial']), (True, True))
+        self.assertEqual(self.ids(first['issues']), [self.issue.id])
+        self.assertEqual(self.ids(first['comments']), [self.comment.id])
+        self.issue.title = 'Changed'
+        self.issue.save()
+
+        last = self.sync(first['token'])
+        self.assertEqual((last['reset'], last['partial']), (False, False))
+        self.assertEqual(self.ids(last['issues']), [self.untouched.id])
+        self.assertEqual(last['comments'], [])
+        self.assertEqual(self.ids(self.sync(last['token'])['issues']),
+                         [self.issue.id])
+        self.sync(f'{last["token"]}:next', status_code=400)
+
+    def test_changes_since_token(self):
+        token = self.sync()['token']
+        self.client.force_authenticate(self.member)
+        response = self.client.post(self.comments_url(), {
+            'description': 'new'})
+        self.client.force_authenticate(self.owner)
+        created = self.client.post(self.issues_url(), {
+            'title': 'New', 'description': 'desc',
+            'assignee_user': 'member'}).data
+        comment_id = self.comment.id
+        self.comment.delete()
+
+        data = self.sync(token)
+        self.assertFalse(data['reset'])
+        self.assertEqual(self.ids(data['issues']),
+                         [self.issue.id, created['id']])
+        self.assertEqual(data['issues'][0]['comments_count'], 1)
+        self.assertEqual(self.ids(data['comments']), [response.data['id']])
+        self.assertEqual(data['deleted'],
+                         {'issues': [], 'comments': [comment_id]})
+
+        data = self.sync(data['token'])
+        self.assertEqual((data['issues'], data['comments']), ([], []))
+
+    def test_bulk_update_and_deletion(self):
+        token = self.sync()['token']
+        self.client.post(f'{self.issues_url()}bulk-update/',
+                         [{'id': self.issue.id, 'status': 'DON'}],
+                         format='json')
+        issue_id = self.untouched.id
+        self.untouched.delete()
+        data = self.sync(token)
+        self.assertEqual(self.ids(data['issues']), [self.issue.id])
+        self.assertEqual(data['issues'][0]['status'], 'DON')
+        self.assertEqual(data['deleted'],
+                         {'issues': [issue_id], 'comments': []})
+
+    def test_reconciled_counters_are_sent(self):
+        token = self.sync()['token']
+        models.Issue.objects.update(comments_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.ids(self.sync(token)['issues']),
+                         [self.issue.id, self.untouched.id])
+
+    def test_same_data_as_drf_serializers(self):
+        token = self.sync()['token']
+        models.Comment.objects.create(description='new', issue=self.issue)
+        for since in [None, token]:
+            with self.subTest(since=since):
+                data = self.sync(since)
+                with patch.dict(compiled.CONFIG, ENABLED=False):
+                    expected = self.sync(since)
+                data.pop('token'), expected.pop('token')
+                self.assertEqual(data, expected)
+
+    def test_invalid_and_expired_tokens(self):
+        self.sync('yesterday', status_code=400)
+        self.sync(10 ** 30, status_code=400)
+        expired = sync.encode_token(
+            timezone.now() - datetime.timedelta(days=31))
+        self.assertTrue(self.sync(expired)['reset'])
+
+    def test_hidden_from_outsiders(self):
+        self.client.force_authenticate(self.outsider)
+        self.sync(status_code=404)
+
+    def test_purge_tombstones(self):
+        self.comment.delete()
+        self.assertEqual(sync.purge_tombstones(), 0)
+        later = timezone.now() + datetime.timedelta(days=31)
+        self.assertEqual(sync.purge_tombstones(later), 1)
+
+    def test_project_deletion_leaves_no_rows(self):
+        self.project.delete()
+        self.assertFalse(models.Tombstone.objects.exists())
+        self.assertFalse(models.ProjectDailyStat.objects.exists())
+
+
+class AsyncReadViewsTests(IssuesTrackingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        models.Issue.objects.create(title='Other', description='desc',
+                                    project=self.project,
+                                    author_user=self.member,
+                                    assignee_user=self.owner)
+        self.headers = self.bearer(self.member)
+
+    def bearer(self, user):
+        token = RefreshToken.for_user(user).access_token
+        return {'authorization': f'Bearer {token}'}
+
+    def get(self, path, **headers):
+        """
+        GET an async view through the async handler.
+        """
+        async def get():
+            return await self.async_client.get(
+                f'/api/v1/async/{path}', **{**self.headers, **headers})
+        return async_to_sync(get)()
+
+    def test_async_views_match_sync_views(self):
+        issues = f'projects/{self.project.id}/issues/'
+        comments = f'{issues}{self.issue.id}/comments/'
+        for path in ['projects/', f'projects/{self.project.id}/', issues,
+                     f'{issues}?status={models.Issue.TODO}&ordering=-id'
+                     '&limit=1&offset=1',
+                     f'{issues}?cursor=&limit=1',
+                     f'{issues}?fields=id,title&expand=author_user',
+                     f'{issues}{self.issue.id}/',
+                     f'{issues}{self.issue.id}/?fields=title', comments,
+                     f'{comments}{self.comment.id}/?expand=issue']:
+            membership_cache.clear()
+            with CaptureQueriesContext(connection) as sync_queries:
+                sync_response = self.client.get(
+                    f'/api/v1/{path}',
+                    HTTP_AUTHORIZATION=self.headers['authorization'])
+            membership_cache.clear()
+            with CaptureQueriesContext(connection) as async_queries:
+                async_response = self.get(path)
+            with self.subTest(path=path):
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(
+                    async_response.content.replace(b'/async/', b'/'),
+                    sync_response.content)
+                self.assertEqual(len(async_queries), len(sync_queries))
+
+    def test_async_views_check_permissions(self):
+        issues = f'projects/{self.project.id}/issues/'
+        response = self.get(issues, authorization='')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer realm="api"')
+        response = self.get(issues, authorization='Bearer nope')
+        self.assertEqual(response.status_code, 401)
+
+        outsider = self.bearer(self.outsider)
+        for path, status_code in [
+                (issues, 403), (f'{issues}{self.issue.id}/', 403),
+                (f'{issues}{self.issue.id}/comments/', 403),
+                (f'projects/{self.project.id}/', 404)]:
+            with self.subTest(path=path):
+                response = self.get(path, **outsider)
+                self.assertEqual(response.status_code, status_code)
+
+        other = models.Project.objects.create(
+            title='Other', description='desc', type='back-end')
+        for path in [f'{issues}0/', f'{issues}x/', f'{issues}0/comments/',
+                     f'projects/{other.id}/issues/{self.issue.id}/'
+                     f'comments/{self.comment.id}/']:
+            with self.subTest(path=path):
+                response = self.get(path)
+                self.assertIn(response.status_code, [403, 404])
+        response = self.get(f'{issues}?status=NOPE')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.json())
+
+    def test_async_views_answer_not_modified(self):
+        path = f'projects/{self.project.id}/issues/{self.issue.id}/'
+        response = self.get(path)
+        etag = response['ETag']
+        response = self.get(path, if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_middlewares_keep_the_chain_async(self):
+        async def view(request):
+            pass
+        for middleware in [replicas.ReplicaRoutingMiddleware,
+                           metrics.MetricsMiddleware]:
+            with patch.dict(metrics.CONFIG, ENABLED=True):
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(middleware(view)))
@@ -0,0 +1,149 @@
+"""
+Sliding-window throttles of the login, signup and write endpoints.
+
+A view opts in with a `throttle_scope` ("login", "signup", "write"...),
+and each throttle class limits it for one kind of client: the rate of
+`<scope>_<kind>` in `REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']`, e.g.
+"write_user", applies to each user. A scope without a rate for a kind
+is not throttled for that kind.
+
+The rate is checked on the count of the current fixed window plus the
+count of the previous one, weighted by how much of it still overlaps
+the sliding window. That is two integers per client in the cache,
+whatever the rate, instead of the list of the request timestamps of
+DRF's throttles. Two concurrent requests may both pass the last slot:
+the limit is approximate by design.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+CONFIG = {
+    'ENABLED': True,
+    'CACHE': 'default',
+}
+CONFIG.update(getattr(settings, 'THROTTLING', {}))
+
+
+def parse_rate(rate):
+    """
+    Return the (requests, seconds) of a rate such as "10/min".
+    """
+    requests, period = rate.split('/')
+    return int(requests), {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+
+
+def window_wait(previous, current, elapsed, limit, duration):
+    """
+    Return the seconds until the weighted count of the window drops
+    below `limit`, for `elapsed` seconds into the current window.
+    """
+    if current >= limit:
+        # Wait for the next window, in which `current` is the previous
+        # count and must fade enough.
+        return duration - elapsed + duration * (1 - limit / current)
+    return max(duration * (1 - (limit - current) / previous) - elapsed, 0)
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Base class of the throttles, see the module docstring.
+    `get_ident_key` returns the client of the request, or None to not
+    throttle it.
+    """
+    kind = None
+    timer = time.time
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self._wait = None
+        scope = getattr(view, 'throttle_scope', None)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(f'{scope}_{self.kind}')
+        if not CONFIG['ENABLED'] or not scope or rate is None:
+            return True
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        limit, duration = parse_rate(rate)
+        window, elapsed = divmod(self.timer(), duration)
+        key = f'throttle:{scope}_{self.kind}:{ident}'
+        previous_key = f'{key}:{int(window) - 1}'
+        current_key = f'{key}:{int(window)}'
+        cache = caches[CONFIG['CACHE']]
+        counts = cache.get_many([previous_key, current_key])
+        previous = counts.get(previous_key, 0)
+        current = counts.get(current_key, 0)
+        if previous * (1 - elapsed / duration) + current >= limit:
+            self._wait = window_wait(previous, current, elapsed, limit,
+                                     duration)
+            return False
+
+        # The counter is kept through the next window, which weighs it.
+        timeout = 2 * duration
+        if not cache.add(current_key, 1, timeout):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                # Expired in between.
+                cache.set(current_key, 1, timeout)
+            else:
+                if type(cache).incr is BaseCache.incr:
+                    # The generic incr sets the value again with the
+                    # default timeout.
+                    cache.touch(current_key, timeout)
+        return True
+
+    def wait(self):
+        return None if self._wait is None else math.ceil(self._wait)
+
+
+class UserRateThrottle(SlidingWindowThrottle):
+    """
+    Throttles each authenticated user.
+    """
+    kind = 'user'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class IPRateThrottle(SlidingWindowThrottle):
+    """
+    Throttles each client IP, see `NUM_PROXIES` in the DRF settings.
+    """
+    kind = 'ip'
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class ProjectRateThrottle(SlidingWindowThrottle):
+    """
+    Throttles the requests to each project, all clients together.
+    """
+    kind = 'project'
+
+    def get_ident_key(self, request, view):
+        return view.kwargs.get('project_pk')
+
+
+class ActionThrottleScopeMixin:
+    """
+    Sets the `throttle_scope` of the viewset actions of
+    `throttle_scopes`, the other actions are not throttled.
+    """
+    throttle_scopes = {}
+
+    @property
+    def throttle_scope(self):
+        return self.throttle_scopes.get(self.action)
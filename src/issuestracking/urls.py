@@ -1,5 +1,5 @@
 from django.urls import include, path
-from . import views
+from . import async_views, views
 from rest_framework_nested import routers
 
 router = routers.DefaultRouter()
@@ -28,9 +28,23 @@ comments_router = routers.NestedDefaultRouter(issues_router,
 comments_router.register(r'comments', views.CommentViewSet,
                          basename='issues-comments')
 
+async_urlpatterns = [
+    path('projects/', async_views.ProjectListView.as_view()),
+    path('projects/<pk>/', async_views.ProjectDetailView.as_view()),
+    path('projects/<project_pk>/issues/',
+         async_views.IssueListView.as_view()),
+    path('projects/<project_pk>/issues/<pk>/',
+         async_views.IssueDetailView.as_view()),
+    path('projects/<project_pk>/issues/<issue_pk>/comments/',
+         async_views.CommentListView.as_view()),
+    path('projects/<project_pk>/issues/<issue_pk>/comments/<pk>/',
+         async_views.CommentDetailView.as_view()),
+]
+
 urlpatterns = [
     path(r'', include(router.urls)),
     path(r'', include(contributors_router.urls)),
     path(r'', include(issues_router.urls)),
     path(r'', include(comments_router.urls)),
+    path(r'async/', include(async_urlpatterns)),
 ]
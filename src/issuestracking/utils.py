@@ -1,3 +1,15 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.http import Http404
+from django.utils.http import parse_etags
+from rest_framework import serializers, status
+from rest_framework.response import Response
+
+from . import models, replicas, versions
+from .membership import (get_membership, membership_annotations,
+                         remember_membership)
+
 
 class MultipleSerializerMixin:
     """
@@ -8,3 +20,238 @@ class MultipleSerializerMixin:
         if self.action in self.serializers.keys():
             return self.serializers[self.action]
         return self.serializers['default']
+
+
+def split_param(value):
+    """
+    Return the names of a comma separated query parameter, or None.
+    """
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def representation_queryset(queryset, serializer, extra_fields=()):
+    """
+    Return `queryset` loading only the columns, and joining only the
+    relations, that the representation of `serializer` reads, and the
+    model fields of `extra_fields`.
+
+    Return it unchanged when a field has a source that is not a plain
+    model field, a slug of a relation or a nested serializer of model
+    fields.
+    """
+    model = queryset.model
+    load, related = {model._meta.pk.name, *extra_fields}, set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if isinstance(field, serializers.SlugRelatedField):
+            names = [field.slug_field]
+        elif isinstance(field, serializers.ModelSerializer):
+            names = [nested.source for nested in field.fields.values()
+                     if not nested.write_only]
+        else:
+            names = None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return queryset
+        load.add(field.source)
+        if names is None:
+            continue
+        if not model_field.is_relation:
+            return queryset
+        related_model = model_field.related_model
+        for name in names:
+            try:
+                related_model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return queryset
+        related.add(field.source)
+        load.update(f'{field.source}__{name}' for name in names)
+    queryset = queryset.select_related(None).only(*sorted(load))
+    if related:
+        # Without arguments, select_related follows every relation.
+        queryset = queryset.select_related(*sorted(related))
+    return queryset
+
+
+class SparseFieldsMixin:
+    """
+    Supports `?fields=` to render only some fields and `?expand=` to
+    embed related objects on the read actions, see
+    `serializers.SparseFieldsMixin`.
+
+    The queryset of these actions then loads only the columns and joins
+    only the relations that the representation reads.
+    """
+    sparse_actions = ['list', 'retrieve']
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.sparse_actions:
+            params = self.request.query_params
+            context["fields"] = split_param(params.get('fields'))
+            context["expand"] = split_param(params.get('expand'))
+        return context
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.sparse_actions:
+            # The cursor pagination reads the ordering fields.
+            ordering = [name.lstrip('-')
+                        for name in getattr(self, 'cursor_ordering', ())]
+            queryset = representation_queryset(
+                queryset, self.get_serializer(), ordering)
+        return queryset
+
+
+class NestedParentsMixin:
+    """
+    Resolves the parents of a nested route, the project and the issue if
+    any, with the request user's membership of the project, in a single
+    query.
+
+    The parents are kept on the view for the permissions, which find
+    the membership already loaded, and for the serializers. Routes under
+    an issue resolve them before the permissions, as every action needs
+    the issue, other routes only for the `create` action.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self._parents = None
+        if 'issue_pk' in self.kwargs or self.action == 'create':
+            self._parents = self.resolve_parents(request)
+        super().initial(request, *args, **kwargs)
+
+    def resolve_parents(self, request):
+        """
+        Return a dict of the parents, empty if the route does not match
+        a project and issue chain.
+        """
+        queryset = self.parents_queryset(request)
+        if queryset is None:
+            return {}
+        return self.parents_of(request, queryset.first())
+
+    async def aresolve_parents(self, request):
+        """
+        Async `resolve_parents`.
+        """
+        queryset = self.parents_queryset(request)
+        if queryset is None:
+            return {}
+        return self.parents_of(request, await queryset.afirst())
+
+    def parents_queryset(self, request):
+        """
+        Return the queryset of the deepest parent with the membership,
+        or None if the route can't match any.
+        """
+        project_pk = str(self.kwargs.get('project_pk'))
+        issue_pk = str(self.kwargs.get('issue_pk', ''))
+        user_id = request.user.id
+        if user_id is None or not project_pk.isnumeric():
+            return None
+        if 'issue_pk' in self.kwargs:
+            if not issue_pk.isnumeric():
+                return None
+            return models.Issue.objects.select_related('project').annotate(
+                **membership_annotations(user_id, 'project_id')
+            ).filter(pk=issue_pk, project_id=project_pk)
+        return models.Project.objects.annotate(
+            **membership_annotations(user_id, 'pk')
+        ).filter(pk=project_pk)
+
+    def parents_of(self, request, parent):
+        if parent is None:
+            return {}
+        if isinstance(parent, models.Issue):
+            remember_membership(request, parent.project_id, parent)
+            return {'project': parent.project, 'issue': parent}
+        remember_membership(request, parent.id, parent)
+        return {'project': parent}
+
+    def get_parents(self):
+        """
+        Return the parents of the route, or raise a 404.
+        """
+        if getattr(self, '_parents', None) is None:
+            self._parents = self.resolve_parents(self.request)
+        if not self._parents:
+            raise Http404("No matches the given query")
+        return self._parents
+
+
+def project_etag(version, request, media_type):
+    """
+    Return the ETag of a read of a project at `version`, or None if the
+    project does not exist.
+    """
+    if version is None:
+        return None
+    key = ':'.join([
+        str(version),
+        str(request.user.id),
+        request.get_full_path(),
+        media_type,
+    ])
+    return '"%s"' % hashlib.md5(key.encode()).hexdigest()
+
+
+class ConditionalReadMixin:
+    """
+    Answers the read actions with an ETag derived from the project
+    version stamp, and with a 304 when the client already has it.
+
+    The check runs after authentication and permissions but before any
+    queryset or serializer work. Responses read from a replica are sent
+    without an ETag.
+    """
+    version_project_kwarg = 'project_pk'
+
+    def get_etag(self, request):
+        """
+        Return the ETag of the current read, or None when the user is
+        not a member of the project.
+        """
+        project_pk = self.kwargs.get(self.version_project_kwarg)
+        if get_membership(request, project_pk) is None:
+            return None
+        return project_etag(versions.get_project_version(project_pk),
+                            request, request.accepted_media_type)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        if replicas.reading_from_replica():
+            # The body may be older than the version stamp.
+            return handler(request, *args, **kwargs)
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag in parse_etags(if_none_match) or if_none_match == '*':
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+
+        cache = versions.get_cache()
+        cache_key = f'issuestracking:response:{etag}'
+        if versions.CONFIG['CACHE_RESPONSES']:
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data, headers={'ETag': etag})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+            if versions.CONFIG['CACHE_RESPONSES']:
+                cache.set(cache_key, response.data,
+                          versions.CONFIG['TIMEOUT'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from . import models
+from .replicas import PRIMARY
+
+CONFIG = {
+    'CACHE': 'default',
+    'TIMEOUT': 24 * 60 * 60,
+    'CACHE_RESPONSES': False,
+}
+CONFIG.update(getattr(settings, 'PROJECT_VERSIONS', {}))
+
+
+def get_cache():
+    return caches[CONFIG['CACHE']]
+
+
+def get_project_version(project_id):
+    """
+    Return the current version stamp of a project, or None if it does
+    not exist.
+
+    The stamp is read from the primary, so every process sees the
+    bumps of the others as soon as they are committed.
+    """
+    return _version(project_id).first()
+
+
+async def aget_project_version(project_id):
+    """
+    Async `get_project_version`.
+    """
+    return await _version(project_id).afirst()
+
+
+def _version(project_id):
+    return models.Project.objects.using(PRIMARY).filter(
+        pk=project_id).values_list('version', flat=True)
+
+
+def bump_project_version(project_id):
+    """
+    Give the project a new version stamp, invalidating every ETag and
+    cached response derived from the previous one.
+
+    The bump commits with the write that caused it, so readers never
+    tag the old rows with the new stamp.
+    """
+    if project_id is not None:
+        models.Project.objects.filter(pk=project_id).update(
+            version=F('version') + 1)
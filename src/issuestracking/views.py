@@ -1,14 +1,35 @@
+from collections import Counter
+from datetime import timedelta
+
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import viewsets
-from django.http import Http404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from .permissions import (IsOwnerOrContributorForReadOnly,
                           IsProjectManagerOrReadOnlyContributorObject,
                           IsAuthorOrReadOnly)
-from . import serializers, models, utils
+from . import (compiled, counters, export, filters, metrics, replicas,
+               serializers, models, stats, sync, throttling, utils)
+from .pagination import LimitOffsetOrCursorPagination
+from .search import get_search_backend
+from .versions import bump_project_version
+
+User = get_user_model()
 
 
-class ProjectViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
+class ProjectViewSet(metrics.TimedViewMixin,
+                     replicas.ReplicaReadMixin,
+                     utils.MultipleSerializerMixin,
+                     utils.ConditionalReadMixin,
+                     viewsets.ModelViewSet):
     """
     Project View based on ModelViewSet
     """
@@ -19,16 +40,93 @@ class ProjectViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
     }
 
     permission_classes = [IsAuthenticated & IsOwnerOrContributorForReadOnly]
+    version_project_kwarg = 'pk'
+    stats_default_days = 30
 
     def get_queryset(self):
         """
         Get the list of items for this view.
         """
-        return models.Project.objects.filter(
+        queryset = models.Project.objects.filter(
             projects__user_id=self.request.user.id).distinct()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(Prefetch(
+                'projects',
+                queryset=models.Contributor.objects.select_related('user')
+            ))
+        return queryset
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Stream every issue of the project with its comments, one row per
+        comment, as NDJSON (default) or CSV (`?output=csv`).
+        """
+        output = request.query_params.get('output', 'ndjson')
+        if output not in export.EXPORT_FORMATS:
+            raise ValidationError(
+                {"output": f"Choose among {list(export.EXPORT_FORMATS)}."})
+        project = self.get_object()
+        content_type, stream = export.EXPORT_FORMATS[output]
+        response = StreamingHttpResponse(
+            stream(export.export_rows(project.id)),
+            content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="project-{project.id}.{output}"')
+        return response
 
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Statistics of the project issues between `since` and `until`
+        (ISO dates, included, the last 30 days by default): breakdowns on
+        `until`, daily created, closed and reopened counts and the close
+        time histogram, in hours.
+        """
+        until = self.get_stats_day('until', timezone.localdate())
+        since = self.get_stats_day(
+            'since', until - timedelta(days=self.stats_default_days - 1))
+        if since > until:
+            raise ValidationError({"since": "Must not be after until."})
+        project = self.get_object()
+        return Response(stats.project_summary(project.id, since, until))
+
+    @action(detail=True, methods=['get'])
+    def changes(self, request, pk=None):
+        """
+        The issues and comments of the project created, updated or
+        deleted since the `since` token of the previous response, or all
+        of them without it, a page at a time, see `sync`.
+        """
+        project = self.get_object()
+        context = {**self.get_serializer_context(),
+                   "view_action": self.action, "project_pk": project.id}
+        try:
+            changes = sync.project_changes(
+                project.id, request.query_params.get('since') or None,
+                context)
+        except ValueError:
+            raise ValidationError({"since": "Invalid token."})
+        return Response(changes)
 
-class ContributorViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
+    def get_stats_day(self, param, default):
+        value = self.request.query_params.get(param)
+        if not value:
+            return default
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise ValidationError({param: "Expected a YYYY-MM-DD date."})
+        return day
+
+
+class ContributorViewSet(metrics.TimedViewMixin,
+                         replicas.ReplicaReadMixin,
+                         utils.NestedParentsMixin,
+                         utils.MultipleSerializerMixin,
+                         viewsets.ModelViewSet):
     """
     Contributor view based on ModelViewSet
     """
@@ -39,6 +137,8 @@ class ContributorViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
     }
     http_method_names = ['get', 'post', 'delete', 'option', 'head']
     permission_classes = [IsProjectManagerOrReadOnlyContributorObject]
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         """
@@ -53,19 +153,38 @@ class ContributorViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
         """
         context = super().get_serializer_context()
         context["project_pk"] = self.kwargs["project_pk"]
+        if self.action == 'create':
+            context["project"] = self.get_parents()["project"]
         return context
 
 
-class IssueViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
+class IssueViewSet(metrics.TimedViewMixin,
+                   replicas.ReplicaReadMixin,
+                   throttling.ActionThrottleScopeMixin,
+                   utils.NestedParentsMixin,
+                   utils.MultipleSerializerMixin,
+                   utils.SparseFieldsMixin,
+                   utils.ConditionalReadMixin,
+                   compiled.CompiledListMixin,
+                   viewsets.ModelViewSet):
     """
     Issue view based on ModelViewSet
     """
 
     serializers = {
         'default': serializers.IssueSerializer,
+        'bulk_create': serializers.IssueBulkCreateSerializer,
+        'bulk_update': serializers.IssueBulkUpdateSerializer,
     }
 
     permission_classes = [IsAuthorOrReadOnly]
+    throttle_scopes = {'create': 'write', 'bulk_create': 'write',
+                       'bulk_update': 'write'}
+    pagination_class = LimitOffsetOrCursorPagination
+    filter_backends = [filters.IssueFilterBackend]
+    cursor_ordering = ('created_time', 'id')
+    bulk_max_items = 500
+    search_max_results = 100
 
     http_method_names = ['get', 'post', 'delete', 'put', 'option', 'head']
 
@@ -73,8 +192,9 @@ class IssueViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
         """
         Get the list of items for this view.
         """
-        return models.Issue.objects.filter(
-            project_id=self.kwargs["project_pk"])
+        return models.Issue.objects.select_related(
+            'project', 'author_user', 'assignee_user'
+        ).filter(project_id=self.kwargs["project_pk"])
 
     def get_serializer_context(self):
         """
@@ -84,10 +204,222 @@ class IssueViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
         context["project_pk"] = self.kwargs["project_pk"]
         context["view_action"] = self.action
         context["request"] = self.request
+        if self.action == 'create':
+            context["project"] = self.get_parents()["project"]
         return context
 
+    def get_bulk_items(self):
+        """
+        Return the list of items sent to a bulk action.
+        """
+        items = self.request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError("Expected a non-empty list of items.")
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                f"At most {self.bulk_max_items} items are allowed.")
+        return items
+
+    def validate_bulk_items(self, items):
+        """
+        Validate every item against the project members loaded once.
 
-class CommentViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
+        Return the list of (index, validated_data) of the valid items and
+        the per item results, filled with the errors of invalid ones.
+        """
+        context = self.get_serializer_context()
+        context["members"] = {
+            user.username: user for user in
+            User.objects.filter(users__project_id=self.kwargs["project_pk"])
+        }
+        valid, results = [], [None] * len(items)
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results[index] = {"index": index,
+                                  "status": status.HTTP_400_BAD_REQUEST,
+                                  "errors": serializer.errors}
+        return valid, results
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request, project_pk=None):
+        """
+        Count the issues matching the list filters by status, priority,
+        tag and assignee, with a single grouped query.
+        """
+        rows = self.filter_queryset(self.get_queryset()).order_by().values(
+            'status', 'priority', 'tag', 'assignee_user__username'
+        ).annotate(count=Count('id'))
+        facets = {'status': {}, 'priority': {}, 'tag': {},
+                  'assignee_user': {}}
+        total = 0
+        for row in rows:
+            count = row.pop('count')
+            row['assignee_user'] = row.pop('assignee_user__username')
+            for field, value in row.items():
+                facets[field][value] = facets[field].get(value, 0) + count
+            total += count
+        return Response({"count": total, **facets})
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, project_pk=None):
+        """
+        Full-text search over the title and description of the issues
+        and the description of their comments, best match first.
+
+        Use `q` for the terms (all required), `limit` and `offset` to page.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', 20)),
+                        self.search_max_results)
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            raise ValidationError("limit and offset must be integers.")
+        if limit < 1:
+            raise ValidationError({"limit": "Must be positive."})
+        issue_ids = get_search_backend().search(
+            project_pk, request.user.id, request.query_params.get('q'),
+            limit, offset)
+        issues = self.get_queryset().in_bulk(issue_ids)
+        serializer = self.get_serializer(
+            [issues[issue_id] for issue_id in issue_ids if issue_id in issues],
+            many=True)
+        return Response({"results": serializer.data})
+
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request, project_pk=None):
+        """
+        Create many issues in a single insert.
+
+        The author of every issue is the request user.
+        """
+        project = self.get_parents()["project"]
+        valid, results = self.validate_bulk_items(self.get_bulk_items())
+
+        titles = [data["title"] for _, data in valid]
+        taken = set(models.Issue.objects.filter(
+            title__in=titles).values_list('title', flat=True))
+        issues = []
+        for index, data in valid:
+            if data["title"] in taken:
+                results[index] = {
+                    "index": index,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": {"title": ["issue with this title "
+                                         "already exists."]}}
+                continue
+            taken.add(data["title"])
+            issues.append((index, models.Issue(project=project,
+                                               author_user=request.user,
+                                               **data)))
+
+        with transaction.atomic():
+            models.Issue.objects.bulk_create(
+                [issue for _, issue in issues])
+            get_search_backend().index_issues(
+                [issue for _, issue in issues])
+            counters.add_to_project(
+                project.id, issues_count=len(issues),
+                open_issues_count=sum(issue.is_open for _, issue in issues))
+            now = timezone.now()
+            deltas = Counter()
+            for _, issue in issues:
+                deltas.update(stats.issue_deltas(
+                    None, stats.tracked_values(issue), now, now))
+            stats.record(project.id, timezone.localdate(now), deltas)
+            bump_project_version(project.id)
+        for index, issue in issues:
+            results[index] = {"index": index,
+                              "status": status.HTTP_201_CREATED,
+                              "id": issue.id}
+        return Response({"results": results})
+
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request, project_pk=None):
+        """
+        Partially update the status, priority, tag or assignee of many
+        issues.
+
+        As for a single update, only the author of an issue may change it,
+        and an issue may only appear in one item. Items sharing the same
+        changes are written by a single `UPDATE ... WHERE id IN`.
+        """
+        valid, results = self.validate_bulk_items(self.get_bulk_items())
+
+        loaded = {
+            row["id"]: row for row in models.Issue.objects.filter(
+                project_id=project_pk,
+                id__in=[data["id"] for _, data in valid]
+            ).values('id', 'author_user_id', 'created_time',
+                     *models.Issue.tracked_fields)
+        }
+        authors = {issue_id: row["author_user_id"]
+                   for issue_id, row in loaded.items()}
+        changes, seen = {}, set()
+        for index, data in valid:
+            issue_id = data.pop("id")
+            if issue_id in seen:
+                results[index] = {
+                    "index": index, "id": issue_id,
+                    "status": status.HTTP_400_BAD_REQUEST,
+                    "errors": {"id": ["Repeated in an earlier item."]}}
+                continue
+            seen.add(issue_id)
+            if issue_id not in authors:
+                results[index] = {"index": index, "id": issue_id,
+                                  "status": status.HTTP_404_NOT_FOUND}
+            elif authors[issue_id] != request.user.id:
+                results[index] = {"index": index, "id": issue_id,
+                                  "status": status.HTTP_403_FORBIDDEN}
+            else:
+                if "assignee_user" in data:
+                    data["assignee_user_id"] = data.pop("assignee_user").id
+                key = tuple(sorted(data.items()))
+                changes.setdefault(key, []).append((index, issue_id))
+
+        with transaction.atomic():
+            for key, items in changes.items():
+                fields = dict(key)
+                queryset = models.Issue.objects.filter(
+                    id__in={issue_id for _, issue_id in items})
+                if "status" in fields:
+                    opened = queryset.exclude(status=models.Issue.DONE)
+                    open_before = opened.count()
+                now = timezone.now()
+                queryset.update(last_activity_time=now, updated_time=now,
+                                **fields)
+                if "status" in fields:
+                    counters.add_to_project(
+                        project_pk,
+                        open_issues_count=opened.count() - open_before)
+            now = timezone.now()
+            deltas = Counter()
+            for key, items in changes.items():
+                for _, issue_id in items:
+                    old = loaded[issue_id]
+                    new = {**old, **dict(key)}
+                    deltas.update(stats.issue_deltas(
+                        old, new, old["created_time"], now))
+            stats.record(project_pk, timezone.localdate(now), deltas)
+            bump_project_version(project_pk)
+        for items in changes.values():
+            for index, issue_id in items:
+                results[index] = {"index": index, "id": issue_id,
+                                  "status": status.HTTP_200_OK}
+        return Response({"results": results})
+
+
+class CommentViewSet(metrics.TimedViewMixin,
+                     replicas.ReplicaReadMixin,
+                     throttling.ActionThrottleScopeMixin,
+                     utils.NestedParentsMixin,
+                     utils.MultipleSerializerMixin,
+                     utils.SparseFieldsMixin,
+                     utils.ConditionalReadMixin,
+                     compiled.CompiledListMixin,
+                     viewsets.ModelViewSet):
     """
     Comment view based on ModelViewSet
     """
@@ -97,22 +429,20 @@ class CommentViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
     }
     http_method_names = ['get', 'post', 'delete', 'put', 'option', 'head']
     permission_classes = [IsAuthorOrReadOnly]
+    throttle_scopes = {'create': 'write'}
+    pagination_class = LimitOffsetOrCursorPagination
+    cursor_ordering = ('created_time', 'id')
 
     def get_queryset(self):
         """
         Get the list of items for this view.
 
-        Verrify also that the issue_pk is part of the project_pk,
-        otherwise it will raise a 404
+        The issue must be part of the project, otherwise it raises a 404.
         """
-        queryset = models.Comment.objects.select_related('issue').filter(
-            issue_id=self.kwargs["issue_pk"])
-        if (
-            not queryset.exists()
-            or str(queryset[0].issue.project_id) != self.kwargs["project_pk"]
-        ):
-            raise Http404("No matches the given query")
-        return queryset
+        issue = self.get_parents()["issue"]
+        return models.Comment.objects.select_related(
+            'issue', 'author_user'
+        ).filter(issue_id=issue.id)
 
     def get_serializer_context(self):
         """
@@ -120,6 +450,7 @@ class CommentViewSet(utils.MultipleSerializerMixin, viewsets.ModelViewSet):
         """
         context = super().get_serializer_context()
         context["issue_pk"] = self.kwargs["issue_pk"]
+        context["issue"] = self.get_parents()["issue"]
         context["view_action"] = self.action
         context["request"] = self.request
         return context
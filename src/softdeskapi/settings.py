@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 """
 
 from datetime import timedelta
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -55,6 +56,8 @@ PROJECT_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 MIDDLEWARE = [
+    'issuestracking.metrics.MetricsMiddleware',
+    'issuestracking.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -88,13 +91,35 @@ WSGI_APPLICATION = 'softdeskapi.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.0/ref/settings/#databases
 
+# Seconds a connection is kept open across requests, 0 closes it at the
+# end of each request and None keeps it open.
+DATABASE_CONN_MAX_AGE = int(os.environ.get('SOFTDESK_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
     }
 }
 
+# Read replicas, used by the list and retrieve actions through
+# issuestracking.replicas. SOFTDESK_SQLITE_REPLICAS=2 adds two SQLite
+# files standing in for replicas locally, refreshed from the primary by
+# `manage.py sync_replicas`. Leave it unset to run the tests, which use
+# the primary only.
+for index in range(int(os.environ.get('SOFTDESK_SQLITE_REPLICAS', 0))):
+    DATABASES[f'replica{index + 1}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db.replica{index + 1}.sqlite3',
+        'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['issuestracking.replicas.PrimaryReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -116,7 +141,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 
 PASSWORD_HASHERS = [
-    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'authentication.hashing.Argon2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2PasswordHasher',
     'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
     'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
@@ -150,11 +175,125 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 5,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-       'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+       'authentication.authentication.CachedJWTAuthentication',
+    ),
+    # Same output as DRF's JSONRenderer, see issuestracking.renderers.
+    'DEFAULT_RENDERER_CLASSES': (
+        'issuestracking.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Sliding-window throttles, see issuestracking.throttling. A rate
+    # named "<scope>_<user|ip|project>" limits the views of that
+    # throttle scope for each user, client IP or project.
+    'DEFAULT_THROTTLE_CLASSES': (
+        'issuestracking.throttling.UserRateThrottle',
+        'issuestracking.throttling.IPRateThrottle',
+        'issuestracking.throttling.ProjectRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': '20/min',
+        'signup_ip': '10/min',
+        'write_user': '120/min',
+        'write_ip': '300/min',
+        'write_project': '600/min',
+    },
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
+
+# Cache of the users resolved from the JWT, TIMEOUT is in seconds. CACHE
+# must be shared by the processes (memcached, redis, database...), so
+# that saving a user invalidates it everywhere: with the process-local
+# default, the users are read from the database on every request.
+AUTH_USER_CACHE = {
+    'CACHE': 'default',
+    'TIMEOUT': 5 * 60,
+}
+
+# Encoding backend of issuestracking.renderers.FastJSONRenderer: "orjson"
+# when installed, or "json" for the standard library.
+JSON_RENDERER = {
+    'BACKEND': 'orjson',
+}
+
+# Serve the issue and comment lists with the compiled serializers of
+# issuestracking.compiled rather than the DRF fields. CACHE_SIZE bounds
+# the compiled functions kept, one per layout of the requested fields.
+COMPILED_LISTS = {
+    'ENABLED': True,
+    'CACHE_SIZE': 256,
+}
+
+# Delta sync of the issues and comments (/projects/<id>/changes/).
+# OVERLAP, in seconds, makes each sync send again the last changes of the
+# previous one, which transactions still running may have missed.
+# Tombstones of deleted rows are kept TOMBSTONE_DAYS, see the
+# purge_tombstones command; older tokens get a full sync, sent PAGE_SIZE
+# issues and their comments per response.
+SYNC = {
+    'OVERLAP': 5,
+    'TOMBSTONE_DAYS': 30,
+    'PAGE_SIZE': 500,
+}
+
+# Cache holding the throttle counters. Point CACHE to a shared backend
+# when running several processes, so they share the limits.
+THROTTLING = {
+    'ENABLED': True,
+    'CACHE': 'default',
+}
+
+# Process-local cache of project memberships used by the permissions.
+# TTL is in seconds, set it to 0 to disable the cache.
+MEMBERSHIP_CACHE = {
+    'MAXSIZE': 4096,
+    'TTL': 60,
+}
+
+# ETags of the read actions, derived from the `version` column of the
+# project. CACHE_RESPONSES also caches the response data under the ETag
+# in CACHE for TIMEOUT seconds; the ETag changes with the version, so a
+# process-local cache never serves stale data.
+PROJECT_VERSIONS = {
+    'CACHE': 'default',
+    'TIMEOUT': 24 * 60 * 60,
+    'CACHE_RESPONSES': False,
+}
+
+# Per-request SQL, permissions, serializer and render timings, sent in
+# a Server-Timing header and served at /metrics for Prometheus. When
+# TOKEN is set, /metrics requires "Authorization: Bearer <TOKEN>".
+METRICS = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    'TOKEN': None,
+}
+
+# Production profile for SQLite deployments: WAL, busy timeout, mmap and
+# cache size pragmas on every connection, see issuestracking.sqlite
+# (PRAGMAS overrides them).
+SQLITE_PROFILE = {
+    'ENABLED': False,
+    'PRAGMAS': {},
+}
+
+# Pool of processes hashing and verifying the passwords off the request
+# workers, see authentication.hashing. At most MAX_PENDING hashes run or
+# wait at once, the next requests get a 503 with a Retry-After header of
+# RETRY_AFTER seconds. WORKERS = 0 hashes inline. NICE lowers the
+# priority of the workers. ARGON2 sets the Argon2 parameters, MEMORY_COST
+# is in KiB.
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('SOFTDESK_HASHING_WORKERS', 1)),
+    'MAX_PENDING': 4,
+    'RETRY_AFTER': 1,
+    'NICE': 10,
+    'ARGON2': {
+        'TIME_COST': 2,
+        'MEMORY_COST': 102400,
+        'PARALLELISM': 8,
+    },
+}
@@ -16,6 +16,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from issuestracking.metrics import metrics_view
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -23,4 +25,5 @@ urlpatterns = [
                                 namespace='rest_framework')),
     path('api/v1/', include('authentication.urls')),
     path('api/v1/', include('issuestracking.urls')),
+    path('metrics', metrics_view),
 ]